@@ -0,0 +1,120 @@
+"""Generates synthetic EVE chat logs for the benchmarks.
+
+    Logs are written like the EVE client writes them: UTF-16-LE, a byte order mark that also delimits every record, a
+    header block naming the channel and listener and one '[ YYYY.MM.DD HH:MM:SS ] User > Message' record per line.
+
+        python benchmarks/generate_logs.py logs --chats Local Corp --messages 100000 --rate 30
+"""
+import argparse
+import math
+import os
+import random
+from bisect import bisect
+from itertools import accumulate
+from datetime import datetime, timedelta
+
+DELIMITER = "\ufeff"
+ENCODING = "utf-16-le"
+TIMESTAMP_FORMAT = "%Y.%m.%d %H:%M:%S"
+FILE_TIMESTAMP_FORMAT = "%Y%m%d_%H%M%S"
+START = datetime(2015, 3, 5, 21, 0, 0)
+
+HEADER = ("\r\n\r\n"
+          "        ---------------------------------------------------------------\r\n"
+          "\r\n"
+          "          Channel ID:      {channel_id}\r\n"
+          "          Channel Name:    {chat}\r\n"
+          "          Listener:        {listener}\r\n"
+          "          Session started: {started}\r\n"
+          "        ---------------------------------------------------------------\r\n"
+          "\r\n")
+
+WORDS = ("Jita", "Amarr", "Dodixie", "Rens", "Hek", "HED-GP", "EC-P8R", "clr", "red", "neut", "gate", "camp",
+         "fleet", "x", "o7", "in", "local", "on", "the", "undock", "dock", "Loki", "Sabre", "Guardian", "bubble",
+         "cyno", "up", "warp", "to", "me", "align", "now", "primary", "Ñandú", "Ærlig", "ツ")
+
+
+def format_record(timestamp, username, message):
+    return "{0}[ {1} ] {2} > {3}\r\n".format(DELIMITER, timestamp.strftime(TIMESTAMP_FORMAT), username, message)
+
+
+def format_header(chat, listener, started, channel_id=-1):
+    return DELIMITER + HEADER.format(channel_id=channel_id, chat=chat, listener=listener,
+                                     started=started.strftime(TIMESTAMP_FORMAT))
+
+
+def get_file_name(chat, started):
+    return "{0}_{1}.txt".format(chat, started.strftime(FILE_TIMESTAMP_FORMAT))
+
+
+def generate_messages(count, start=START, rate=60.0, mean_words=8, users=500, multi_line=0.01, seed=0):
+    """Yields count (timestamp, username, message) tuples.
+
+        Messages arrive at rate messages per minute on average, with exponentially distributed gaps. Message lengths
+        follow a log normal distribution of mean_words words, a small share of them spans several lines. Users talk
+        with Zipf like frequencies.
+    """
+    rng = random.Random(seed)
+    usernames = ["Pilot {0}".format(index) for index in range(users)]
+    cumulative_weights = list(accumulate(1.0 / (index + 1) for index in range(users)))
+    sigma = 0.8
+    mu = math.log(mean_words) - sigma * sigma / 2
+
+    seconds = 0.0
+    for _ in range(count):
+        seconds += rng.expovariate(rate / 60.0)
+        timestamp = start + timedelta(seconds=int(seconds))
+        username = usernames[bisect(cumulative_weights, rng.random() * cumulative_weights[-1])]
+
+        words = [rng.choice(WORDS) for _ in range(max(1, int(rng.lognormvariate(mu, sigma))))]
+        if rng.random() < multi_line and len(words) > 1:
+            middle = len(words) // 2
+            yield timestamp, username, " ".join(words[:middle]) + "\n" + " ".join(words[middle:])
+        else:
+            yield timestamp, username, " ".join(words)
+
+
+def write_log(path, chat, listener, messages, started=START, append=False):
+    """Writes a log with the header of a chat and listener followed by the messages, returns its path"""
+    file_path = os.path.join(path, get_file_name(chat, started))
+    with open(file_path, "ab" if append else "wb") as log:
+        if not append:
+            log.write(format_header(chat, listener, started).encode(ENCODING))
+        log.write("".join(format_record(*message) for message in messages).encode(ENCODING))
+
+    return file_path
+
+
+def create_directory(path, chats, sessions, messages=0, rate=60.0, mean_words=8, seed=0):
+    """Creates a chat log directory with a log of each chat for each of sessions sessions, one hour apart.
+
+        A directory of a long time player holds tens of thousands of such logs.
+    """
+    if not os.path.isdir(path):
+        os.makedirs(path)
+
+    for session in range(sessions):
+        started = START - timedelta(hours=sessions - session)
+        for index, chat in enumerate(chats):
+            log_messages = generate_messages(messages, started, rate, mean_words,
+                                             seed=seed + session * len(chats) + index)
+            write_log(path, chat, "Pilot 0", log_messages, started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generates synthetic EVE chat logs.")
+    parser.add_argument("path", help="directory to write the logs to")
+    parser.add_argument("--chats", nargs="+", default=["Local", "Corp", "Alliance"])
+    parser.add_argument("--sessions", type=int, default=1, help="logs per chat")
+    parser.add_argument("--messages", type=int, default=10000, help="messages per log")
+    parser.add_argument("--rate", type=float, default=60.0, help="messages per minute")
+    parser.add_argument("--mean-words", type=int, default=8, help="mean words per message")
+    parser.add_argument("--seed", type=int, default=0)
+    arguments = parser.parse_args()
+
+    create_directory(arguments.path, arguments.chats, arguments.sessions, arguments.messages, arguments.rate,
+                     arguments.mean_words, arguments.seed)
+
+
+if __name__ == '__main__':
+    main()
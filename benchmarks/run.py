@@ -0,0 +1,255 @@
+"""Measures the throughput and latency of reading chat logs and writes the results as JSON.
+
+        python benchmarks/run.py --output results.json
+        python benchmarks/run.py --baseline results.json
+
+    With a baseline the results are compared to it and the run fails if a metric got worse by more than the threshold.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+from threading import Lock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from generate_logs import ENCODING, create_directory, format_record, generate_messages, write_log
+from py_eve_chat_mon.chat_directory import get_existing_logs
+from py_eve_chat_mon.chat_message import EveChatLogReader, parse_batch, parse_msg
+from py_eve_chat_mon.monitor import Monitor
+
+SIZES = {'messages': 200000, 'incremental_messages': 20000, 'directory_logs': 20000, 'latency_messages': 200}
+QUICK_SIZES = {'messages': 20000, 'incremental_messages': 2000, 'directory_logs': 2000, 'latency_messages': 50}
+
+
+def best_of(function, repeat=5):
+    """Returns the shortest of repeat run times of function in seconds"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+
+    return min(times)
+
+
+def lower(value, unit):
+    return {'value': value, 'unit': unit, 'better': 'lower'}
+
+
+def higher(value, unit):
+    return {'value': value, 'unit': unit, 'better': 'higher'}
+
+
+def get_lines(count):
+    return [format_record(*message)[1:].rstrip() for message in generate_messages(count)]
+
+
+def bench_parse_msg(directory, sizes):
+    lines = get_lines(sizes['messages'])
+    seconds = best_of(lambda: [parse_msg(line) for line in lines])
+
+    return {'us_per_message': lower(seconds / len(lines) * 1e6, 'us'),
+            'messages_per_second': higher(len(lines) / seconds, 'messages/s')}
+
+
+def bench_parse_batch(directory, sizes):
+    lines = get_lines(sizes['messages'])
+    seconds = best_of(lambda: parse_batch(lines))
+
+    return {'us_per_message': lower(seconds / len(lines) * 1e6, 'us'),
+            'messages_per_second': higher(len(lines) / seconds, 'messages/s')}
+
+
+def bench_read_messages(directory, sizes):
+    """Reads a whole log at once, like catching up on a log that grew while the monitor was down"""
+    path = write_log(directory, "Local", "Pilot 0", generate_messages(sizes['messages']))
+    size = os.path.getsize(path)
+
+    def read():
+        reader = EveChatLogReader(path, 0)
+        reader.read_messages()
+        reader.destroy()
+
+    seconds = best_of(read)
+    return {'megabytes_per_second': higher(size / seconds / 1e6, 'MB/s'),
+            'messages_per_second': higher(sizes['messages'] / seconds, 'messages/s')}
+
+
+def bench_read_messages_incremental(directory, sizes):
+    """Reads a log after every few messages appended to it, like following a busy chat"""
+    count = sizes['incremental_messages']
+    path = write_log(directory, "Corp", "Pilot 0", [])
+    chunks = []
+    messages = list(generate_messages(count))
+    for index in range(0, count, 10):
+        chunks.append("".join(format_record(*message) for message in messages[index:index + 10]).encode(ENCODING))
+
+    with open(path, "ab") as log:
+        reader = EveChatLogReader(path)
+        start = time.perf_counter()
+        for chunk in chunks:
+            log.write(chunk)
+            log.flush()
+            reader.read_messages()
+        seconds = time.perf_counter() - start
+        reader.destroy()
+
+    return {'us_per_read': lower(seconds / len(chunks) * 1e6, 'us'),
+            'messages_per_second': higher(count / seconds, 'messages/s')}
+
+
+def bench_get_existing_logs(directory, sizes):
+    """Finds the newest log of each chat in a directory of many old logs"""
+    logs_path = os.path.join(directory, "logs")
+    chats = ["Chat {0}".format(index) for index in range(100)]
+    create_directory(logs_path, chats, sizes['directory_logs'] // len(chats))
+    index_path = os.path.join(directory, "index.json")
+
+    scan_seconds = best_of(lambda: get_existing_logs(logs_path))
+    # the index is only saved for a directory that did not change for a while
+    os.utime(logs_path, (time.time() - 60, time.time() - 60))
+    get_existing_logs(logs_path, index_path)
+    index_seconds = best_of(lambda: get_existing_logs(logs_path, index_path))
+
+    return {'scan_ms': lower(scan_seconds * 1e3, 'ms'),
+            'indexed_ms': lower(index_seconds * 1e3, 'ms')}
+
+
+def measure_latency(directory, sizes, chat, **kwargs):
+    path = write_log(directory, chat, "Pilot 0", [])
+    sent = {}
+    latencies = []
+    lock = Lock()
+
+    def handler(chat_name, messages):
+        received = time.perf_counter()
+        with lock:
+            for message in messages:
+                latencies.append(received - sent[message.message])
+
+    monitor = Monitor([chat], directory, handler, **kwargs)
+    monitor.start()
+    try:
+        with open(path, "ab") as log:
+            for index, (timestamp, username, _) in enumerate(generate_messages(sizes['latency_messages'])):
+                body = "latency {0}".format(index)
+                sent[body] = time.perf_counter()
+                log.write(format_record(datetime.utcnow(), username, body).encode(ENCODING))
+                log.flush()
+                time.sleep(0.01)
+
+        deadline = time.perf_counter() + 10
+        while len(latencies) < len(sent) and time.perf_counter() < deadline:
+            time.sleep(0.01)
+    finally:
+        monitor.stop()
+
+    results = {'lost_messages': lower(len(sent) - len(latencies), 'messages')}
+    if latencies:
+        # without any received message only the lost messages are reported
+        latencies.sort()
+        results['p50_ms'] = lower(latencies[len(latencies) // 2] * 1e3, 'ms')
+        results['p95_ms'] = lower(latencies[int(len(latencies) * 0.95)] * 1e3, 'ms')
+        results['max_ms'] = lower(latencies[-1] * 1e3, 'ms')
+
+    return results
+
+
+def bench_monitor_latency(directory, sizes):
+    """Time from writing a message to a log until the handler receives it, polling every 50ms"""
+    return measure_latency(directory, sizes, "Polled", poll_rate=0.05)
+
+
+def bench_monitor_latency_events(directory, sizes):
+    """Time from writing a message to a log until the handler receives it, reading on file system events"""
+    return measure_latency(directory, sizes, "Evented", poll_rate=1, use_events=True)
+
+
+BENCHMARKS = [('parse_msg', bench_parse_msg),
+              ('parse_batch', bench_parse_batch),
+              ('read_messages', bench_read_messages),
+              ('read_messages_incremental', bench_read_messages_incremental),
+              ('get_existing_logs', bench_get_existing_logs),
+              ('monitor_latency', bench_monitor_latency),
+              ('monitor_latency_events', bench_monitor_latency_events)]
+
+
+def run(names, sizes):
+    results = {}
+    for name, benchmark in BENCHMARKS:
+        if names and name not in names:
+            continue
+
+        directory = tempfile.mkdtemp()
+        try:
+            results[name] = benchmark(directory, sizes)
+        finally:
+            shutil.rmtree(directory)
+
+        print("{0}: {1}".format(name, ", ".join("{0}={1:.3f}".format(metric, result['value'])
+                                                   for metric, result in results[name].items())))
+
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Prints the change of every metric against the baseline and returns the number of metrics that got worse by more
+    than threshold"""
+    regressions = 0
+    for name, metrics in sorted(results.items()):
+        for metric, result in sorted(metrics.items()):
+            base = baseline.get(name, {}).get(metric)
+            if base is None:
+                continue
+
+            if base['value']:
+                change = result['value'] / base['value'] - 1
+                worse = change > threshold if result['better'] == 'lower' else change < -threshold
+                change = "{0:+.1%}".format(change)
+            else:
+                # there is no relative change from zero (e.g. no lost messages), any change for the worse counts
+                worse = result['value'] > 0 if result['better'] == 'lower' else result['value'] < 0
+                change = "n/a"
+            regressions += worse
+            print("{0:<28} {1:<22} {2:>12.3f} {3:>12.3f} {4:>8}{5}".format(
+                name, metric, base['value'], result['value'], change, "  REGRESSION" if worse else ""))
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks reading EVE chat logs.")
+    parser.add_argument("--output", help="file to write the results to as JSON")
+    parser.add_argument("--baseline", help="results of an earlier run to compare to")
+    parser.add_argument("--threshold", type=float, default=0.1, help="change of a metric that counts as regression")
+    parser.add_argument("--only", nargs="+", choices=[name for name, _ in BENCHMARKS], help="benchmarks to run")
+    parser.add_argument("--quick", action="store_true", help="use smaller inputs")
+    arguments = parser.parse_args()
+
+    results = run(arguments.only, QUICK_SIZES if arguments.quick else SIZES)
+    report = {'meta': {'time': datetime.utcnow().isoformat(),
+                       'python': platform.python_version(),
+                       'implementation': platform.python_implementation(),
+                       'platform': platform.platform(),
+                       'quick': arguments.quick},
+              'results': results}
+
+    if arguments.output:
+        with open(arguments.output, "w") as output:
+            json.dump(report, output, indent=2, sort_keys=True)
+
+    if arguments.baseline:
+        with open(arguments.baseline) as baseline:
+            regressions = compare(results, json.load(baseline)['results'], arguments.threshold)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,262 @@
+import logging
+import sqlite3
+from contextlib import closing
+from datetime import datetime, timedelta
+from threading import Thread, Condition, current_thread
+from time import monotonic
+from .chat_message import ChatMessage
+from .exceptions import InvalidMonitorState
+from .subscription import ChatSubscription
+
+logger = logging.getLogger(__name__)
+
+EPOCH = datetime(1970, 1, 1)
+SECOND = timedelta(seconds=1)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS chats (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS users (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY,
+    chat_id INTEGER NOT NULL REFERENCES chats (id),
+    user_id INTEGER NOT NULL REFERENCES users (id),
+    timestamp INTEGER NOT NULL,
+    message TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS messages_chat_timestamp ON messages (chat_id, timestamp);
+CREATE INDEX IF NOT EXISTS messages_user_timestamp ON messages (user_id, timestamp);
+CREATE INDEX IF NOT EXISTS messages_timestamp ON messages (timestamp);
+"""
+
+# the body index only stores the terms, the bodies are read from messages. FTS4 always uses the rowid of the content
+# table, which messages.id is
+FTS_SCHEMAS = {'fts5': "CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(message, content='messages', "
+                       "content_rowid='id')",
+               'fts4': "CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts4(message, content='messages')"}
+
+
+def get_fts_module(connection):
+    """Returns the best full text search module of the sqlite library, None if it has none"""
+    for module in ('fts5', 'fts4'):
+        try:
+            connection.execute("CREATE VIRTUAL TABLE temp.fts_probe USING {0}(message)".format(module))
+        except sqlite3.OperationalError:
+            continue
+
+        connection.execute("DROP TABLE temp.fts_probe")
+        return module
+
+    return None
+
+
+class ChatArchive(object):
+    """A handler that archives messages in an SQLite database and searches them.
+
+        Messages are written by a background thread in one transaction for all messages waiting once batch_size of them
+        are waiting or the oldest waited batch_interval seconds, so the monitor never waits for the disk. The database
+        uses WAL mode so searches do not block writes. Chat and user names are stored once in lookup tables and message
+        bodies are indexed for full text search if the sqlite library supports FTS5 or FTS4:
+
+            archive = ChatArchive('chat.db')
+            Monitor(chats, path, archive)
+            archive.search('jita', chats=['Intel*'], since=datetime(2015, 3, 5))
+    """
+
+    def __init__(self, path, batch_size=5000, batch_interval=1.0):
+        self.path = path
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self.is_alive = True
+
+        self._condition = Condition()
+        self._batch = []
+        self._batch_size = 0
+        self._batch_start = None
+        self._writing = False
+        self._stats = {'written_batches': 0,
+                       'written_messages': 0,
+                       'write_errors': 0,
+                       'write_time': 0.0}
+
+        with closing(self._connect()) as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(SCHEMA)
+            self.fts_module = get_fts_module(connection)
+            if self.fts_module is not None:
+                connection.execute(FTS_SCHEMAS[self.fts_module])
+            connection.commit()
+
+        self.thread = Thread(target=self._run, name="ChatArchive")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=30)
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def __call__(self, chat, messages):
+        with self._condition:
+            if not self.is_alive:
+                raise InvalidMonitorState("Archive closed")
+
+            if not self._batch:
+                self._batch_start = monotonic()
+                self._condition.notify_all()
+
+            self._batch.append((chat, messages))
+            self._batch_size += len(messages)
+            if self._batch_size >= self.batch_size:
+                self._condition.notify_all()
+
+    def get_stats(self):
+        """Returns a snapshot of the written batches and messages and the time spent writing them"""
+        with self._condition:
+            stats = dict(self._stats)
+            stats['pending_messages'] = self._batch_size
+
+        return stats
+
+    def flush(self):
+        """Waits until the messages passed so far are written"""
+        with self._condition:
+            self._batch_start = monotonic() - self.batch_interval
+            self._condition.notify_all()
+            while (self._batch or self._writing) and self.thread.is_alive():
+                self._condition.wait()
+
+    def close(self, wait=True):
+        """Stops accepting messages. The writer writes the waiting messages and closes the database"""
+        with self._condition:
+            self.is_alive = False
+            self._condition.notify_all()
+
+        if wait and self.thread is not current_thread():
+            self.thread.join()
+
+    def _run(self):
+        with closing(self._connect()) as connection:
+            chat_ids = self._load_ids(connection, "chats")
+            user_ids = self._load_ids(connection, "users")
+
+            while True:
+                with self._condition:
+                    while self.is_alive and self._batch_size < self.batch_size:
+                        if self._batch and self._batch_start + self.batch_interval <= monotonic():
+                            break
+                        self._condition.wait(self._batch_start + self.batch_interval - monotonic()
+                                             if self._batch else None)
+
+                    batch, size = self._batch, self._batch_size
+                    self._batch, self._batch_size = [], 0
+                    self._writing = bool(batch)
+                    is_done = not self.is_alive
+
+                if batch:
+                    start = monotonic()
+                    try:
+                        self._write(connection, batch, chat_ids, user_ids)
+                    except sqlite3.Error:
+                        logger.exception("Could not archive %d messages", size)
+                        connection.rollback()
+                        # ids of names inserted in the failed transaction are gone
+                        chat_ids = self._load_ids(connection, "chats")
+                        user_ids = self._load_ids(connection, "users")
+                        written = False
+                    else:
+                        written = True
+
+                    with self._condition:
+                        if written:
+                            self._stats['written_batches'] += 1
+                            self._stats['written_messages'] += size
+                        else:
+                            self._stats['write_errors'] += 1
+                        self._stats['write_time'] += monotonic() - start
+                        self._writing = False
+                        self._condition.notify_all()
+
+                if is_done:
+                    break
+
+    def _load_ids(self, connection, table):
+        return dict((name, name_id) for name_id, name in connection.execute("SELECT id, name FROM {0}".format(table)))
+
+    def _get_id(self, connection, table, ids, name):
+        name_id = ids.get(name)
+        if name_id is None:
+            connection.execute("INSERT OR IGNORE INTO {0} (name) VALUES (?)".format(table), (name,))
+            name_id = ids[name] = connection.execute("SELECT id FROM {0} WHERE name = ?".format(table),
+                                                     (name,)).fetchone()[0]
+
+        return name_id
+
+    def _write(self, connection, batch, chat_ids, user_ids):
+        rows = []
+        last_timestamp = None
+        seconds = None
+        for chat, messages in batch:
+            chat_id = self._get_id(connection, "chats", chat_ids, chat)
+            for message in messages:
+                user_id = user_ids.get(message.username)
+                if user_id is None:
+                    user_id = self._get_id(connection, "users", user_ids, message.username)
+
+                if message.timestamp is not last_timestamp:
+                    last_timestamp = message.timestamp
+                    seconds = (last_timestamp - EPOCH) // SECOND
+                rows.append((chat_id, user_id, seconds, message.message))
+
+        first_id = connection.execute("SELECT COALESCE(MAX(id), 0) FROM messages").fetchone()[0]
+        connection.executemany("INSERT INTO messages (chat_id, user_id, timestamp, message) VALUES (?, ?, ?, ?)", rows)
+        if self.fts_module is not None:
+            connection.execute("INSERT INTO messages_fts (rowid, message) "
+                               "SELECT id, message FROM messages WHERE id > ?", (first_id,))
+        connection.commit()
+
+    def search(self, text=None, chats=None, usernames=None, since=None, until=None, limit=100):
+        """Returns the newest (chat, message) pairs matching all of the given criteria, newest first.
+
+            text is a full text query (e.g. 'jita AND red', see the sqlite FTS documentation) or a substring of the
+            body if the sqlite library has no full text search. chats takes the same patterns as a Monitor. Messages
+            are sent in [since, until) and only messages written so far are found, see flush.
+        """
+        conditions = []
+        parameters = []
+        with closing(self._connect()) as connection:
+            if chats is not None:
+                names = [name for (name,) in connection.execute("SELECT name FROM chats")]
+                chat_names = ChatSubscription(chats).filter(names)
+                conditions.append("c.name IN ({0})".format(", ".join("?" * len(chat_names))))
+                parameters.extend(chat_names)
+
+            if usernames is not None:
+                usernames = list(usernames)
+                conditions.append("u.name IN ({0})".format(", ".join("?" * len(usernames))))
+                parameters.extend(usernames)
+
+            if since is not None:
+                conditions.append("m.timestamp >= ?")
+                parameters.append((since - EPOCH) // SECOND)
+
+            if until is not None:
+                conditions.append("m.timestamp < ?")
+                parameters.append((until - EPOCH) // SECOND)
+
+            if text is not None:
+                if self.fts_module is not None:
+                    conditions.append("m.id IN (SELECT rowid FROM messages_fts WHERE messages_fts MATCH ?)")
+                    parameters.append(text)
+                else:
+                    conditions.append("instr(m.message, ?) > 0")
+                    parameters.append(text)
+
+            query = ("SELECT c.name, u.name, m.timestamp, m.message FROM messages m "
+                     "JOIN chats c ON c.id = m.chat_id JOIN users u ON u.id = m.user_id")
+            if conditions:
+                query += " WHERE " + " AND ".join(conditions)
+            query += " ORDER BY m.timestamp DESC, m.id DESC LIMIT ?"
+            parameters.append(limit)
+
+            return [(chat, ChatMessage(EPOCH + timestamp * SECOND, username, message))
+                    for chat, username, timestamp, message in connection.execute(query, parameters)]
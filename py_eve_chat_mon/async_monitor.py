@@ -0,0 +1,168 @@
+import asyncio
+from collections import deque
+from time import perf_counter
+from .exceptions import InvalidMonitorState
+from .monitor import Monitor
+
+_STOP = object()
+
+
+class AsyncMonitor(Monitor):
+    """An Eve chat monitor for asyncio applications (Python 3.5+).
+
+        Takes the same keyword arguments as Monitor and selects and schedules chats the same way, but instead of
+        calling a handler from a thread the chat logs are read and parsed in an executor and delivered through a
+        bounded queue, which stops reading while it is full:
+
+            await monitor.start()
+            async for chat, messages in monitor:
+                ...
+
+        stop lets the poll finish the read in progress. Batches that no longer fit into the queue are kept and handed
+        out after the queued ones, their chats keep the checkpoint of their last queued batch.
+    """
+
+    def __init__(self, chats, path, max_queue=100, executor=None, **kwargs):
+        self.task = None
+        self.max_queue = max_queue
+        self.executor = executor
+        self._loop = None
+        self._queue = None
+        self._stopping = None
+        # batches read while stopping that did not fit into the queue
+        self._pending = deque()
+
+        super(AsyncMonitor, self).__init__(chats, path, None, **kwargs)
+
+    async def start(self):
+        if self.is_alive:
+            raise InvalidMonitorState("Monitor already started")
+        self.is_alive = True
+
+        self._loop = asyncio.get_event_loop()
+        self._queue = asyncio.Queue(self.max_queue)
+        self._wakeup = asyncio.Event()
+        self._stopping = asyncio.Event()
+        self._pending = deque()
+
+        self.chat_log_monitor.start()
+        if self.checkpoints:
+            self.chat_log_monitor.save_checkpoints()
+
+        self.task = asyncio.ensure_future(self.poll())
+
+    async def stop(self):
+        if not self.is_alive:
+            raise InvalidMonitorState("Monitor not started")
+        self.is_alive = False
+        self._stopping.set()
+        self._wakeup.set()
+
+        # the read in progress is finished and queued, its messages would be lost otherwise
+        await self.task
+        self.task = None
+
+        await self._loop.run_in_executor(self.executor, self.chat_log_monitor.stop)
+        await self._loop.run_in_executor(self.executor, self._flush_checkpoints)
+
+        # wakes iterators waiting on an empty queue, the others stop once they drained the queue
+        if self._queue.empty():
+            self._queue.put_nowait(_STOP)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._queue is None or (not self.is_alive and self._queue.empty()):
+            return self._next_pending()
+
+        item = await self._queue.get()
+        if item is _STOP:
+            self._queue.put_nowait(_STOP)
+            return self._next_pending()
+
+        return item
+
+    def _next_pending(self):
+        if not self._pending:
+            raise StopAsyncIteration
+
+        return self._pending.popleft()
+
+    async def _put(self, item):
+        """Queues a batch, returns False if it was kept in _pending because the monitor is stopping"""
+        if not self._pending:
+            if self.is_alive:
+                put = asyncio.ensure_future(self._queue.put(item))
+                stopping = asyncio.ensure_future(self._stopping.wait())
+                await asyncio.wait([put, stopping], return_when=asyncio.FIRST_COMPLETED)
+                stopping.cancel()
+                if put.done():
+                    return True
+                put.cancel()
+
+            try:
+                self._queue.put_nowait(item)
+                return True
+            except asyncio.QueueFull:
+                pass
+
+        self._pending.append(item)
+        return False
+
+    def _flush_checkpoints(self):
+        if self.checkpoints:
+            pending_chats = set(chat for chat, _ in self._pending)
+            for chat in list(self.chat_log_monitor.chats):
+                if chat not in pending_chats:
+                    self.chat_log_monitor.save_checkpoint(chat)
+            self.checkpoints.flush()
+
+    def _wake(self):
+        """Called from the watchdog thread"""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def _read_chats(self, chats):
+        """Reads and parses the new messages of chats, runs in the executor"""
+        return [(chat,) + self._read_chat(chat) for chat in chats]
+
+    async def _wait(self, timeout):
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        else:
+            if self.use_events and self.coalesce_delay:
+                await asyncio.sleep(self.coalesce_delay)
+
+        self._wakeup.clear()
+
+    async def poll(self):
+        while self.is_alive:
+            due = self.scheduler.pop_due()
+            if due:
+                start = perf_counter()
+                try:
+                    results = await self._loop.run_in_executor(self.executor, self._read_chats, due)
+                except asyncio.CancelledError:
+                    for chat in due:
+                        self.scheduler.update(chat, True)
+                    raise
+
+                for chat, parsed_messages, active in results:
+                    self.scheduler.update(chat, active)
+                    self._wake_if_behind(chat)
+
+                for chat, parsed_messages, active in results:
+                    if parsed_messages and not await self._put((chat, parsed_messages)):
+                        continue
+
+                    if active and self.checkpoints:
+                        # messages count as handled once they are queued
+                        self.chat_log_monitor.save_checkpoint(chat)
+
+                if self.metrics is not None:
+                    self.metrics.record_cycle(perf_counter() - start)
+
+            await self._wait(self._get_wait_timeout())
@@ -0,0 +1,115 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from .chat_directory import CHAT_FILE_NAME_PARSER, CHAT_FILE_TIMESTAMP_PARSER, FILE_TIMESTAMP_FORMAT
+from .chat_message import parse_batch
+from .exceptions import InvalidChatDirectory
+from .mapped_log import MappedChatLog
+from .subscription import ChatSubscription
+
+
+def find_logs(path, chats=None, since=None, until=None):
+    """Returns (chat_name, file_path) of every log in a directory that may contain messages of a time range.
+
+        chats takes the same patterns as a Monitor, all chats are selected without them. A log is selected if it was
+        started before until and last written to at or after since, both in EVE time (UTC) like the message
+        timestamps. The logs are ordered by the time they were started.
+    """
+    if not os.path.isdir(path):
+        raise InvalidChatDirectory(path, "The path '{0}' does not point to a directory.".format(path))
+
+    subscription = ChatSubscription(chats) if chats is not None else None
+    since_mtime = since.replace(tzinfo=timezone.utc).timestamp() if since is not None else None
+    until_timestamp = until.strftime(FILE_TIMESTAMP_FORMAT) if until is not None else None
+
+    logs = []
+    for entry in os.scandir(path):
+        file_name = entry.name
+        chat_match = CHAT_FILE_NAME_PARSER.match(file_name)
+        timestamp_match = CHAT_FILE_TIMESTAMP_PARSER.match(file_name)
+        if chat_match is None or timestamp_match is None:
+            continue
+
+        chat_name = chat_match.group(1)
+        timestamp = timestamp_match.group(1)
+        if subscription is not None and not subscription.matches(chat_name):
+            continue
+
+        if until_timestamp is not None and timestamp >= until_timestamp:
+            continue
+
+        if not entry.is_file() or (since_mtime is not None and entry.stat().st_mtime < since_mtime):
+            continue
+
+        logs.append((timestamp, chat_name, entry.path))
+
+    logs.sort()
+    return [(chat_name, file_path) for _, chat_name, file_path in logs]
+
+
+def read_log(file_path, since=None, until=None):
+    """Reads and parses all messages of a log, optionally only those sent in a time range"""
+    with MappedChatLog(file_path) as log:
+        messages = parse_batch(log.read_messages(since, until))
+
+    if since is not None or until is not None:
+        # the log only skips messages by timestamps in the standard '[ YYYY.MM.DD HH:MM:SS ]' layout
+        since = since or datetime.min
+        until = until or datetime.max
+        messages = [message for message in messages if since <= message.timestamp < until]
+
+    return messages
+
+
+def backfill(path, chats=None, since=None, until=None, workers=None, max_pending=None, executor=None):
+    """Yields (chat_name, messages) for each log of a directory selected by find_logs, in the order of find_logs.
+
+        The logs are parsed by a pool of worker processes, or in the calling process for a single worker. At most
+        max_pending logs (two per worker by default) are read ahead of the consumer, so memory stays bounded however
+        large the directory is. Programs using it on Windows have to guard their entry point with
+        if __name__ == '__main__'.
+    """
+    logs = find_logs(path, chats, since, until)
+
+    workers = workers or os.cpu_count() or 1
+    if max_pending is None:
+        max_pending = 2 * workers
+
+    owns_executor = executor is None
+    if owns_executor and workers == 1:
+        # a single worker process would only add the cost of passing the messages between processes
+        for chat_name, file_path in logs:
+            messages = read_log(file_path, since, until)
+            if messages:
+                yield chat_name, messages
+        return
+
+    if owns_executor:
+        executor = ProcessPoolExecutor(workers)
+
+    logs = iter(logs)
+    pending = deque()
+    try:
+        while True:
+            while len(pending) < max_pending:
+                log = next(logs, None)
+                if log is None:
+                    break
+
+                chat_name, file_path = log
+                pending.append((chat_name, executor.submit(read_log, file_path, since, until)))
+
+            if not pending:
+                return
+
+            chat_name, future = pending.popleft()
+            messages = future.result()
+            if messages:
+                yield chat_name, messages
+    finally:
+        for _, future in pending:
+            future.cancel()
+
+        if owns_executor:
+            executor.shutdown()
@@ -1,24 +1,37 @@
+import json
 import os
 import re
 from datetime import datetime
+from functools import partial
+from threading import Lock
+from time import time
 from .chat_message import EveChatLogReader
+from .checkpoint import get_last_message, get_resume_offset
 from .exceptions import InvalidChatDirectory, InvalidCallable, ObserverAlreadyAdded
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 
+CHAT_FILE_NAME_PARSER = re.compile(r'^(.+?)_\d+_\d+\.')
+CHAT_FILE_TIMESTAMP_PARSER = re.compile(r'.*?_(\d{8}_\d{6})\.txt$')
+FILE_TIMESTAMP_FORMAT = "%Y%m%d_%H%M%S"
+
+INDEX_VERSION = 2
+# seconds a directory has to be unchanged before its index is saved, its mtime might not change for newer files
+# otherwise
+INDEX_SETTLE_TIME = 2
+
+
 def get_timestamp_from_file_name(file_name):
-    chat_file_timestamp_parser = re.compile('.*?_(\d{8}_\d{6})\.txt$')
-    matches = chat_file_timestamp_parser.match(file_name)
+    matches = CHAT_FILE_TIMESTAMP_PARSER.match(file_name)
 
     if matches:
-        return datetime.strptime(matches.group(1), "%Y%m%d_%H%M%S")
+        return datetime.strptime(matches.group(1), FILE_TIMESTAMP_FORMAT)
 
     return None
 
 
 def get_chat_from_file_name(file_name):
-    chat_file_name_parser = re.compile('^(.+?)_\d+_\d+\.')
-    matches = chat_file_name_parser.match(file_name)
+    matches = CHAT_FILE_NAME_PARSER.match(file_name)
 
     if matches:
         return matches.group(1)
@@ -26,7 +39,96 @@ def get_chat_from_file_name(file_name):
     return None
 
 
-def get_existing_logs(path):
+def is_newer_log(file_name, other_file_name):
+    """Returns whether a log file was started after another log file of the same chat"""
+    if file_name == other_file_name:
+        return False
+
+    timestamp_match = CHAT_FILE_TIMESTAMP_PARSER.match(file_name)
+    other_timestamp_match = CHAT_FILE_TIMESTAMP_PARSER.match(other_file_name)
+    if timestamp_match is None or other_timestamp_match is None:
+        return True
+
+    return timestamp_match.group(1) >= other_timestamp_match.group(1)
+
+
+def scan_logs(path):
+    """Returns {chat_name: (timestamp, file_name)} for the newest log file of each chat in a directory.
+
+        The timestamps are the 'YYYYMMDD_HHMMSS' strings of the file names (an empty string if there is none), which
+        sort chronologically, so no file name timestamp has to be parsed.
+    """
+    match_chat = CHAT_FILE_NAME_PARSER.match
+    match_timestamp = CHAT_FILE_TIMESTAMP_PARSER.match
+    newest_logs = {}
+
+    for entry in os.scandir(path):
+        file_name = entry.name
+        chat_match = match_chat(file_name)
+        if chat_match is None:
+            continue
+
+        chat_name = chat_match.group(1)
+        timestamp_match = match_timestamp(file_name)
+        timestamp = timestamp_match.group(1) if timestamp_match else ''
+
+        newest_log = newest_logs.get(chat_name)
+        if (newest_log is None or timestamp > newest_log[0]) and entry.is_file():
+            newest_logs[chat_name] = (timestamp, file_name)
+
+    return newest_logs
+
+
+def read_log_index(index_path):
+    """Returns the {directory: entry} contents of an index file, empty if there is no valid index"""
+    try:
+        with open(index_path, "r", encoding="utf-8") as index_file:
+            index = json.load(index_file)
+    except (OSError, ValueError):
+        return {}
+
+    if not isinstance(index, dict) or index.get('version') != INDEX_VERSION:
+        return {}
+
+    return index['directories']
+
+
+def load_log_index(path, index_path):
+    """Returns the newest logs saved by save_log_index if the index is still valid for the directory, otherwise None.
+
+        An index is valid as long as the modification time of the directory, which changes whenever a file is created,
+        deleted or renamed, is the one it was saved for.
+    """
+    entry = read_log_index(index_path).get(os.path.abspath(path))
+    if entry is None or entry['mtime'] != os.stat(path).st_mtime_ns:
+        return None
+
+    return dict((chat_name, tuple(newest_log)) for chat_name, newest_log in entry['chats'].items())
+
+
+def save_log_index(path, index_path, newest_logs, mtime):
+    """Atomically saves the newest logs of a directory with the directory modification time they were scanned at.
+
+        One index holds the entries of several directories.
+    """
+    directories = read_log_index(index_path)
+    directories[os.path.abspath(path)] = {'mtime': mtime,
+                                          'chats': newest_logs}
+    index = {'version': INDEX_VERSION,
+             'directories': directories}
+
+    temp_path = index_path + ".tmp"
+    try:
+        with open(temp_path, "w", encoding="utf-8") as index_file:
+            json.dump(index, index_file)
+        os.replace(temp_path, index_path)
+    except OSError:
+        # the index only speeds up the next start
+        pass
+
+
+def validate_directory(path):
+    """Raises InvalidChatDirectory unless the path points to a directory"""
     if not os.path.exists(path):
         raise InvalidChatDirectory(path, "The path '{0}' does not exist.".format(path))
 
@@ -34,35 +136,65 @@ def get_existing_logs(path):
         raise InvalidChatDirectory(path,
                                    "The path '{0}' does not point to a directory.".format(path))
 
-    existing_chat_logs = [f for f in os.listdir(path) if os.path.isfile(os.path.join(path, f))]
 
-    existing_chats = {}
+def get_existing_logs(path, index_path=None):
+    validate_directory(path)
 
-    for file_name in existing_chat_logs:
-        chat_name = get_chat_from_file_name(file_name)
-        timestamp = get_timestamp_from_file_name(file_name)
+    if index_path is None:
+        newest_logs = scan_logs(path)
+    else:
+        newest_logs = load_log_index(path, index_path)
+        if newest_logs is None:
+            mtime = os.stat(path).st_mtime_ns
+            newest_logs = scan_logs(path)
 
-        if chat_name in existing_chats:
-            if timestamp > existing_chats[chat_name]['timestamp']:
-                existing_chats[chat_name] = {'timestamp': timestamp, 'path': os.path.join(path, file_name)}
-        else:
-            existing_chats[chat_name] = {'timestamp': timestamp, 'path': os.path.join(path, file_name)}
+            if time() - mtime / 1e9 > INDEX_SETTLE_TIME:
+                save_log_index(path, index_path, newest_logs, mtime)
+
+    existing_chats = {}
+
+    for chat_name, (timestamp, file_name) in newest_logs.items():
+        existing_chats[chat_name] = {'timestamp': datetime.strptime(timestamp, FILE_TIMESTAMP_FORMAT) if timestamp
+                                     else None,
+                                     'path': os.path.join(path, file_name)}
 
     return existing_chats
 
 
 class EveChatLogDirectoryMonitor(object):
+    """Follows the newest log of each chat in one or more chat log directories.
+
+        Every EVE client, install or profile has its own chat log directory, the same chat may be logged in several of
+        them. chats maps each chat name to {directory: EveChatLogReader}, all directories share one watchdog observer.
+
+        With max_bytes each log is read at most that many bytes at a time, see is_behind.
+
+        When EVE starts a new log for a chat the old one is drained before the new one is read from its start. The
+        chats registry is replaced instead of changed, so polls read it without a lock while the watchdog thread swaps
+        logs in and out.
+    """
 
-    def __init__(self, path):
-        if not os.path.exists(path):
-            raise InvalidChatDirectory(path, "The path '{0}' does not exist.".format(path))
+    def __init__(self, path, index_path=None, checkpoints=None, max_bytes=None):
+        self.paths = [path] if isinstance(path, str) else list(path)
 
-        if not os.path.isdir(path):
-            raise InvalidChatDirectory(path,
-                                       "The path '{0}' does not point to a directory.".format(path))
-        self.path = path
+        for directory in self.paths:
+            validate_directory(directory)
+        self.path = self.paths[0]
+        self.index_path = index_path
+        self.checkpoints = checkpoints
+        self.max_bytes = max_bytes
         self.chats = {}
+        # (chat name, directory) to the older logs of the chat that are still read, oldest first
+        self._draining = {}
+        # only taken to change chats or _draining
+        self._lock = Lock()
+        # chat name to [bytes read, seconds spent reading and decoding] of all its logs so far
+        self.read_totals = {}
         self.watchdog_observer = None
+        self._stopped = False
+        self._modified_callables = []
+        self._added_callables = []
+        self._removed_callables = []
 
         self._add_existing_log_files()
         self._add_file_observer()
@@ -71,32 +203,325 @@ class EveChatLogDirectoryMonitor(object):
         if self.watchdog_observer:
             raise ObserverAlreadyAdded()
 
-        event_handler = DirChangeEventHandler(self.on_create, self.on_delete)
-
         self.watchdog_observer = Observer()
-        self.watchdog_observer.schedule(event_handler, self.path, recursive=False)
+        for directory in self.paths:
+            event_handler = DirChangeEventHandler(partial(self.on_create, directory=directory),
+                                                  partial(self.on_delete, directory=directory),
+                                                  partial(self.on_modify, directory=directory))
+            self.watchdog_observer.schedule(event_handler, directory, recursive=False)
+
+    def start(self):
+        """Starts delivering file system events for the chat log directories.
+
+            After a stop the directories are scanned again, so logs EVE started in the meantime are read.
+        """
+        if not self.watchdog_observer.is_alive():
+            self.watchdog_observer.start()
+
+            if self._stopped:
+                # after starting the observer, a log created during the scan is seen by one of them
+                self._stopped = False
+                self._add_new_log_files()
+
+    def stop(self):
+        """Stops delivering file system events for the chat log directories"""
+        if self.watchdog_observer.is_alive():
+            self.watchdog_observer.stop()
+            self.watchdog_observer.join()
+
+            # watchdog observers are threads and can not be started again
+            self.watchdog_observer = None
+            self._add_file_observer()
+            self._stopped = True
+
+    def add_modified_callable(self, modified_callable):
+        """Registers a callable that is called with the chat name whenever a monitored chat log is modified"""
+        if not hasattr(modified_callable, '__call__'):
+            raise InvalidCallable("The value passed as '{0}' is not a callable.".format('modified_callable'))
+
+        self._modified_callables.append(modified_callable)
+
+    def add_chat_added_callable(self, added_callable):
+        """Registers a callable that is called with the chat name whenever a chat log is added"""
+        if not hasattr(added_callable, '__call__'):
+            raise InvalidCallable("The value passed as '{0}' is not a callable.".format('added_callable'))
+
+        self._added_callables.append(added_callable)
+
+    def add_chat_removed_callable(self, removed_callable):
+        """Registers a callable that is called with the chat name whenever the last log of a chat is removed"""
+        if not hasattr(removed_callable, '__call__'):
+            raise InvalidCallable("The value passed as '{0}' is not a callable.".format('removed_callable'))
+
+        self._removed_callables.append(removed_callable)
+
+    def find_chats(self, subscription):
+        """Returns the names of the monitored chat logs that match a ChatSubscription"""
+        return subscription.filter(list(self.chats))
 
     def _add_existing_log_files(self):
-        existing_logs = get_existing_logs(self.path)
-        for chat_name, file_info in existing_logs.items():
-            self.add_chat_log(chat_name, file_info['path'])
+        for directory in self.paths:
+            existing_logs = get_existing_logs(directory, self.index_path)
+            for chat_name, file_info in existing_logs.items():
+                if self.checkpoints is None:
+                    self.add_chat_log(chat_name, file_info['path'], directory=directory)
+                else:
+                    self._resume_chat_log(chat_name, file_info['path'], directory)
+
+    def _add_new_log_files(self):
+        """Switches the chats to the logs that are newer than the ones followed, read from their start"""
+        for directory in self.paths:
+            for chat_name, (_, file_name) in scan_logs(directory).items():
+                self.rotate_chat_log(chat_name, os.path.join(directory, file_name), directory)
+
+    def _resume_chat_log(self, chat_name, path, directory):
+        """Adds a chat log that is read from the chat's checkpoint on.
+
+            If the chat moved on to a new log since the checkpoint the rest of the old log is read first, followed by
+            the whole new log. Logs whose checkpoint is missing or no longer valid are read from their end.
+        """
+        checkpoint = self.checkpoints.get(directory, chat_name)
+        if checkpoint is None:
+            self.add_chat_log(chat_name, path, directory=directory)
+            return
+
+        if checkpoint['file'] == os.path.basename(path):
+            self.add_chat_log(chat_name, path, get_resume_offset(path, checkpoint), directory)
+            return
+
+        old_path = os.path.join(directory, checkpoint['file'])
+        offset = get_resume_offset(old_path, checkpoint)
+
+        self.add_chat_log(chat_name, path, 0, directory)
+        if offset is not None:
+            with self._lock:
+                self._set_draining((chat_name, directory), (EveChatLogReader(old_path, offset, self.max_bytes),))
+
+    def _set_chat_logs(self, chat_name, chat_logs):
+        chats = dict(self.chats)
+        if chat_logs:
+            chats[chat_name] = chat_logs
+        else:
+            chats.pop(chat_name, None)
+        self.chats = chats
+
+    def _set_draining(self, key, old_chat_logs):
+        draining = dict(self._draining)
+        if old_chat_logs:
+            draining[key] = old_chat_logs
+        else:
+            draining.pop(key, None)
+        self._draining = draining
+
+    def _finish_draining(self, key, old_chat_logs):
+        with self._lock:
+            self._set_draining(key, tuple(old_chat_log for old_chat_log in self._draining.get(key, ())
+                                          if old_chat_log not in old_chat_logs))
+
+        for old_chat_log in old_chat_logs:
+            old_chat_log.destroy()
+
+    def _read_log(self, chat_log, totals):
+        bytes_read, decode_time = chat_log.bytes_read, chat_log.decode_time
+        try:
+            messages = chat_log.read_messages()
+        except ValueError:
+            # closed by the watchdog thread after the log was deleted
+            return []
+        totals[0] += chat_log.bytes_read - bytes_read
+        totals[1] += chat_log.decode_time - decode_time
+
+        return messages
+
+    def read_sources(self, chat_name):
+        """Returns (directory, listener, messages) for each log of a chat with new messages, or None for a chat that
+        is not monitored"""
+        chat_logs = self.chats.get(chat_name)
+        if chat_logs is None:
+            return None
+
+        totals = self.read_totals.get(chat_name)
+        if totals is None:
+            totals = self.read_totals[chat_name] = [0, 0.0]
+
+        sources = []
+        # taken after the logs, a log rotated in between is read as both the current and an old log, never skipped
+        draining = self._draining
+        for directory, chat_log in chat_logs.items():
+            messages = []
+            old_chat_logs = draining.get((chat_name, directory))
+            if old_chat_logs:
+                drained = []
+                for old_chat_log in old_chat_logs:
+                    messages += self._read_log(old_chat_log, totals)
+                    if old_chat_log.is_behind:
+                        break
+                    drained.append(old_chat_log)
+
+                if drained:
+                    self._finish_draining((chat_name, directory), drained)
+
+                if len(drained) < len(old_chat_logs):
+                    # the new log is read once the rest of the old ones is
+                    if messages:
+                        sources.append((directory, chat_log.listener, messages))
+                    continue
+
+            messages += self._read_log(chat_log, totals)
+
+            if messages:
+                sources.append((directory, chat_log.listener, messages))
+
+        return sources
+
+    def is_behind(self, chat_name):
+        """Returns whether the last read of a chat left unread data in one of its logs"""
+        draining = self._draining
+        for directory, chat_log in self.chats.get(chat_name, {}).items():
+            if chat_log.is_behind or any(old_chat_log.is_behind
+                                         for old_chat_log in draining.get((chat_name, directory), ())):
+                return True
+
+        return False
 
     def read_messages(self, chat_name):
-        if chat_name in self.chats:
-            return self.chats[chat_name].read_messages()
+        """Returns the new messages of all logs of a chat, or None for a chat that is not monitored"""
+        sources = self.read_sources(chat_name)
+        if sources is None:
+            return None
 
-        return None
+        messages = []
+        for _, _, source_messages in sources:
+            messages.extend(source_messages)
+
+        return messages
+
+    def save_checkpoint(self, chat_name):
+        """Records how far the logs of a chat were read, does nothing without a checkpoint store"""
+        if self.checkpoints is None:
+            return
+
+        draining = self._draining
+        for directory, chat_log in self.chats.get(chat_name, {}).items():
+            old_chat_logs = draining.get((chat_name, directory))
+            if old_chat_logs:
+                chat_log = old_chat_logs[0]
+
+            position = chat_log.position
+            if chat_log.last_message is None and position:
+                # started at the end or resumed, the message before the position has not been read
+                try:
+                    chat_log.last_message = get_last_message(chat_log.path, position)
+                except OSError:
+                    continue
+
+            self.checkpoints.update(directory, chat_name, chat_log.path, position, chat_log.last_message)
+
+    def save_checkpoints(self):
+        """Records how far the logs of all chats were read"""
+        for chat_name in list(self.chats):
+            self.save_checkpoint(chat_name)
+
+    def get_changed_chats(self, chat_names=None):
+        """Returns the names of the chats whose logs changed since they were last read.
+
+            Only the file metadata is checked, no data is read. Checks all chats if no chat_names are provided.
+        """
+        chats = self.chats
+        draining = self._draining
+        if chat_names is None:
+            chat_names = list(chats)
+
+        changed_chats = []
+        for chat_name in chat_names:
+            for directory, chat_log in chats.get(chat_name, {}).items():
+                if (chat_name, directory) in draining or chat_log.has_changed():
+                    changed_chats.append(chat_name)
+                    break
+
+        return changed_chats
+
+    def remove_chat_log(self, chat_name, directory=None):
+        """Removes the log of a chat in a directory, or in all directories"""
+        with self._lock:
+            chat_logs = self.chats.get(chat_name)
+            if chat_logs is None:
+                return
+
+            directories = list(chat_logs) if directory is None else [directory]
+            remaining_logs = dict(chat_logs)
+            removed_logs = []
+            for directory in directories:
+                removed_logs.extend(self._draining.get((chat_name, directory), ()))
+                self._set_draining((chat_name, directory), ())
+
+                chat_log = remaining_logs.pop(directory, None)
+                if chat_log is not None:
+                    removed_logs.append(chat_log)
+
+            self._set_chat_logs(chat_name, remaining_logs)
+
+        for chat_log in removed_logs:
+            chat_log.destroy()
+
+        if remaining_logs:
+            return
+
+        for removed_callable in self._removed_callables:
+            removed_callable(chat_name)
+
+    def add_chat_log(self, chat_name, path, offset=None, directory=None):
+        if directory is None:
+            directory = self.path
+
+        self.remove_chat_log(chat_name, directory)
+
+        chat_log = EveChatLogReader(path, offset, self.max_bytes)
+        with self._lock:
+            chat_logs = dict(self.chats.get(chat_name, {}))
+            chat_logs[directory] = chat_log
+            self._set_chat_logs(chat_name, chat_logs)
+
+        for added_callable in self._added_callables:
+            added_callable(chat_name)
+
+    def rotate_chat_log(self, chat_name, path, directory=None):
+        """Switches a chat to a new log that is read from its start, once the rest of the current log is read.
 
-    def remove_chat_log(self, chat_name):
-        if chat_name in self.chats:
-            self.chats[chat_name].destroy()
-            del self.chats[chat_name]
+            Logs that are older than the current one are ignored. Adds the log if the chat has none in the directory.
+        """
+        if directory is None:
+            directory = self.path
 
-    def add_chat_log(self, chat_name, path):
-        self.remove_chat_log(chat_name)
-        self.chats[chat_name] = EveChatLogReader(path)
+        chat_log = self.chats.get(chat_name, {}).get(directory)
+        if chat_log is None:
+            self.add_chat_log(chat_name, path, 0, directory)
+            return
+
+        file_name = os.path.basename(path)
+        if not is_newer_log(file_name, os.path.basename(chat_log.path)):
+            return
+
+        new_chat_log = EveChatLogReader(path, 0, self.max_bytes)
+        with self._lock:
+            chat_logs = self.chats.get(chat_name, {})
+            chat_log = chat_logs.get(directory)
+            if chat_log is None or not is_newer_log(file_name, os.path.basename(chat_log.path)):
+                # changed by another thread in the meantime
+                new_chat_log.destroy()
+                return
+
+            key = (chat_name, directory)
+            self._set_draining(key, self._draining.get(key, ()) + (chat_log,))
+
+            chat_logs = dict(chat_logs)
+            chat_logs[directory] = new_chat_log
+            self._set_chat_logs(chat_name, chat_logs)
 
-    def on_delete(self, event):
+        for modified_callable in self._modified_callables:
+            modified_callable(chat_name)
+
+    def on_delete(self, event, directory=None):
         if event.is_directory:
             return
 
@@ -104,21 +529,48 @@ class EveChatLogDirectoryMonitor(object):
 
         chat_name = get_chat_from_file_name(file_name)
 
-        self.remove_chat_log(chat_name)
+        chat_log = self.chats.get(chat_name, {}).get(directory or self.path)
+        if chat_log is None or os.path.split(chat_log.path)[1] != file_name:
+            # an older log of the chat
+            return
+
+        self.remove_chat_log(chat_name, directory or self.path)
 
-    def on_create(self, event):
+    def on_modify(self, event, directory=None):
         if event.is_directory:
             return
 
         file_name = os.path.split(event.src_path)[1]
         chat_name = get_chat_from_file_name(file_name)
 
-        self.add_chat_log(chat_name, event.src_path)
+        key = (chat_name, directory or self.path)
+        chat_log = self.chats.get(chat_name, {}).get(key[1])
+        if chat_log is None:
+            return
+
+        if os.path.split(chat_log.path)[1] != file_name and \
+                not any(os.path.split(old_chat_log.path)[1] == file_name
+                        for old_chat_log in self._draining.get(key, ())):
+            return
+
+        for modified_callable in self._modified_callables:
+            modified_callable(chat_name)
+
+    def on_create(self, event, directory=None):
+        if event.is_directory:
+            return
+
+        file_name = os.path.split(event.src_path)[1]
+        chat_name = get_chat_from_file_name(file_name)
+        if chat_name is None:
+            return
+
+        self.rotate_chat_log(chat_name, event.src_path, directory or self.path)
 
 
 class DirChangeEventHandler(FileSystemEventHandler):
 
-    def __init__(self, new_file_callable, file_deleted_callable):
+    def __init__(self, new_file_callable, file_deleted_callable, file_modified_callable=None):
 
         if not hasattr(new_file_callable, '__call__'):
             raise InvalidCallable("The value passed as '{0}' is not a callable.".format('newFileCallable'))
@@ -126,8 +578,12 @@ class DirChangeEventHandler(FileSystemEventHandler):
         if not hasattr(file_deleted_callable, '__call__'):
             raise InvalidCallable("The value passed as '{0}' is not a callable.".format('file_deleted_callable'))
 
+        if file_modified_callable is not None and not hasattr(file_modified_callable, '__call__'):
+            raise InvalidCallable("The value passed as '{0}' is not a callable.".format('file_modified_callable'))
+
         self.new_file_callable = new_file_callable
         self.file_deleted_callable = file_deleted_callable
+        self.file_modified_callable = file_modified_callable
 
     def on_created(self, event):
         self.new_file_callable(event)
@@ -135,4 +591,8 @@ class DirChangeEventHandler(FileSystemEventHandler):
     def on_deleted(self, event):
         self.file_deleted_callable(event)
 
+    def on_modified(self, event):
+        if self.file_modified_callable:
+            self.file_modified_callable(event)
+
 
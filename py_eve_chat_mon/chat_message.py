@@ -1,50 +1,382 @@
+import codecs
+import os
 import re
 from datetime import datetime
 from hashlib import md5
+from time import perf_counter
+
+LINE_PARSER = re.compile(r'^\s*\[\s(.*?)\s\]\s(.*?)\s>\s(.*?)$', re.DOTALL)
+TIMESTAMP_FORMAT = "%Y.%m.%d %H:%M:%S"
+TIMESTAMP_CACHE_SIZE = 4096
+# a timestamp TIMESTAMP_FORMAT reproduces exactly
+CANONICAL_TIMESTAMP = re.compile(r'[1-9]\d{3}\.\d\d\.\d\d \d\d:\d\d:\d\d', re.ASCII)
+LISTENER_PARSER = re.compile(r'^\s*Listener:\s*(.*?)\s*$', re.MULTILINE)
+# bytes at the start of a log that hold its header
+HEADER_SIZE = 4096
+
+_timestamp_cache = {}
+
+
+def _slice_timestamp(timestamp):
+    return datetime(int(timestamp[0:4]), int(timestamp[5:7]), int(timestamp[8:10]), int(timestamp[11:13]),
+                    int(timestamp[14:16]), int(timestamp[17:19]))
+
+
+if hasattr(datetime, 'fromisoformat'):
+    def _convert_canonical_timestamp(timestamp):
+        # several times faster than converting the sliced fields, Python 3.7+
+        return datetime.fromisoformat(timestamp.replace('.', '-'))
+else:
+    _convert_canonical_timestamp = _slice_timestamp
+
 
 def hash(message):
     return md5(message.encode()).hexdigest()
 
 
-def parse_msg(msg):
-    line_parser = re.compile('^\s*\[\s(.*?)\s\]\s(.*?)\s>\s(.*?)$', re.DOTALL)
-    match = line_parser.match(msg)
+def parse_timestamp(timestamp):
+    """Converts a chat timestamp (e.g. '2015.03.05 21:04:03') into a datetime.
+
+        Well formed timestamps are converted by slicing their fixed position fields instead of using strptime. Results
+        are cached per second as busy chats produce many messages with the same timestamp.
+    """
+    return _get_timestamp_entry(timestamp)[0]
+
+
+def _get_timestamp_entry(timestamp):
+    """Returns the cached (datetime, is_canonical) pair for a chat timestamp.
+
+        A timestamp is canonical if formatting its datetime with TIMESTAMP_FORMAT reproduces it exactly, which is
+        decided by its layout instead of formatting it.
+    """
+    entry = _timestamp_cache.get(timestamp)
+    if entry is not None:
+        return entry
+
+    if CANONICAL_TIMESTAMP.fullmatch(timestamp):
+        entry = (_convert_canonical_timestamp(timestamp), True)
+    else:
+        entry = (datetime.strptime(timestamp, TIMESTAMP_FORMAT), False)
+
+    if len(_timestamp_cache) >= TIMESTAMP_CACHE_SIZE:
+        _timestamp_cache.clear()
+    _timestamp_cache[timestamp] = entry
+
+    return entry
+
+
+class ChatMessage(object):
+    """A parsed chat message.
+
+        Supports the read only dictionary style access (message['username'], keys(), items(), ...) of the message
+        dictionaries previously returned by parse_msg. The hash is computed on first access and the line is rebuilt
+        from its parts unless it deviates from the standard layout.
+
+        Messages read by a monitor are tagged with the chat log directory (source) and the character (listener) whose
+        log they were read from. The tags are attributes only, the same message logged by two characters is equal.
+    """
+    __slots__ = ('timestamp', 'username', 'message', '_line', '_hash', 'source', 'listener')
+
+    fields = ('timestamp', 'username', 'message', 'line', 'hash')
+
+    def __init__(self, timestamp, username, message, line=None, message_hash=None, source=None, listener=None):
+        self.timestamp = timestamp
+        self.username = username
+        self.message = message
+        self._line = line
+        self._hash = message_hash
+        self.source = source
+        self.listener = listener
+
+    def __reduce__(self):
+        # pickled as constructor arguments, which is smaller and faster to load than the default slot state
+        return ChatMessage, (self.timestamp, self.username, self.message, self._line, self._hash, self.source,
+                             self.listener)
+
+    @property
+    def line(self):
+        if self._line is not None:
+            return self._line
+
+        return "[ {0} ] {1} > {2}".format(self.timestamp.strftime(TIMESTAMP_FORMAT), self.username, self.message)
+
+    @property
+    def hash(self):
+        if self._hash is None:
+            self._hash = hash(self.message)
+
+        return self._hash
+
+    def __getitem__(self, key):
+        if key not in ChatMessage.fields:
+            raise KeyError(key)
+
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        if key not in ChatMessage.fields:
+            return default
+
+        return getattr(self, key)
+
+    def __contains__(self, key):
+        return key in ChatMessage.fields
+
+    def __iter__(self):
+        return iter(ChatMessage.fields)
+
+    def __len__(self):
+        return len(ChatMessage.fields)
+
+    def keys(self):
+        return list(ChatMessage.fields)
+
+    def values(self):
+        return [getattr(self, key) for key in ChatMessage.fields]
+
+    def items(self):
+        return [(key, getattr(self, key)) for key in ChatMessage.fields]
+
+    def to_dict(self):
+        return dict(self.items())
+
+    def __eq__(self, other):
+        if isinstance(other, (ChatMessage, dict)):
+            return self.to_dict() == dict(other.items())
+
+        return NotImplemented
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+
+        return not result
+
+    __hash__ = None
+
+    def __repr__(self):
+        return "ChatMessage({0!r})".format(self.to_dict())
+
+
+def new_message(line, timestamp, username, message, source=None, listener=None):
+    """Creates a ChatMessage from the split parts of a chat line.
+
+        The line is only retained when it can not be rebuilt exactly from its parts.
+    """
+    parsed_timestamp, is_canonical = _get_timestamp_entry(timestamp)
+
+    name_length = len(username)
+    if is_canonical and len(line) == 27 + name_length + len(message) and line[0:2] == '[ ' \
+            and line[21:24] == ' ] ' and line[24 + name_length:27 + name_length] == ' > ':
+        line = None
+
+    return ChatMessage(parsed_timestamp, username, message, line, None, source, listener)
+
+
+def split_line(line):
+    """Splits a chat line into its (timestamp, username, message) parts or returns None if it is not a chat message.
+
+        Lines in the standard '[ YYYY.MM.DD HH:MM:SS ] username > message' layout are split by position and only
+        anything else falls back to LINE_PARSER. Both paths yield the same parts.
+    """
+    if line[0:2] == '[ ' and line[21:24] == ' ] ' and ']' not in line[2:21]:
+        index = line.find('>', 25)
+        if index != -1 and line[index - 1].isspace() and line[index + 1:index + 2].isspace() \
+                and not line.endswith('\n'):
+            return line[2:21], line[24:index - 1], line[index + 2:]
+
+    match = LINE_PARSER.match(line)
     if match:
-        timestamp = match.group(1)
-        username = match.group(2)
-        message = match.group(3)
-        message_hash = hash(message)
-        timestamp = datetime.strptime(timestamp, "%Y.%m.%d %H:%M:%S")
-
-        parsed_msg = {"timestamp": timestamp,
-                      "username": username,
-                      "message": message,
-                      "line": msg,
-                      "hash": message_hash}
-        return parsed_msg
+        return match.groups()
 
     return None
 
+
+def get_listener(path):
+    """Returns the name of the character whose log this is from the log header, or None if the header has none"""
+    with open(path, "rb") as file_handle:
+        header = file_handle.read(HEADER_SIZE)
+
+    match = LISTENER_PARSER.search(header[:len(header) - len(header) % 2].decode(EveChatLogReader.encoding, 'replace'))
+    if match:
+        return match.group(1)
+
+    return None
+
+
+def parse_msg(msg):
+    parts = split_line(msg)
+    if parts:
+        return new_message(msg, *parts)
+
+    return None
+
+
+def parse_batch(lines, source=None, listener=None, accept=None):
+    """Parses a list of chat lines into ChatMessages with the same fields as parse_msg.
+
+        Lines that are not chat messages (e.g. the log header) are skipped. The messages are tagged with source and
+        listener. accept is called with the username and message of each line before its timestamp is parsed, lines it
+        returns False for are skipped.
+    """
+    parsed_messages = []
+    append = parsed_messages.append
+    split = split_line
+    get_cached_timestamp = _timestamp_cache.get
+    get_timestamp_entry = _get_timestamp_entry
+    filtered = accept is not None
+
+    # new_message inlined, a call per line costs about as much as the rest of the loop
+    for line in lines:
+        parts = split(line)
+        if parts is None:
+            continue
+
+        timestamp, username, message = parts
+        if filtered and not accept(username, message):
+            continue
+
+        entry = get_cached_timestamp(timestamp) or get_timestamp_entry(timestamp)
+
+        name_length = len(username)
+        if entry[1] and len(line) == 27 + name_length + len(message) and line[0:2] == '[ ' \
+                and line[21:24] == ' ] ' and line[24 + name_length:27 + name_length] == ' > ':
+            line = None
+
+        append(ChatMessage(entry[0], username, message, line, None, source, listener))
+
+    return parsed_messages
+
+
+def split_messages(buffer):
+    """Splits decoded chat log text on the record delimiter into clean message lines"""
+    clean_messages = []
+    for msg in buffer.split(EveChatLogReader.chat_line_delimiter):
+        msg = msg.rstrip()
+        if msg:
+            clean_messages.append(msg)
+
+    return clean_messages
+
+
+def split_complete(buffer):
+    """Splits decoded chat log text into complete records and a trailing partial record.
+
+        A record is complete once it is terminated by a new line or followed by the next record delimiter.
+    """
+    if buffer.endswith('\n'):
+        return buffer, ''
+
+    index = buffer.rfind(EveChatLogReader.chat_line_delimiter)
+    if index == -1:
+        return '', buffer
+
+    return buffer[:index], buffer[index:]
+
+
 class EveChatLogReader(object):
     chat_line_delimiter = u"\ufeff"
+    encoding = "utf-16-le"
+
+    def __init__(self, path, offset=None, max_bytes=None):
+        """Opens a chat log, reading starts at its end or, to resume reading it, at a byte offset.
 
-    def __init__(self, path):
+            With max_bytes each read_messages reads at most that many bytes, the rest of the log is left for the next
+            calls, see is_behind.
+        """
         self.path = path
-        self.file_handle = open(path, "r", encoding="utf-16-le")
-        self.file_handle.read(None)
+        self.max_bytes = max_bytes
+        self.is_behind = False
+        self.file_handle = open(path, "rb")
+        if offset is None:
+            self.offset = self.file_handle.seek(0, os.SEEK_END)
+        else:
+            self.offset = self.file_handle.seek(offset)
+
+        if self.offset % 2:
+            # never start decoding in the middle of a UTF-16 code unit
+            self.offset = self.file_handle.seek(self.offset - 1)
+
+        self._decoder = codecs.getincrementaldecoder(self.encoding)()
+        self._pending = ''
+        self._listener = None
+        self._listener_read = False
+        self.last_message = None
+        # totals of the bytes read and the seconds spent reading and decoding them
+        self.bytes_read = 0
+        self.decode_time = 0.0
+
+        stat = os.fstat(self.file_handle.fileno())
+        self.size = stat.st_size
+        self.mtime = stat.st_mtime
+
+        if offset is not None and self.offset < self.size:
+            # the rest of the log has not been read yet
+            self.size = None
+
+    @property
+    def listener(self):
+        """The name of the character whose log this is, read from the log header on first use"""
+        if self._listener is None and not self._listener_read:
+            try:
+                self._listener = get_listener(self.path)
+            except OSError:
+                return None
+
+            # the header of a new log may not have been written yet, it is complete once there is more
+            self._listener_read = self.offset > 0
+
+        return self._listener
+
+    @property
+    def position(self):
+        """The byte offset just past the last complete message returned by read_messages"""
+        return self.offset - len(self._pending.encode(self.encoding)) - len(self._decoder.getstate()[0])
+
+    def has_changed(self):
+        """Returns whether the size or modification time of the log changed since it was last read"""
+        stat = os.fstat(self.file_handle.fileno())
+        return stat.st_size != self.size or stat.st_mtime != self.mtime
 
     def read_messages(self):
-        buffer = self.file_handle.read(None)
-        clean_messages = []
-        if buffer:
-            messages = buffer.split(EveChatLogReader.chat_line_delimiter)
-            for i in range(len(messages)):
-                if messages[i] and messages[i] != '':
-                    msg = messages[i].replace(EveChatLogReader.chat_line_delimiter, '')
-                    msg = re.sub('\s*$', '', msg)
-                    clean_messages.append(msg)
-
-        return clean_messages
+        stat = os.fstat(self.file_handle.fileno())
+        if stat.st_size == self.size and stat.st_mtime == self.mtime:
+            return []
+
+        self.size = stat.st_size
+        self.mtime = stat.st_mtime
+
+        if stat.st_size < self.offset:
+            # the log was truncated, start over from its beginning
+            self._rewind()
+
+        start = perf_counter()
+        data = self.file_handle.read(self.max_bytes) if self.max_bytes else self.file_handle.read()
+        if not data:
+            self.is_behind = False
+            return []
+
+        self.offset += len(data)
+        self.is_behind = self.offset < stat.st_size
+        if self.is_behind:
+            # the rest of the log is read by the next call even if the log does not change until then
+            self.size = None
+        buffer, self._pending = split_complete(self._pending + self._decoder.decode(data))
+
+        messages = split_messages(buffer)
+        if messages:
+            self.last_message = messages[-1]
+
+        self.bytes_read += len(data)
+        self.decode_time += perf_counter() - start
+        return messages
+
+    def _rewind(self):
+        self.offset = self.file_handle.seek(0)
+        self._decoder.reset()
+        self._pending = ''
+        self.last_message = None
 
     def destroy(self):
         self.file_handle.close()
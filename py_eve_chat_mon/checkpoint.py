@@ -0,0 +1,128 @@
+import json
+import os
+from threading import Lock
+from time import monotonic
+from .chat_message import EveChatLogReader, hash, split_messages
+
+CHECKPOINT_VERSION = 1
+# bytes read back from a log to find the message a checkpoint was taken after
+VERIFY_WINDOW = 16384
+
+
+def get_last_message(path, offset):
+    """Returns the last complete message of a log before a byte offset, or None if there is none"""
+    start = max(offset - VERIFY_WINDOW, 0)
+    start -= start % 2
+    with open(path, "rb") as file_handle:
+        file_handle.seek(start)
+        data = file_handle.read(offset - start)
+
+    messages = split_messages(data.decode(EveChatLogReader.encoding, 'replace'))
+    return messages[-1] if messages else None
+
+
+def get_resume_offset(path, checkpoint):
+    """Returns the offset to resume reading a log at if the checkpoint is still valid for it, otherwise None.
+
+        A checkpoint is valid if the log still has a complete message ending at the offset with the checkpoint's hash,
+        so a log that was replaced or rewritten is not resumed in the middle of a message.
+    """
+    offset = checkpoint['offset']
+    try:
+        if os.path.getsize(path) < offset:
+            return None
+
+        message = get_last_message(path, offset)
+    except OSError:
+        return None
+
+    if (hash(message) if message is not None else None) != checkpoint['hash']:
+        return None
+
+    return offset
+
+
+class CheckpointStore(object):
+    """Remembers how far the log of each chat was read, so a restarted monitor continues where it stopped.
+
+        Checkpoints are kept per chat log directory as {'file': file name, 'offset': byte offset after the last
+        handled message, 'hash': hash of that message}. Updates are held in memory and written at most once per
+        flush_interval seconds, to a temporary file that replaces the store, so a crash never leaves a partially written
+        store. Updates are written by the next update or flush_if_due after the interval, a monitor calls flush_if_due
+        from its poll loop so a crash loses at most the last interval. Messages of that interval are read again after
+        a restart.
+    """
+
+    def __init__(self, path, flush_interval=1.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self._lock = Lock()
+        self._dirty = False
+        self._last_flush = monotonic()
+        self._checkpoints = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as store_file:
+                store = json.load(store_file)
+        except (OSError, ValueError):
+            return {}
+
+        if not isinstance(store, dict) or store.get('version') != CHECKPOINT_VERSION:
+            return {}
+
+        return store['directories']
+
+    def get(self, directory, chat_name):
+        """Returns the checkpoint of a chat in a chat log directory or None"""
+        with self._lock:
+            return self._checkpoints.get(os.path.abspath(directory), {}).get(chat_name)
+
+    def update(self, directory, chat_name, path, offset, message):
+        """Records that the log at path was handled up to offset, message being the last message before it"""
+        checkpoint = {'file': os.path.basename(path),
+                      'offset': offset,
+                      'hash': hash(message) if message is not None else None}
+
+        with self._lock:
+            self._checkpoints.setdefault(os.path.abspath(directory), {})[chat_name] = checkpoint
+            self._dirty = True
+            due = monotonic() - self._last_flush >= self.flush_interval
+
+        if due:
+            self.flush()
+
+    def flush_if_due(self):
+        """Writes the checkpoints if they changed and flush_interval passed since they were last written.
+
+            Returns the seconds until the checkpoints that are not written yet are due, None if there are none.
+        """
+        with self._lock:
+            if not self._dirty:
+                return None
+            remaining = self.flush_interval - (monotonic() - self._last_flush)
+
+        if remaining > 0:
+            return remaining
+
+        self.flush()
+        return None
+
+    def flush(self):
+        """Writes the checkpoints if they changed since they were last written"""
+        with self._lock:
+            if not self._dirty:
+                return
+
+            store = {'version': CHECKPOINT_VERSION,
+                     'directories': self._checkpoints}
+
+            temp_path = self.path + ".tmp"
+            with open(temp_path, "w", encoding="utf-8") as store_file:
+                json.dump(store, store_file)
+                store_file.flush()
+                os.fsync(store_file.fileno())
+            os.replace(temp_path, self.path)
+
+            self._dirty = False
+            self._last_flush = monotonic()
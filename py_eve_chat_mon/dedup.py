@@ -0,0 +1,84 @@
+from collections import OrderedDict
+from datetime import timedelta
+from threading import Lock
+from .exceptions import InvalidCallable
+
+
+class DuplicateFilter(object):
+    """A handler that passes each message on to the wrapped handler only once.
+
+        Use it as the handler of a Monitor that follows the same chat in the logs of several characters:
+
+            Monitor(chats, [path_one, path_two], DuplicateFilter(handler))
+
+        Messages are the same if they were sent to the same chat at the same time by the same user with the same body.
+        A message repeated within the log of one character (source and listener) is passed on as often as it was
+        repeated there, only the copies in the logs of other characters are dropped. Messages without source and
+        listener are counted as copies of each other. Messages are remembered for window seconds past the newest
+        message seen and at most max_entries of them, the copies of a message are written to the logs of all clients
+        within seconds.
+    """
+
+    def __init__(self, handler, window=60, max_entries=100000):
+        if not hasattr(handler, '__call__'):
+            raise InvalidCallable("The value passed as '{0}' is not a callable.".format('handler'))
+
+        self.handler = handler
+        self.window = timedelta(seconds=window)
+        self.max_entries = max_entries
+        self.duplicates = 0
+
+        self._lock = Lock()
+        self._seen = OrderedDict()
+        self._newest = None
+
+    def __call__(self, chat, messages):
+        unique_messages = self.filter(chat, messages)
+        if unique_messages:
+            self.handler(chat, unique_messages)
+
+    def filter(self, chat, messages):
+        """Returns the messages of a chat that were not seen before and remembers them"""
+        unique_messages = []
+
+        with self._lock:
+            seen = self._seen
+            for message in messages:
+                # the hash of the body is enough next to chat, time and user and keeps the entries small
+                key = (chat, message.timestamp, message.username, hash(message.message))
+                entry = seen.get(key)
+                if entry is None:
+                    # timestamp, occurrences passed on, occurrences per log
+                    entry = seen[key] = [message.timestamp, 0, {}]
+
+                occurrence = 1
+                log = (message.source, message.listener)
+                if log != (None, None):
+                    occurrence = entry[2][log] = entry[2].get(log, 0) + 1
+
+                if occurrence <= entry[1]:
+                    self.duplicates += 1
+                    continue
+
+                entry[1] = occurrence
+                unique_messages.append(message)
+
+                if self._newest is None or message.timestamp > self._newest:
+                    self._newest = message.timestamp
+
+            self._expire()
+
+        return unique_messages
+
+    def _expire(self):
+        seen = self._seen
+        while len(seen) > self.max_entries:
+            seen.popitem(last=False)
+
+        if self._newest is not None:
+            cutoff = self._newest - self.window
+            while seen and next(iter(seen.values()))[0] < cutoff:
+                seen.popitem(last=False)
+
+    def __len__(self):
+        return len(self._seen)
@@ -0,0 +1,189 @@
+import logging
+from collections import deque
+from itertools import count
+from threading import Thread, Condition, current_thread
+from time import monotonic
+from .exceptions import InvalidCallable, InvalidDispatchPolicy, InvalidMonitorState
+
+logger = logging.getLogger(__name__)
+
+BLOCK = 'block'
+DROP_OLDEST = 'drop_oldest'
+COALESCE = 'coalesce'
+
+
+class HandlerDispatcher(object):
+    """A handler that hands batches of messages to a pool of worker threads calling the wrapped handler.
+
+        Use it as the handler of a Monitor so a slow handler does not stall reading:
+
+            Monitor(chats, path, HandlerDispatcher(handler, workers=4))
+
+        The batches of a chat are handled one at a time and in order. Once max_queue batches are waiting the overflow
+        policy applies:
+
+        - BLOCK: wait until a worker takes a batch
+        - DROP_OLDEST: drop the oldest waiting batch of any chat
+        - COALESCE: append the messages to the newest waiting batch of the chat, or wait if it has none
+
+        workers and max_queue have to be at least 1.
+    """
+
+    def __init__(self, handler, workers=4, max_queue=1000, overflow=BLOCK):
+        if not hasattr(handler, '__call__'):
+            raise InvalidCallable("The value passed as '{0}' is not a callable.".format('handler'))
+
+        if overflow not in (BLOCK, DROP_OLDEST, COALESCE):
+            raise InvalidDispatchPolicy(overflow)
+
+        if workers < 1:
+            raise ValueError("A dispatcher needs at least one worker, got {0}".format(workers))
+
+        if max_queue < 1:
+            raise ValueError("A dispatcher needs room for at least one batch, got max_queue={0}".format(max_queue))
+
+        self.handler = handler
+        self.max_queue = max_queue
+        self.overflow = overflow
+        self.is_alive = True
+
+        self._condition = Condition()
+        self._pending = {}
+        self._ready = deque()
+        self._busy = set()
+        self._depth = 0
+        self._sequence = count()
+        self._stats = {'max_queue_depth': 0,
+                       'handled_batches': 0,
+                       'handler_errors': 0,
+                       'dropped_batches': 0,
+                       'dropped_messages': 0,
+                       'coalesced_batches': 0,
+                       'handler_time': 0.0,
+                       'max_handler_time': 0.0,
+                       'queue_time': 0.0,
+                       'max_queue_time': 0.0}
+
+        self.threads = []
+        for i in range(workers):
+            thread = Thread(target=self._work, name="HandlerDispatcher-{0}".format(i))
+            thread.daemon = True
+            thread.start()
+            self.threads.append(thread)
+
+    def __call__(self, chat, messages):
+        with self._condition:
+            if not self.is_alive:
+                raise InvalidMonitorState("Dispatcher closed")
+
+            while self._depth >= self.max_queue:
+                if self.overflow == DROP_OLDEST:
+                    self._drop_oldest()
+                elif self.overflow == COALESCE and self._pending.get(chat):
+                    batch = self._pending[chat][-1]
+                    batch[2] = batch[2] + messages
+                    self._stats['coalesced_batches'] += 1
+                    return
+                else:
+                    self._condition.wait()
+                    if not self.is_alive:
+                        raise InvalidMonitorState("Dispatcher closed")
+
+            queue = self._pending.get(chat)
+            if queue is None:
+                queue = self._pending[chat] = deque()
+
+            if not queue and chat not in self._busy:
+                self._ready.append(chat)
+
+            queue.append([next(self._sequence), monotonic(), messages])
+            self._depth += 1
+            self._stats['max_queue_depth'] = max(self._stats['max_queue_depth'], self._depth)
+            self._condition.notify_all()
+
+    @property
+    def queue_depth(self):
+        return self._depth
+
+    def get_stats(self):
+        """Returns a snapshot of the queue depth, drop and handler latency statistics"""
+        with self._condition:
+            stats = dict(self._stats)
+            stats['queue_depth'] = self._depth
+
+        handled = stats['handled_batches']
+        stats['avg_handler_time'] = stats['handler_time'] / handled if handled else 0.0
+        stats['avg_queue_time'] = stats['queue_time'] / handled if handled else 0.0
+        return stats
+
+    def close(self, wait=True):
+        """Stops accepting batches. The workers finish the waiting batches and exit"""
+        with self._condition:
+            self.is_alive = False
+            self._condition.notify_all()
+
+        if wait:
+            for thread in self.threads:
+                if thread is not current_thread():
+                    thread.join()
+
+    def _drop_oldest(self):
+        oldest_chat = None
+        oldest_sequence = None
+        for chat, queue in self._pending.items():
+            if queue and (oldest_sequence is None or queue[0][0] < oldest_sequence):
+                oldest_chat = chat
+                oldest_sequence = queue[0][0]
+
+        queue = self._pending[oldest_chat]
+        _, _, messages = queue.popleft()
+        self._depth -= 1
+        self._stats['dropped_batches'] += 1
+        self._stats['dropped_messages'] += len(messages)
+
+        if not queue:
+            del self._pending[oldest_chat]
+            if oldest_chat not in self._busy:
+                self._ready.remove(oldest_chat)
+
+    def _work(self):
+        while True:
+            with self._condition:
+                while not self._ready and self.is_alive:
+                    self._condition.wait()
+
+                if not self._ready:
+                    return
+
+                chat = self._ready.popleft()
+                _, enqueued_at, messages = self._pending[chat].popleft()
+                self._depth -= 1
+                self._busy.add(chat)
+                self._condition.notify_all()
+
+            started_at = monotonic()
+            try:
+                self.handler(chat, messages)
+                failed = False
+            except Exception:
+                logger.exception("Handler failed for chat '%s'", chat)
+                failed = True
+            finished_at = monotonic()
+
+            with self._condition:
+                self._busy.discard(chat)
+                if self._pending.get(chat):
+                    self._ready.append(chat)
+                    self._condition.notify_all()
+                else:
+                    self._pending.pop(chat, None)
+
+                handler_time = finished_at - started_at
+                queue_time = started_at - enqueued_at
+                stats = self._stats
+                stats['handled_batches'] += 1
+                stats['handler_errors'] += failed
+                stats['handler_time'] += handler_time
+                stats['max_handler_time'] = max(stats['max_handler_time'], handler_time)
+                stats['queue_time'] += queue_time
+                stats['max_queue_time'] = max(stats['max_queue_time'], queue_time)
@@ -32,3 +32,9 @@ class InvalidMonitorState(EveChatMonException):
 class ObserverAlreadyAdded(EveChatMonException):
     def __init__(self):
         super(ObserverAlreadyAdded, self).__init__("File monitor already initialized")
+
+class InvalidDispatchPolicy(EveChatMonException):
+    """Exception raised when an unknown overflow policy is requested for a handler dispatcher"""
+    def __init__(self, policy):
+        super(InvalidDispatchPolicy, self).__init__("Unknown overflow policy '{0}'".format(policy))
+        self.policy = policy
@@ -0,0 +1,62 @@
+import re
+from .subscription import ChatSubscription
+
+
+class MessageFilter(object):
+    """Selects messages by user, chat and body before they are parsed.
+
+        A filter matches the messages of the users in usernames whose body contains one of the contains substrings and
+        matches pattern (a regular expression searched in the body), each criterion only applies if it is given.
+        chats takes the same patterns as a Monitor and limits the filter to those chats.
+
+        A Monitor keeps only the messages that match all of its filters and drops those matching an exclude filter:
+
+            Monitor(chats, path, handler, filters=[MessageFilter(usernames=['EVE System'], exclude=True),
+                                                   MessageFilter(chats=['Intel*'], pattern=r'(?i)\\bred\\b')])
+    """
+
+    def __init__(self, usernames=None, chats=None, contains=None, pattern=None, exclude=False):
+        self.usernames = frozenset(usernames) if usernames is not None else None
+        self.subscription = ChatSubscription(chats) if chats is not None else None
+        self.contains = (contains,) if isinstance(contains, str) else contains
+        self.expression = re.compile(pattern) if isinstance(pattern, str) else pattern
+        self.exclude = exclude
+
+    def applies_to(self, chat):
+        return self.subscription is None or self.subscription.matches(chat)
+
+    def matches(self, username, message):
+        if self.usernames is not None and username not in self.usernames:
+            return False
+
+        if self.contains is not None and not any(substring in message for substring in self.contains):
+            return False
+
+        if self.expression is not None and not self.expression.search(message):
+            return False
+
+        return True
+
+
+def build_line_filter(chat, filters):
+    """Returns a callable that tells whether a message of a chat passes the filters given its username and body, or
+    None if none of the filters apply to the chat"""
+    filters = [message_filter for message_filter in filters if message_filter.applies_to(chat)]
+    if not filters:
+        return None
+
+    includes = [message_filter for message_filter in filters if not message_filter.exclude]
+    excludes = [message_filter for message_filter in filters if message_filter.exclude]
+
+    def accept(username, message):
+        for message_filter in excludes:
+            if message_filter.matches(username, message):
+                return False
+
+        for message_filter in includes:
+            if not message_filter.matches(username, message):
+                return False
+
+        return True
+
+    return accept
@@ -0,0 +1,166 @@
+import mmap
+import os
+from .chat_message import EveChatLogReader, TIMESTAMP_FORMAT, split_messages
+
+ENCODING = EveChatLogReader.encoding
+DELIMITER = EveChatLogReader.chat_line_delimiter.encode(ENCODING)
+NEW_LINE = "\n".encode(ENCODING)
+TIMESTAMP_START = "[ ".encode(ENCODING)
+TIMESTAMP_END = " ]".encode(ENCODING)
+# byte offsets of the timestamp in a record with a standard '[ YYYY.MM.DD HH:MM:SS ]' header
+TIMESTAMP_OFFSET = len(TIMESTAMP_START)
+TIMESTAMP_LENGTH = 2 * len("YYYY.MM.DD HH:MM:SS")
+# ranges below this many bytes are scanned instead of bisected
+BISECT_MIN = 65536
+# bytes of records decoded at once
+CHUNK_SIZE = 1048576
+
+
+def encode_timestamp(timestamp):
+    """Encodes a datetime like the timestamps in a log, which compare like the times they represent"""
+    return timestamp.strftime(TIMESTAMP_FORMAT).encode(ENCODING)
+
+
+def find_delimiter(buffer, start, end):
+    """Returns the offset of the first record delimiter in buffer[start:end] or -1.
+
+        A delimiter only counts at an even offset, odd offsets are bytes of two neighbouring code units.
+    """
+    position = buffer.find(DELIMITER, start, end)
+    while position != -1 and position % 2:
+        position = buffer.find(DELIMITER, position + 1, end)
+
+    return position
+
+
+def rfind_delimiter(buffer, start, end):
+    """Returns the offset of the last record delimiter in buffer[start:end] or -1"""
+    position = buffer.rfind(DELIMITER, start, end)
+    while position != -1 and position % 2:
+        position = buffer.rfind(DELIMITER, start, position + 1)
+
+    return position
+
+
+def get_record_timestamp(buffer, start):
+    """Returns the encoded timestamp of the record starting at start without decoding it, None for non standard
+    records such as the log header"""
+    timestamp_end = start + TIMESTAMP_OFFSET + TIMESTAMP_LENGTH
+    if buffer[start:start + TIMESTAMP_OFFSET] != TIMESTAMP_START \
+            or buffer[timestamp_end:timestamp_end + len(TIMESTAMP_END)] != TIMESTAMP_END:
+        return None
+
+    return buffer[start + TIMESTAMP_OFFSET:timestamp_end]
+
+
+def find_time(buffer, timestamp, start, end):
+    """Returns an offset in buffer[start:end] at which no earlier record has a timestamp at or after timestamp.
+
+        Bisects the records, which are in chronological order in a log, until the range is small enough to scan.
+    """
+    low, high = start, end
+    while high - low > BISECT_MIN:
+        middle = (low + high) // 2
+        middle -= middle % 2
+
+        record = find_delimiter(buffer, middle, high)
+        while record != -1:
+            record_timestamp = get_record_timestamp(buffer, record + len(DELIMITER))
+            if record_timestamp is not None:
+                break
+            record = find_delimiter(buffer, record + len(DELIMITER), high)
+
+        if record == -1 or record_timestamp >= timestamp:
+            high = middle
+        else:
+            low = record
+
+    return low
+
+
+def seek_time(buffer, timestamp, start, end):
+    """Returns the offset of the first record in buffer[start:end] with a timestamp at or after timestamp, or end"""
+    position = find_time(buffer, timestamp, start, end)
+    while position < end:
+        record = position
+        if buffer[record:record + len(DELIMITER)] == DELIMITER:
+            record += len(DELIMITER)
+
+        record_timestamp = get_record_timestamp(buffer, record)
+        if record_timestamp is not None and record_timestamp >= timestamp:
+            return position
+
+        position = find_delimiter(buffer, record, end)
+        if position == -1:
+            break
+
+    return end
+
+
+class MappedChatLog(object):
+    """Reads a chat log through a memory map instead of a file handle.
+
+        Returns the same messages as EveChatLogReader.read_messages, but finds the record delimiters in the mapped
+        bytes and decodes the records it returns a chunk at a time, so records outside of a time range are never
+        decoded and a large log is never held as one string. Meant for catching up on large logs, reading starts at
+        offset.
+    """
+
+    def __init__(self, path, offset=0):
+        self.path = path
+        self.file_handle = open(path, "rb")
+        self.position = offset - offset % 2
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def read_messages(self, since=None, until=None):
+        """Returns the complete messages after the position and moves the position past them.
+
+            With since or until, both datetimes in EVE time, only the messages sent in [since, until) are returned.
+            Records outside of the range are skipped by bisecting the log on the timestamps of record headers, without
+            decoding them.
+        """
+        size = os.fstat(self.file_handle.fileno()).st_size
+        size -= size % 2
+        if size <= self.position:
+            return []
+
+        with mmap.mmap(self.file_handle.fileno(), size, access=mmap.ACCESS_READ) as buffer:
+            return self._read_records(buffer, size, since, until)
+
+    def _read_records(self, buffer, size, since, until):
+        start = self.position
+        if buffer[size - len(NEW_LINE):size] == NEW_LINE:
+            end = size
+        else:
+            # the last record is still being written
+            end = rfind_delimiter(buffer, start, size)
+            if end == -1:
+                return []
+
+        stop = end
+        if since is not None:
+            start = seek_time(buffer, encode_timestamp(since), start, end)
+        if until is not None:
+            stop = seek_time(buffer, encode_timestamp(until), start, end)
+
+        messages = []
+        with memoryview(buffer) as view:
+            while start < stop:
+                # decodes whole records a chunk at a time, the next chunk starts at a delimiter
+                chunk_end = find_delimiter(buffer, start + CHUNK_SIZE, stop) if stop - start > CHUNK_SIZE else -1
+                if chunk_end == -1:
+                    chunk_end = stop
+
+                messages.extend(split_messages(str(view[start:chunk_end], ENCODING, 'replace')))
+                start = chunk_end
+
+        self.position = end
+        return messages
+
+    def close(self):
+        self.file_handle.close()
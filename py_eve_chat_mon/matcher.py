@@ -0,0 +1,134 @@
+import re
+from threading import Lock
+from .exceptions import InvalidCallable
+
+
+def build_pattern(keywords):
+    """Returns a regular expression matching any of the keywords.
+
+        The keywords are merged into a trie first, so keywords with a common prefix share one branch and the cost of a
+        match grows with the length of the keywords rather than their number. Longer keywords win over their prefixes.
+    """
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for character in keyword:
+            node = node.setdefault(character, {})
+        node[''] = None
+
+    return _build_node_pattern(trie)
+
+
+def _build_node_pattern(node):
+    branches = []
+    characters = []
+    for character in sorted(key for key in node if key):
+        child_pattern = _build_node_pattern(node[character])
+        if child_pattern:
+            branches.append(re.escape(character) + child_pattern)
+        else:
+            characters.append(re.escape(character))
+
+    if len(characters) == 1:
+        branches.append(characters[0])
+    elif characters:
+        branches.append("[{0}]".format(''.join(characters)))
+
+    if not branches:
+        return ''
+
+    if '' in node:
+        return "(?:{0})?".format('|'.join(branches))
+
+    if len(branches) == 1:
+        return branches[0]
+
+    return "(?:{0})".format('|'.join(branches))
+
+
+class KeywordMatcher(object):
+    """A handler that calls subscribers for the messages that mention keywords, e.g. system, ship or pilot names.
+
+        All keywords are compiled into one regular expression, by default matching case insensitively and only whole
+        words. Subscribers are called with the chat, the message and the set of keywords it mentions:
+
+            matcher = KeywordMatcher(['Jita', 'Amarr', 'Some Pilot'])
+            matcher.add_subscriber(alert)
+            Monitor(chats, path, matcher)
+    """
+
+    def __init__(self, keywords=(), case_sensitive=False, whole_words=True):
+        self.case_sensitive = case_sensitive
+        self.whole_words = whole_words
+
+        self._lock = Lock()
+        self._keywords = {}
+        self._subscribers = []
+        self._expression = None
+
+        self.add_keywords(keywords)
+
+    def _normalize(self, keyword):
+        return keyword if self.case_sensitive else keyword.lower()
+
+    def add_keywords(self, keywords):
+        with self._lock:
+            for keyword in keywords:
+                if keyword:
+                    self._keywords[self._normalize(keyword)] = keyword
+            self._expression = None
+
+    def add_subscriber(self, subscriber, keywords=None):
+        """Registers a callable that is called with (chat, message, keywords) for every message mentioning keywords.
+
+            With keywords it is only called for messages mentioning at least one of them.
+        """
+        if not hasattr(subscriber, '__call__'):
+            raise InvalidCallable("The value passed as '{0}' is not a callable.".format('subscriber'))
+
+        if keywords is not None:
+            self.add_keywords(keywords)
+            keywords = frozenset(self._normalize(keyword) for keyword in keywords)
+
+        self._subscribers.append((subscriber, keywords))
+
+    def _compile(self):
+        with self._lock:
+            if self._expression is None:
+                pattern = build_pattern(self._keywords)
+                if self.whole_words:
+                    # unlike \b also works for keywords starting or ending with a non word character
+                    pattern = r"(?<!\w){0}(?!\w)".format(pattern)
+                self._expression = re.compile(pattern, 0 if self.case_sensitive else re.IGNORECASE)
+
+            return self._expression
+
+    def _find(self, text):
+        """Returns the set of normalized keywords mentioned in a text"""
+        if not self._keywords:
+            return set()
+
+        expression = self._expression or self._compile()
+        if self.case_sensitive:
+            return set(expression.findall(text))
+
+        return set(match.lower() for match in expression.findall(text))
+
+    def match(self, text):
+        """Returns the set of keywords mentioned in a text"""
+        keywords = self._keywords
+        return set(keywords[keyword] for keyword in self._find(text) if keyword in keywords)
+
+    def __call__(self, chat, messages):
+        keywords = self._keywords
+        for message in messages:
+            found = self._find(message.message)
+            if not found:
+                continue
+
+            matched_keywords = None
+            for subscriber, subscribed_keywords in self._subscribers:
+                if subscribed_keywords is None or not subscribed_keywords.isdisjoint(found):
+                    if matched_keywords is None:
+                        matched_keywords = set(keywords[keyword] for keyword in found if keyword in keywords)
+                    subscriber(chat, message, matched_keywords)
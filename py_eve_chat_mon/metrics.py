@@ -0,0 +1,150 @@
+import socketserver
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from threading import Lock, Thread
+
+# (name, Prometheus type, help) of the metrics kept for each chat
+CHAT_METRICS = (('reads', 'counter', "Reads of the chat's logs that returned new messages"),
+                ('bytes_read', 'counter', "Bytes read from the chat's logs"),
+                ('decode_seconds', 'counter', "Seconds spent reading and decoding the chat's logs"),
+                ('lines', 'counter', "Message lines read from the chat's logs"),
+                ('messages', 'counter', "Messages parsed, after filters"),
+                ('parse_seconds', 'counter', "Seconds spent parsing messages"),
+                ('handler_calls', 'counter', "Calls of the handler"),
+                ('handler_seconds', 'counter', "Seconds spent in the handler"),
+                ('ingest_lag_seconds', 'gauge', "Wall clock minus the time of the oldest message of the last read"),
+                ('max_ingest_lag_seconds', 'gauge', "Largest ingest lag seen"))
+
+CYCLE_METRICS = (('cycles', 'counter', "Poll cycles that read at least one chat"),
+                 ('cycle_seconds', 'counter', "Seconds spent in poll cycles"),
+                 ('last_cycle_seconds', 'gauge', "Duration of the last poll cycle"),
+                 ('max_cycle_seconds', 'gauge', "Longest poll cycle"))
+
+PREFIX = "eve_chat_"
+
+
+def escape_label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class MonitorMetrics(object):
+    """Collects where a Monitor spends its time, pass one as its metrics to turn the instrumentation on:
+
+            metrics = MonitorMetrics()
+            Monitor(chats, path, handler, metrics=metrics)
+            metrics.get_metrics()
+
+        For each chat it counts the bytes read and the time spent reading and decoding them, the lines read, the
+        messages parsed and the time spent parsing them and in the handler. The ingest lag is the wall clock minus the
+        time the oldest message of a read was sent, both in EVE time, so it includes how long the client took to write
+        the message and is only accurate to a second. Everything is measured per read of a chat, not per message.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._chats = {}
+        self._cycles = dict((name, 0) for name, _, _ in CYCLE_METRICS)
+
+    def _get_chat(self, chat):
+        chat_metrics = self._chats.get(chat)
+        if chat_metrics is None:
+            chat_metrics = self._chats[chat] = dict((name, 0) for name, _, _ in CHAT_METRICS)
+
+        return chat_metrics
+
+    def record_read(self, chat, read_totals, lines, messages, parse_seconds, oldest_timestamp=None):
+        """Records a read of a chat. read_totals are the [bytes read, decode seconds] of the chat's logs so far"""
+        lag = (datetime.utcnow() - oldest_timestamp).total_seconds() if oldest_timestamp is not None else None
+
+        with self._lock:
+            chat_metrics = self._get_chat(chat)
+            chat_metrics['reads'] += 1
+            if read_totals is not None:
+                chat_metrics['bytes_read'], chat_metrics['decode_seconds'] = read_totals
+            chat_metrics['lines'] += lines
+            chat_metrics['messages'] += messages
+            chat_metrics['parse_seconds'] += parse_seconds
+            if lag is not None:
+                chat_metrics['ingest_lag_seconds'] = lag
+                chat_metrics['max_ingest_lag_seconds'] = max(chat_metrics['max_ingest_lag_seconds'], lag)
+
+    def record_handler(self, chat, seconds):
+        with self._lock:
+            chat_metrics = self._get_chat(chat)
+            chat_metrics['handler_calls'] += 1
+            chat_metrics['handler_seconds'] += seconds
+
+    def record_cycle(self, seconds):
+        with self._lock:
+            cycles = self._cycles
+            cycles['cycles'] += 1
+            cycles['cycle_seconds'] += seconds
+            cycles['last_cycle_seconds'] = seconds
+            cycles['max_cycle_seconds'] = max(cycles['max_cycle_seconds'], seconds)
+
+    def get_metrics(self):
+        """Returns a snapshot of the poll cycle metrics and the metrics of each chat"""
+        with self._lock:
+            metrics = dict(self._cycles)
+            metrics['chats'] = dict((chat, dict(chat_metrics)) for chat, chat_metrics in self._chats.items())
+
+        return metrics
+
+    def render_prometheus(self):
+        """Returns the metrics in the Prometheus text format"""
+        metrics = self.get_metrics()
+        lines = []
+        for name, metric_type, description in CYCLE_METRICS:
+            lines.append("# HELP {0}{1} {2}".format(PREFIX, name, description))
+            lines.append("# TYPE {0}{1} {2}".format(PREFIX, name, metric_type))
+            lines.append("{0}{1} {2}".format(PREFIX, name, metrics[name]))
+
+        for name, metric_type, description in CHAT_METRICS:
+            lines.append("# HELP {0}{1} {2}".format(PREFIX, name, description))
+            lines.append("# TYPE {0}{1} {2}".format(PREFIX, name, metric_type))
+            for chat, chat_metrics in sorted(metrics['chats'].items()):
+                lines.append('{0}{1}{{chat="{2}"}} {3}'.format(PREFIX, name, escape_label(chat), chat_metrics[name]))
+
+        return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+
+        body = self.server.metrics.render_prometheus().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _MetricsHTTPServer(socketserver.ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class MetricsServer(object):
+    """Serves MonitorMetrics at /metrics in the Prometheus text format, on localhost by default.
+
+        Port 0 picks a free port, the bound address is in the address attribute.
+    """
+
+    def __init__(self, metrics, address=('127.0.0.1', 9108)):
+        self.server = _MetricsHTTPServer(address, _MetricsHandler)
+        self.server.metrics = metrics
+        self.address = self.server.server_address
+
+        self.thread = Thread(target=self.server.serve_forever, kwargs={'poll_interval': 0.1}, name="MetricsServer")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
@@ -1,33 +1,75 @@
-from threading import Thread
-from time import sleep
+from threading import Thread, Event, current_thread
+from time import perf_counter, sleep
 from .chat_directory import EveChatLogDirectoryMonitor
-from .chat_message import parse_msg
+from .chat_message import parse_batch
+from .checkpoint import CheckpointStore
+from .filters import build_line_filter
 from .exceptions import InvalidMonitorState
+from .scheduler import ChatScheduler, get_poll_rates
+from .subscription import ChatSubscription
 
 class Monitor:
-    """An Eve chat monitor"""
+    """An Eve chat monitor.
 
-    def __init__(self, chats, path, handler, poll_rate=2):
+        path is a chat log directory or a list of them, one per EVE client, install or profile. All directories are
+        served by the same poll thread and watchdog observer.
+    """
+
+    def __init__(self, chats, path, handler, poll_rate=2, use_events=False, coalesce_delay=0.01,
+                 max_poll_rate=None, backoff=2.0, chat_poll_rates=None, index_path=None, checkpoint_path=None,
+                 filters=None, metrics=None, max_bytes=None):
         self.chats = chats
-        self.chat_log_monitor = EveChatLogDirectoryMonitor(path)
+        self.subscription = ChatSubscription(chats)
+        self.checkpoints = CheckpointStore(checkpoint_path) if checkpoint_path else None
+        self.chat_log_monitor = EveChatLogDirectoryMonitor(path, index_path, self.checkpoints, max_bytes)
+        self.max_bytes = max_bytes
         self.handler = handler
         self.is_alive = False
         self.thread = None
         self.poll_rate = poll_rate
+        self.use_events = use_events
+        self.coalesce_delay = coalesce_delay
+        self.chat_poll_rates = chat_poll_rates or {}
+        self.filters = list(filters or ())
+        self._line_filters = {}
+        self.metrics = metrics
+        self.scheduler = ChatScheduler(poll_rate, max_poll_rate, backoff)
+        self._wakeup = Event()
+
+        self.chat_log_monitor.add_chat_added_callable(self._on_chat_added)
+        self.chat_log_monitor.add_chat_removed_callable(self._on_chat_removed)
+        for chat in self.chat_log_monitor.find_chats(self.subscription):
+            self._on_chat_added(chat)
+
+        if use_events:
+            self.chat_log_monitor.add_modified_callable(self._on_chat_modified)
 
     def stop(self):
         if not self.is_alive:
             raise InvalidMonitorState("Monitor not started")
         self.is_alive = False
+        self._wakeup.set()
+
+        self.chat_log_monitor.stop()
 
         if self.thread:
-            self.thread.stop()
+            if self.thread is not current_thread():
+                self.thread.join()
             self.thread = None
 
+        self._flush_checkpoints()
+
     def start(self):
         if self.is_alive:
             raise InvalidMonitorState("Monitor already started")
         self.is_alive = True
+        self._wakeup.clear()
+
+        self.chat_log_monitor.start()
+        if self.checkpoints:
+            # chats that stay quiet still resume from here
+            self.chat_log_monitor.save_checkpoints()
+
         self.thread = Thread(target=self.poll)
         self.thread.daemon = True  # thread dies when main thread (only non-daemon thread) exits.
         self.thread.start()
@@ -35,17 +77,118 @@ class Monitor:
     def _should_poll(self):
         return self.is_alive
 
+    def _wake(self):
+        self._wakeup.set()
+
+    def _on_chat_added(self, chat_name):
+        if self.subscription.matches(chat_name):
+            self.scheduler.add(chat_name, *get_poll_rates(self.chat_poll_rates.get(chat_name)))
+            self._wake()
+
+    def _on_chat_removed(self, chat_name):
+        self.scheduler.remove(chat_name)
+
+    def _on_chat_modified(self, chat_name):
+        if chat_name in self.scheduler:
+            self.scheduler.wake(chat_name)
+            self._wake()
+
+    def _wait(self, timeout):
+        """Waits until the next chat is due or, when using events, until a monitored chat log changes.
+
+            Once woken by an event it waits another coalesce_delay seconds so a burst of writes is read in one sweep.
+        """
+        if self._wakeup.wait(timeout) and self.use_events and self.coalesce_delay:
+            sleep(self.coalesce_delay)
+
+        self._wakeup.clear()
+
+    def _wake_if_behind(self, chat):
+        """Makes a chat whose logs were not read to their end due again, after the chats due now"""
+        if self.max_bytes and self.chat_log_monitor.is_behind(chat):
+            self.scheduler.wake(chat)
+
+    def _get_line_filter(self, chat):
+        """Returns the filters of a chat combined into one callable, see build_line_filter"""
+        if not self.filters:
+            return None
+
+        if chat not in self._line_filters:
+            self._line_filters[chat] = build_line_filter(chat, self.filters)
+
+        return self._line_filters[chat]
+
+    def _read_chat(self, chat):
+        """Reads and parses the new messages of a chat, returns the parsed messages and whether there were any.
+
+            The messages are tagged with the directory and listener of the log they were read from.
+        """
+        sources = self.chat_log_monitor.read_sources(chat)
+        if not sources:
+            return None, False
+
+        accept = self._get_line_filter(chat)
+        start = perf_counter() if self.metrics is not None else None
+
+        parsed_messages = []
+        for directory, listener, messages in sources:
+            parsed_messages.extend(parse_batch(messages, directory, listener, accept))
+
+        if start is not None:
+            self.metrics.record_read(chat, self.chat_log_monitor.read_totals.get(chat),
+                                     sum(len(messages) for _, _, messages in sources), len(parsed_messages),
+                                     perf_counter() - start, parsed_messages[0].timestamp if parsed_messages else None)
+
+        return parsed_messages, True
+
+    def _get_wait_timeout(self):
+        """Returns the seconds to wait for the next due chat, or until the pending checkpoints have to be written.
+
+            Writes the checkpoints that are due, so they are written after the last activity as well.
+        """
+        timeout = self.scheduler.time_until_next()
+        if timeout is None:
+            timeout = self.poll_rate
+
+        if self.checkpoints:
+            flush_timeout = self.checkpoints.flush_if_due()
+            if flush_timeout is not None:
+                timeout = min(timeout, flush_timeout)
+
+        return timeout
+
+    def _flush_checkpoints(self):
+        if self.checkpoints:
+            self.chat_log_monitor.save_checkpoints()
+            self.checkpoints.flush()
+
+    def _poll_chat(self, chat):
+        """Reads and handles the new messages of a chat, returns whether there were any"""
+        parsed_messages, active = self._read_chat(chat)
+        if parsed_messages:
+            if self.metrics is None:
+                self.handler(chat, parsed_messages)
+            else:
+                start = perf_counter()
+                self.handler(chat, parsed_messages)
+                self.metrics.record_handler(chat, perf_counter() - start)
+
+        if active and self.checkpoints:
+            self.chat_log_monitor.save_checkpoint(chat)
+
+        return active
+
     def poll(self):
         while self._should_poll():
-            for chat in self.chats:
-                messages = self.chat_log_monitor.read_messages(chat)
-                if messages:
-                    parsed_messages = []
-                    for message in messages:
-                        parsed_messages.append(parse_msg(message))
-
-                    self.handler(chat, parsed_messages)
-            sleep(self.poll_rate)
+            due = self.scheduler.pop_due()
+            start = perf_counter()
+            for chat in due:
+                self.scheduler.update(chat, self._poll_chat(chat))
+                self._wake_if_behind(chat)
+            if due and self.metrics is not None:
+                self.metrics.record_cycle(perf_counter() - start)
+
+            self._wait(self._get_wait_timeout())
 
 
 
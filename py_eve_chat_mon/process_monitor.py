@@ -0,0 +1,335 @@
+import json
+import logging
+import multiprocessing
+import os
+import struct
+from multiprocessing.shared_memory import SharedMemory
+from threading import Thread, current_thread
+from .chat_directory import validate_directory
+from .chat_message import ChatMessage, TIMESTAMP_FORMAT, parse_timestamp
+from .exceptions import InvalidCallable, InvalidMonitorState
+from .monitor import Monitor
+
+logger = logging.getLogger(__name__)
+
+# write and read positions, both count the bytes ever written or read so they never wrap
+RING_HEADER = struct.Struct('=QQ')
+RING_POSITION = struct.Struct('=Q')
+RECORD_HEADER = struct.Struct('=I')
+
+
+def encode_messages(chat, messages):
+    """Encodes the messages of a chat into a compact JSON record.
+
+        The source and listener pairs are stored once per record and a line is only kept if it deviates from the one
+        ChatMessage builds from the parts.
+    """
+    sources = []
+    source_indexes = {}
+    records = []
+    last_timestamp = None
+    encoded_timestamp = None
+    for message in messages:
+        if message.timestamp is not last_timestamp:
+            last_timestamp = message.timestamp
+            encoded_timestamp = last_timestamp.strftime(TIMESTAMP_FORMAT)
+
+        source = (message.source, message.listener)
+        source_index = source_indexes.get(source)
+        if source_index is None:
+            source_index = source_indexes[source] = len(sources)
+            sources.append(source)
+
+        line = message._line
+        if line is not None and line == "[ {0} ] {1} > {2}".format(encoded_timestamp, message.username,
+                                                                     message.message):
+            line = None
+
+        records.append((encoded_timestamp, message.username, message.message, line, source_index))
+
+    return json.dumps((chat, sources, records), ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def decode_messages(data):
+    """Returns the (chat, messages) of a record encoded by encode_messages"""
+    chat, sources, records = json.loads(data.decode('utf-8'))
+    return chat, [ChatMessage(parse_timestamp(timestamp), username, message, line, None, *sources[source_index])
+                  for timestamp, username, message, line, source_index in records]
+
+
+class SharedRingBuffer(object):
+    """A ring buffer of byte records in shared memory, for one process writing and one process reading.
+
+        The positions are read and written under a lock, the records themselves are copied without it. Pass the ring
+        to a child process as an argument of its Process.
+    """
+
+    def __init__(self, size=16777216, mp_context=None):
+        context = mp_context or multiprocessing.get_context()
+        self.size = size
+        self._memory = SharedMemory(create=True, size=RING_HEADER.size + size)
+        # a forked child inherits the ring as it is
+        self._owner_pid = os.getpid()
+        self._lock = context.Lock()
+        self._data_available = context.Event()
+        self._space_available = context.Event()
+        self._attach()
+
+    def _attach(self):
+        self._header = self._memory.buf[:RING_HEADER.size]
+        self._data = self._memory.buf[RING_HEADER.size:RING_HEADER.size + self.size]
+
+    def __getstate__(self):
+        return (self._memory.name, self._owner_pid, self.size, self._lock, self._data_available,
+                self._space_available)
+
+    def __setstate__(self, state):
+        name, self._owner_pid, self.size, self._lock, self._data_available, self._space_available = state
+        self._memory = SharedMemory(name)
+        self._attach()
+
+    def _get_positions(self):
+        with self._lock:
+            return RING_HEADER.unpack_from(self._header)
+
+    def get_used(self):
+        """Returns the number of bytes written but not read yet"""
+        write_position, read_position = self._get_positions()
+        return write_position - read_position
+
+    def _copy_in(self, position, data):
+        offset = position % self.size
+        first = min(len(data), self.size - offset)
+        self._data[offset:offset + first] = data[:first]
+        self._data[:len(data) - first] = data[first:]
+
+    def _copy_out(self, position, length):
+        offset = position % self.size
+        first = min(length, self.size - offset)
+        return bytes(self._data[offset:offset + first]) + bytes(self._data[:length - first])
+
+    def _try_put(self, data):
+        size = RECORD_HEADER.size + len(data)
+        write_position, read_position = self._get_positions()
+        if self.size - (write_position - read_position) < size:
+            return False
+
+        self._copy_in(write_position, memoryview(RECORD_HEADER.pack(len(data)) + data))
+        with self._lock:
+            RING_POSITION.pack_into(self._header, 0, write_position + size)
+
+        self._data_available.set()
+        return True
+
+    def put(self, data, timeout=None):
+        """Appends a record, waits up to timeout seconds for space. Returns whether the record was written"""
+        if RECORD_HEADER.size + len(data) > self.size:
+            raise ValueError("Record of {0} bytes does not fit into the ring buffer".format(len(data)))
+
+        if self._try_put(data):
+            return True
+
+        if timeout == 0:
+            return False
+
+        self._space_available.clear()
+        if self._try_put(data):
+            return True
+
+        return self._space_available.wait(timeout) and self._try_put(data)
+
+    def _take(self):
+        write_position, read_position = self._get_positions()
+        if write_position == read_position:
+            return []
+
+        records = []
+        position = read_position
+        while position < write_position:
+            length = RECORD_HEADER.unpack(self._copy_out(position, RECORD_HEADER.size))[0]
+            records.append(self._copy_out(position + RECORD_HEADER.size, length))
+            position += RECORD_HEADER.size + length
+
+        with self._lock:
+            RING_POSITION.pack_into(self._header, RING_POSITION.size, position)
+
+        self._space_available.set()
+        return records
+
+    def get(self, timeout=None):
+        """Returns all records written since the last call, waits up to timeout seconds for one if there are none"""
+        records = self._take()
+        if records or timeout == 0:
+            return records
+
+        self._data_available.clear()
+        records = self._take()
+        if records:
+            return records
+
+        self._data_available.wait(timeout)
+        return self._take()
+
+    def close(self):
+        """Detaches from the shared memory, the process that created the ring also frees it"""
+        self._header.release()
+        self._data.release()
+        self._memory.close()
+        if os.getpid() == self._owner_pid:
+            self._memory.unlink()
+
+
+class _RingPublisher(object):
+    """The handler of the Monitor in the child process. Once abort is set messages that do not fit into the ring are
+    dropped and on_drop is called"""
+
+    def __init__(self, ring, abort, on_drop=None):
+        self.ring = ring
+        self.abort = abort
+        self.on_drop = on_drop
+        self.max_record_size = ring.size // 2
+
+    def __call__(self, chat, messages):
+        data = encode_messages(chat, messages)
+        if len(data) > self.max_record_size and len(messages) > 1:
+            middle = len(messages) // 2
+            self(chat, messages[:middle])
+            self(chat, messages[middle:])
+            return
+
+        while not self.ring.put(data, 0.1):
+            if self.abort.is_set():
+                if self.on_drop is not None:
+                    self.on_drop()
+                return
+
+
+def _ingest(ring, stop, abort, chats, path, kwargs):
+    """Runs a Monitor that publishes into the ring until stop is set, in the child process"""
+    def stop_checkpoints():
+        # a checkpoint past the dropped messages would skip them for good, the next start re-reads them instead
+        monitor.checkpoints = None
+
+    monitor = Monitor(chats, path, _RingPublisher(ring, abort, stop_checkpoints), **kwargs)
+    monitor.start()
+    try:
+        stop.wait()
+    finally:
+        monitor.stop()
+        ring.close()
+
+
+class ProcessMonitor(object):
+    """An Eve chat monitor that reads and parses the chat logs in a child process.
+
+        Takes the same arguments as Monitor and calls the handler the same way, from a thread of this process. The
+        child publishes the parsed messages into a SharedRingBuffer of ring_size bytes, so a busy handler or other
+        Python threads of this process do not compete with reading for the GIL. Reading only waits for the handler once
+        the ring is full.
+
+        The other arguments are passed to the Monitor in the child and have to be picklable, metrics are not shared
+        between the processes. mp_context is a multiprocessing context, e.g. multiprocessing.get_context('spawn').
+        stop waits stop_timeout seconds for the child to hand over its messages and save its checkpoints. After that the
+        messages it could not publish are dropped and no more checkpoints are saved, so a restart reads them again.
+
+        If the child process fails, e.g. because an argument can not be pickled, the failure is logged and stop raises
+        InvalidMonitorState. exitcode is the exit code of the child once it exited.
+    """
+
+    def __init__(self, chats, path, handler, ring_size=16777216, stop_timeout=10.0, mp_context=None, **kwargs):
+        if not hasattr(handler, '__call__'):
+            raise InvalidCallable("The value passed as '{0}' is not a callable.".format('handler'))
+
+        for directory in ([path] if isinstance(path, str) else path):
+            validate_directory(directory)
+
+        self.chats = chats
+        self.path = path
+        self.handler = handler
+        self.ring_size = ring_size
+        self.stop_timeout = stop_timeout
+        self.kwargs = kwargs
+        self.is_alive = False
+        self.process = None
+        self.exitcode = None
+        self.thread = None
+        self._context = mp_context or multiprocessing.get_context()
+        self._ring = None
+        self._stats = {'batches': 0,
+                       'messages': 0,
+                       'bytes': 0,
+                       'max_ring_used': 0}
+
+    def start(self):
+        if self.is_alive:
+            raise InvalidMonitorState("Monitor already started")
+        self.is_alive = True
+        self.exitcode = None
+
+        self._ring = SharedRingBuffer(self.ring_size, self._context)
+        self._stop = self._context.Event()
+        self._abort = self._context.Event()
+        self.process = self._context.Process(target=_ingest, name="ProcessMonitor",
+                                             args=(self._ring, self._stop, self._abort, self.chats, self.path,
+                                                   self.kwargs))
+        self.process.daemon = True
+        self.process.start()
+
+        self.thread = Thread(target=self.poll, name="ProcessMonitor")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        if not self.is_alive:
+            raise InvalidMonitorState("Monitor not started")
+        self.is_alive = False
+
+        self._stop.set()
+        self.process.join(self.stop_timeout)
+        if self.process.is_alive():
+            self._abort.set()
+            self.process.join()
+
+        if self.thread is not current_thread():
+            self.thread.join()
+        self.thread = None
+        self.process = None
+        self._ring = None
+
+        if self.exitcode:
+            raise InvalidMonitorState("The ingest process failed with exit code {0}".format(self.exitcode))
+
+    def get_stats(self):
+        """Returns the batches, messages and bytes received so far and the most bytes that were waiting in the ring"""
+        return dict(self._stats)
+
+    def _handle(self, records):
+        stats = self._stats
+        stats['batches'] += len(records)
+        for data in records:
+            stats['bytes'] += len(data)
+            chat, messages = decode_messages(data)
+            stats['messages'] += len(messages)
+            self.handler(chat, messages)
+
+    def poll(self):
+        """Hands the messages published by the child process to the handler until the child exited"""
+        ring = self._ring
+        process = self.process
+        stats = self._stats
+        try:
+            while True:
+                stats['max_ring_used'] = max(stats['max_ring_used'], ring.get_used())
+                records = ring.get(0.1)
+                if records:
+                    self._handle(records)
+                elif not process.is_alive():
+                    # published before the child exited
+                    self._handle(ring.get(0))
+                    break
+        finally:
+            ring.close()
+
+        self.exitcode = process.exitcode
+        if self.exitcode:
+            logger.error("The ingest process exited with code %s", self.exitcode)
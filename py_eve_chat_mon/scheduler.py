@@ -0,0 +1,147 @@
+import heapq
+from itertools import count
+from threading import Lock
+from time import monotonic
+
+
+class ChatSchedule(object):
+    """The poll interval settings and state of a single chat"""
+
+    __slots__ = ('min_interval', 'max_interval', 'interval', 'deadline', 'woken')
+
+    def __init__(self, min_interval, max_interval):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.interval = min_interval
+        self.deadline = None
+        self.woken = False
+
+
+class ChatScheduler(object):
+    """Decides when each chat is polled next.
+
+        Each chat has its own deadline. A chat that had new messages is polled again after its min_interval, every idle
+        poll multiplies its interval by backoff until it reaches its max_interval. With max_interval equal to
+        min_interval a chat is polled at a fixed rate.
+
+        Chats returned by pop_due are not polled again until they are rescheduled with update.
+    """
+
+    def __init__(self, min_interval, max_interval=None, backoff=2.0):
+        self.min_interval = min_interval
+        self.max_interval = min_interval if max_interval is None else max_interval
+        self.backoff = backoff
+        self._schedules = {}
+        self._deadlines = []
+        self._sequence = count()
+        self._lock = Lock()
+
+    def __contains__(self, chat):
+        return chat in self._schedules
+
+    def __len__(self):
+        return len(self._schedules)
+
+    def add(self, chat, min_interval=None, max_interval=None, now=None):
+        """Adds a chat that is due immediately. Intervals that are not provided default to the scheduler's"""
+        if min_interval is None:
+            min_interval = self.min_interval
+
+        if max_interval is None:
+            max_interval = max(min_interval, self.max_interval)
+
+        with self._lock:
+            schedule = ChatSchedule(min_interval, max_interval)
+            self._schedules[chat] = schedule
+            self._push(chat, schedule, self._now(now))
+
+    def remove(self, chat):
+        with self._lock:
+            self._schedules.pop(chat, None)
+
+    def wake(self, chat, now=None):
+        """Makes a chat due immediately and resets its interval, e.g. because its log was modified"""
+        with self._lock:
+            schedule = self._schedules.get(chat)
+            if schedule is None:
+                return
+
+            schedule.interval = schedule.min_interval
+            now = self._now(now)
+            if schedule.deadline is None:
+                # the chat is being polled right now, poll it again as soon as it is rescheduled
+                schedule.woken = True
+            elif schedule.deadline > now:
+                self._push(chat, schedule, now)
+
+    def pop_due(self, now=None):
+        """Returns the chats whose deadline has passed, earliest deadline first"""
+        now = self._now(now)
+        due = []
+
+        with self._lock:
+            while self._deadlines and self._deadlines[0][0] <= now:
+                deadline, _, chat = heapq.heappop(self._deadlines)
+                schedule = self._schedules.get(chat)
+
+                # skip entries of removed chats and entries superseded by a newer deadline
+                if schedule is not None and schedule.deadline == deadline:
+                    schedule.deadline = None
+                    due.append(chat)
+
+        return due
+
+    def update(self, chat, active, now=None):
+        """Schedules the next poll of a chat based on whether its last poll returned messages"""
+        with self._lock:
+            schedule = self._schedules.get(chat)
+            if schedule is None or schedule.deadline is not None:
+                return
+
+            if active:
+                schedule.interval = schedule.min_interval
+            else:
+                schedule.interval = min(schedule.interval * self.backoff, schedule.max_interval)
+
+            delay = schedule.interval
+            if schedule.woken:
+                schedule.woken = False
+                delay = 0
+
+            self._push(chat, schedule, self._now(now) + delay)
+
+    def get_interval(self, chat):
+        schedule = self._schedules.get(chat)
+        return schedule.interval if schedule else None
+
+    def time_until_next(self, now=None):
+        """Returns the seconds until the next chat is due or None if no chat is scheduled"""
+        with self._lock:
+            while self._deadlines:
+                deadline, _, chat = self._deadlines[0]
+                schedule = self._schedules.get(chat)
+                if schedule is not None and schedule.deadline == deadline:
+                    return max(0, deadline - self._now(now))
+
+                heapq.heappop(self._deadlines)
+
+        return None
+
+    def _push(self, chat, schedule, deadline):
+        schedule.deadline = deadline
+        heapq.heappush(self._deadlines, (deadline, next(self._sequence), chat))
+
+    @staticmethod
+    def _now(now):
+        return monotonic() if now is None else now
+
+
+def get_poll_rates(poll_rates):
+    """Returns the (min, max) poll rates of a chat_poll_rates entry, which is a single poll rate or a (min, max) pair"""
+    if poll_rates is None:
+        return None, None
+
+    if isinstance(poll_rates, (tuple, list)):
+        return poll_rates[0], poll_rates[1]
+
+    return poll_rates, poll_rates
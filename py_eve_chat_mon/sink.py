@@ -0,0 +1,348 @@
+import json
+import logging
+import os
+import socket
+import socketserver
+import struct
+import zlib
+from threading import Thread, Condition, current_thread
+from time import monotonic
+from .chat_message import ChatMessage, TIMESTAMP_FORMAT, parse_timestamp
+from .exceptions import InvalidMonitorState
+
+logger = logging.getLogger(__name__)
+
+# big endian length of the compressed payload that follows
+FRAME_HEADER = struct.Struct('>I')
+MAX_FRAME_SIZE = 67108864
+
+
+def encode_batch(batch, level=6):
+    """Encodes a list of (chat, messages) into a frame, the length of the payload followed by the zlib compressed JSON
+    payload"""
+    chats = []
+    last_timestamp = None
+    encoded_timestamp = None
+    for chat, messages in batch:
+        records = []
+        for message in messages:
+            if message.timestamp is not last_timestamp:
+                last_timestamp = message.timestamp
+                encoded_timestamp = last_timestamp.strftime(TIMESTAMP_FORMAT)
+            records.append((encoded_timestamp, message.username, message.message, message.source, message.listener))
+
+        if chats and chats[-1][0] == chat:
+            chats[-1][1].extend(records)
+        else:
+            chats.append((chat, records))
+
+    payload = zlib.compress(json.dumps(chats, ensure_ascii=False, separators=(',', ':')).encode('utf-8'), level)
+    return FRAME_HEADER.pack(len(payload)) + payload
+
+
+def decode_frame(payload):
+    """Returns the list of (chat, messages) of a frame's payload"""
+    return [(chat, [ChatMessage(parse_timestamp(timestamp), username, message, source=source, listener=listener)
+                    for timestamp, username, message, source, listener in records])
+            for chat, records in json.loads(zlib.decompress(payload).decode('utf-8'))]
+
+
+def read_frame(stream):
+    """Returns the payload of the next frame of a binary stream, None at its end or after an incomplete frame"""
+    header = stream.read(FRAME_HEADER.size)
+    if len(header) < FRAME_HEADER.size:
+        return None
+
+    size = FRAME_HEADER.unpack(header)[0]
+    if size > MAX_FRAME_SIZE:
+        raise ValueError("Frame of {0} bytes exceeds the maximum frame size".format(size))
+
+    payload = stream.read(size)
+    return payload if len(payload) == size else None
+
+
+class NetworkSink(object):
+    """A handler that streams messages to a central server over one persistent connection.
+
+        address is a (host, port) tuple for TCP or the path of a Unix socket. Messages are collected into batches of up
+        to batch_size messages or batch_interval seconds, encoded by encode_batch and sent by a background thread, so
+        the monitor never waits for the network:
+
+            Monitor(chats, path, NetworkSink(('chat.example.com', 5555), spool_path='chat.spool'))
+
+        While the server is unreachable the sink reconnects at most every reconnect_interval seconds and appends the
+        frames to the file at spool_path, up to max_spool_size bytes, messages beyond that or without a spool are
+        dropped. Spooled frames are sent first once the connection is back. A frame may be sent twice if the
+        connection fails while sending it.
+    """
+
+    def __init__(self, address, batch_size=1000, batch_interval=1.0, spool_path=None, max_spool_size=67108864,
+                 reconnect_interval=1.0, timeout=5.0, level=6):
+        self.address = address
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self.spool_path = spool_path
+        self.max_spool_size = max_spool_size
+        self.reconnect_interval = reconnect_interval
+        self.timeout = timeout
+        self.level = level
+        self.is_alive = True
+
+        self._condition = Condition()
+        self._batch = []
+        self._batch_size = 0
+        self._batch_start = None
+        self._socket = None
+        self._last_connect = None
+        # frames left over by an earlier run are sent first
+        self._spool_offset = 0
+        self._spool_size = os.path.getsize(spool_path) if spool_path and os.path.isfile(spool_path) else 0
+        self._stats = {'sent_frames': 0,
+                       'sent_messages': 0,
+                       'sent_bytes': 0,
+                       'spooled_frames': 0,
+                       'dropped_messages': 0,
+                       'connects': 0,
+                       'connect_errors': 0}
+
+        self.thread = Thread(target=self._run, name="NetworkSink")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def __call__(self, chat, messages):
+        with self._condition:
+            if not self.is_alive:
+                raise InvalidMonitorState("Sink closed")
+
+            if not self._batch:
+                # the sender waits for the end of the batch interval from now on
+                self._batch_start = monotonic()
+                self._condition.notify_all()
+
+            self._batch.append((chat, messages))
+            self._batch_size += len(messages)
+            if self._batch_size >= self.batch_size:
+                self._condition.notify_all()
+
+    def get_stats(self):
+        """Returns a snapshot of the sent, spooled and dropped frames and messages"""
+        with self._condition:
+            stats = dict(self._stats)
+            stats['pending_messages'] = self._batch_size
+            stats['spool_size'] = self._spool_size - self._spool_offset
+            stats['is_connected'] = self._socket is not None
+
+        return stats
+
+    def close(self, wait=True):
+        """Stops accepting messages. The sender sends or spools the last batch and closes the connection"""
+        with self._condition:
+            self.is_alive = False
+            self._condition.notify_all()
+
+        if wait and self.thread is not current_thread():
+            self.thread.join()
+
+    def _get_wait_time(self):
+        timeout = None
+        if self._batch:
+            timeout = self._batch_start + self.batch_interval - monotonic()
+        if self._spool_size:
+            timeout = self.reconnect_interval if timeout is None else min(timeout, self.reconnect_interval)
+
+        return timeout
+
+    def _take_batch(self):
+        """Takes the waiting messages up to batch_size of them, whole handler calls at a time"""
+        size = 0
+        index = 0
+        while index < len(self._batch) and size < self.batch_size:
+            size += len(self._batch[index][1])
+            index += 1
+
+        batch = self._batch[:index]
+        del self._batch[:index]
+        self._batch_size -= size
+
+        return batch, size
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self.is_alive and self._batch_size < self.batch_size:
+                    timeout = self._get_wait_time()
+                    if timeout is not None and timeout <= 0:
+                        break
+                    if not self._condition.wait(timeout) and self._spool_size and not self._batch:
+                        break
+
+                batch, size = self._take_batch()
+                is_done = not self.is_alive and not self._batch
+
+            if batch:
+                self._send(encode_batch(batch, self.level), size)
+            elif self._spool_size and self._connect():
+                self._send_spool()
+
+            if is_done:
+                break
+
+        self._disconnect()
+
+    def _connect(self):
+        if self._socket is not None:
+            return True
+
+        now = monotonic()
+        if self._last_connect is not None and now - self._last_connect < self.reconnect_interval:
+            return False
+        self._last_connect = now
+
+        try:
+            if isinstance(self.address, str):
+                connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                connection.settimeout(self.timeout)
+                try:
+                    connection.connect(self.address)
+                except OSError:
+                    connection.close()
+                    raise
+            else:
+                connection = socket.create_connection(self.address, self.timeout)
+        except OSError as e:
+            logger.debug("Could not connect to %s: %s", self.address, e)
+            self._count('connect_errors')
+            return False
+
+        self._socket = connection
+        self._count('connects')
+        return True
+
+    def _disconnect(self):
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+
+    def _count(self, stat, value=1):
+        with self._condition:
+            self._stats[stat] += value
+
+    def _send(self, frame, size):
+        if self._connect() and self._send_spool():
+            try:
+                self._socket.sendall(frame)
+                with self._condition:
+                    self._stats['sent_frames'] += 1
+                    self._stats['sent_messages'] += size
+                    self._stats['sent_bytes'] += len(frame)
+                return
+            except OSError as e:
+                logger.warning("Lost connection to %s: %s", self.address, e)
+                self._disconnect()
+
+        self._spool(frame, size)
+
+    def _spool(self, frame, size):
+        if self.spool_path is None or self._spool_size + len(frame) > self.max_spool_size:
+            self._count('dropped_messages', size)
+            return
+
+        try:
+            with open(self.spool_path, "ab") as spool:
+                spool.write(frame)
+        except OSError as e:
+            logger.error("Could not spool %s messages to %s: %s", size, self.spool_path, e)
+            self._count('dropped_messages', size)
+            try:
+                # a partly written frame would garble the frames spooled after it
+                os.truncate(self.spool_path, self._spool_size)
+            except OSError:
+                pass
+            return
+
+        with self._condition:
+            self._spool_size += len(frame)
+            self._stats['spooled_frames'] += 1
+
+    def _send_spool(self):
+        """Sends the spooled frames and empties the spool, returns False if the connection failed"""
+        if not self._spool_size:
+            return True
+
+        with open(self.spool_path, "rb") as spool:
+            spool.seek(self._spool_offset)
+            while True:
+                position = spool.tell()
+                payload = read_frame(spool)
+                if payload is None:
+                    break
+
+                try:
+                    self._socket.sendall(FRAME_HEADER.pack(len(payload)) + payload)
+                except OSError as e:
+                    logger.warning("Lost connection to %s: %s", self.address, e)
+                    self._disconnect()
+                    self._spool_offset = position
+                    return False
+
+                self._count('sent_frames')
+                self._count('sent_bytes', FRAME_HEADER.size + len(payload))
+
+        open(self.spool_path, "wb").close()
+        with self._condition:
+            self._spool_offset = 0
+            self._spool_size = 0
+
+        return True
+
+
+class _TCPServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+if hasattr(socketserver, 'ThreadingUnixStreamServer'):
+    class _UnixServer(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+
+
+class _FrameHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        while True:
+            try:
+                payload = read_frame(self.rfile)
+            except (OSError, ValueError) as e:
+                logger.warning("Dropping connection: %s", e)
+                return
+
+            if payload is None:
+                return
+
+            for chat, messages in decode_frame(payload):
+                self.server.chat_handler(chat, messages)
+
+
+class SinkReceiver(object):
+    """Receives the frames of NetworkSinks and calls handler with (chat, messages) for each chat in them.
+
+        A stand-in for a central server, e.g. in tests. address is a (host, port) tuple or the path of a Unix socket,
+        port 0 picks a free port, the bound address is in the address attribute.
+    """
+
+    def __init__(self, address, handler):
+        server_class = _UnixServer if isinstance(address, str) else _TCPServer
+        self.server = server_class(address, _FrameHandler)
+        self.server.chat_handler = handler
+        self.address = self.server.server_address
+
+        self.thread = Thread(target=self.server.serve_forever, kwargs={'poll_interval': 0.1}, name="SinkReceiver")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.remove(self.address)
@@ -0,0 +1,174 @@
+from datetime import datetime, timedelta
+from threading import Lock
+from .exceptions import InvalidCallable
+
+EPOCH = datetime(1970, 1, 1)
+
+
+class SpaceSaving(object):
+    """Counts the most frequent items of a stream in at most capacity counters.
+
+        Once all counters are taken a new item takes over the counter of a least frequent item and its count, so counts
+        are upper bounds that are off by at most errors[item]. Every item seen more often than the stream length divided
+        by the capacity is guaranteed to be counted. Items are grouped by their count, which makes each add O(1).
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+        self._items = {}
+        self._min = 0
+
+    def add(self, item):
+        counts = self.counts
+        items = self._items
+
+        count = counts.get(item)
+        if count is None:
+            if len(counts) < self.capacity:
+                count = 0
+            else:
+                count = self._min
+                evicted = items[count].pop()
+                if not items[count]:
+                    del items[count]
+                del counts[evicted]
+                del self.errors[evicted]
+            self.errors[item] = count
+        else:
+            items[count].discard(item)
+            if not items[count]:
+                del items[count]
+
+        count += 1
+        counts[item] = count
+        if count in items:
+            items[count].add(item)
+        else:
+            items[count] = {item}
+
+        if count < self._min or self._min not in items:
+            self._min = count
+
+    def __len__(self):
+        return len(self.counts)
+
+
+def get_top(counts, size):
+    """Returns the size (item, count) pairs with the highest counts"""
+    return sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:size]
+
+
+class ChatStatistics(object):
+    """A handler that keeps rolling message rates by chat and the top talkers, optionally passing messages to handler.
+
+        Counts are kept in a ring of window / bucket_size buckets, by default one per minute of the last hour, keyed by
+        the time messages were sent. Each bucket counts the messages of each chat and its users in a SpaceSaving summary
+        of top_size counters, so memory stays fixed however many users talk. The window ends with the newest message,
+        older messages are not counted.
+
+            stats = ChatStatistics(handler)
+            Monitor(chats, path, stats)
+            stats.get_stats()
+    """
+
+    def __init__(self, handler=None, window=3600, bucket_size=60, top_size=100):
+        if handler is not None and not hasattr(handler, '__call__'):
+            raise InvalidCallable("The value passed as '{0}' is not a callable.".format('handler'))
+
+        self.handler = handler
+        self.bucket_size = timedelta(seconds=bucket_size)
+        self.top_size = top_size
+
+        self._lock = Lock()
+        self._buckets = [[None, {}] for _ in range(max(1, int(window // bucket_size)))]
+        self._first = None
+        self._newest = None
+        self._last_timestamp = None
+        self._last_bucket = None
+
+    def __call__(self, chat, messages):
+        self.add(chat, messages)
+        if self.handler is not None:
+            self.handler(chat, messages)
+
+    def _get_bucket_id(self, timestamp):
+        if timestamp is not self._last_timestamp:
+            # messages of the same second share one datetime, see parse_timestamp
+            self._last_timestamp = timestamp
+            self._last_bucket = (timestamp - EPOCH) // self.bucket_size
+
+        return self._last_bucket
+
+    def add(self, chat, messages):
+        """Counts the messages of a chat"""
+        buckets = self._buckets
+        size = len(buckets)
+
+        with self._lock:
+            for message in messages:
+                bucket_id = self._get_bucket_id(message.timestamp)
+                if self._newest is None or bucket_id > self._newest:
+                    self._newest = bucket_id
+                elif bucket_id <= self._newest - size:
+                    continue
+                if self._first is None or bucket_id < self._first:
+                    self._first = bucket_id
+
+                bucket = buckets[bucket_id % size]
+                if bucket[0] != bucket_id:
+                    bucket[0] = bucket_id
+                    bucket[1] = {}
+
+                chat_counts = bucket[1].get(chat)
+                if chat_counts is None:
+                    chat_counts = bucket[1][chat] = [0, SpaceSaving(self.top_size)]
+
+                chat_counts[0] += 1
+                chat_counts[1].add(message.username)
+
+    def get_stats(self, top=10):
+        """Returns a snapshot of the message counts and rates of the window, in total and by chat, and the top talkers.
+
+            User counts are upper bounds of the top talkers' messages. Only copying the buckets holds up the handler,
+            they are summed up afterwards.
+        """
+        with self._lock:
+            newest = self._newest
+            if newest is None:
+                return {'start': None, 'end': None, 'messages': 0, 'messages_per_minute': 0.0, 'chats': {},
+                        'top_talkers': []}
+
+            oldest = max(self._first, newest - len(self._buckets) + 1)
+            buckets = [[(chat, chat_counts[0], dict(chat_counts[1].counts))
+                        for chat, chat_counts in bucket[1].items()]
+                       for bucket in self._buckets if bucket[0] is not None and bucket[0] >= oldest]
+
+        minutes = (newest - oldest + 1) * self.bucket_size.total_seconds() / 60
+        chats = {}
+        users = {}
+        for bucket in buckets:
+            for chat, count, user_counts in bucket:
+                chat_stats = chats.get(chat)
+                if chat_stats is None:
+                    chat_stats = chats[chat] = [0, {}]
+                chat_stats[0] += count
+
+                chat_users = chat_stats[1]
+                for user, user_count in user_counts.items():
+                    chat_users[user] = chat_users.get(user, 0) + user_count
+                    users[user] = users.get(user, 0) + user_count
+
+        messages = sum(chat_stats[0] for chat_stats in chats.values())
+        return {
+            'start': EPOCH + oldest * self.bucket_size,
+            'end': EPOCH + (newest + 1) * self.bucket_size,
+            'messages': messages,
+            'messages_per_minute': messages / minutes,
+            'chats': dict((chat, {'messages': chat_stats[0],
+                                  'messages_per_minute': chat_stats[0] / minutes,
+                                  'top_talkers': get_top(chat_stats[1], top)})
+                          for chat, chat_stats in chats.items()),
+            'top_talkers': get_top(users, top),
+        }
@@ -0,0 +1,49 @@
+import re
+from fnmatch import translate
+
+GLOB_CHARACTERS = ('*', '?', '[')
+
+
+class ChatSubscription(object):
+    """Decides which chats are monitored.
+
+        Patterns may be case sensitive chat names ('Corp'), glob patterns ('Intel*', '*' for every chat) or compiled
+        regular expressions (re.compile('^(Intel|Scouts)')), which are matched with re.match. A name is matched
+        literally before it is matched as a glob, so 'Corp [EU]' matches the chat of that name. Wrap a glob character
+        in brackets to match only that character, e.g. 'Corp [[]EU]'.
+    """
+
+    def __init__(self, patterns):
+        self.patterns = patterns
+        self.names = set()
+        self.expressions = []
+
+        globs = []
+        for pattern in patterns:
+            if hasattr(pattern, 'match'):
+                self.expressions.append(pattern)
+            else:
+                self.names.add(pattern)
+                if any(character in pattern for character in GLOB_CHARACTERS):
+                    globs.append(translate(pattern))
+
+        if globs:
+            # one combined expression instead of one fnmatch call per glob
+            self.expressions.insert(0, re.compile('|'.join('(?:{0})'.format(glob) for glob in globs)))
+
+    def matches(self, chat_name):
+        if chat_name is None:
+            return False
+
+        if chat_name in self.names:
+            return True
+
+        for expression in self.expressions:
+            if expression.match(chat_name):
+                return True
+
+        return False
+
+    def filter(self, chat_names):
+        """Returns the chat names that match the subscription"""
+        return [chat_name for chat_name in chat_names if self.matches(chat_name)]
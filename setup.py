@@ -14,6 +14,7 @@ setup(
     url='https://github.com/andrewpmartinez/py-eve-chat-mon',
     download_url='https://github.com/andrewpmartinez/py-eve-chat-mon/tarball/0.5',
     packages=find_packages(),
+    python_requires=">=3.5",
     long_description="See github page for full details.",
     classifiers=[
         'Development Status :: 5 - Production/Stable',
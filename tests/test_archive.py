@@ -0,0 +1,144 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+from datetime import datetime
+from unittest import TestCase, mock
+from py_eve_chat_mon.archive import ChatArchive
+from py_eve_chat_mon.chat_message import ChatMessage
+from py_eve_chat_mon.exceptions import InvalidMonitorState
+
+
+def message(minute, username="Some Dude", body="o7"):
+    return ChatMessage(datetime(2015, 3, 5, 21, minute, 3), username, body)
+
+
+class TestChatArchive(TestCase):
+
+    def setUp(self):
+        self._directory = tempfile.mkdtemp()
+        self._path = os.path.join(self._directory, "chat.db")
+        self._sut = ChatArchive(self._path, batch_interval=60)
+
+    def tearDown(self):
+        self._sut.close()
+        shutil.rmtree(self._directory)
+
+    def _archive(self):
+        self._sut("Corp", [message(1, body="red in Jita"), message(2, "Other Dude", "clr")])
+        self._sut("Intel.North", [message(3, body="2 reds in Amarr")])
+        self._sut("Alliance", [message(4, "Other Dude", "Jita undock")])
+        self._sut.flush()
+
+    def test_uses_wal_mode(self):
+        with sqlite3.connect(self._path) as connection:
+            self.assertEqual("wal", connection.execute("PRAGMA journal_mode").fetchone()[0])
+
+    def test_search_returns_newest_messages_first(self):
+        self._archive()
+
+        self.assertEqual([("Alliance", message(4, "Other Dude", "Jita undock")),
+                          ("Intel.North", message(3, body="2 reds in Amarr")),
+                          ("Corp", message(2, "Other Dude", "clr")),
+                          ("Corp", message(1, body="red in Jita"))], self._sut.search())
+
+    def test_search_limits_results(self):
+        self._archive()
+
+        self.assertEqual([("Alliance", message(4, "Other Dude", "Jita undock"))], self._sut.search(limit=1))
+
+    def test_search_by_chat_pattern(self):
+        self._archive()
+
+        result = self._sut.search(chats=['Intel*', 'Alliance'])
+
+        self.assertEqual(["Alliance", "Intel.North"], [chat for chat, _ in result])
+
+    def test_search_by_unknown_chat_returns_nothing(self):
+        self._archive()
+
+        self.assertEqual([], self._sut.search(chats=['Local']))
+
+    def test_search_by_username(self):
+        self._archive()
+
+        self.assertEqual(["Jita undock", "clr"], [m.message for _, m in self._sut.search(usernames=['Other Dude'])])
+
+    def test_search_by_time_range(self):
+        self._archive()
+
+        result = self._sut.search(since=message(2).timestamp, until=message(4).timestamp)
+
+        self.assertEqual([message(3).timestamp, message(2).timestamp], [m.timestamp for _, m in result])
+
+    def test_search_by_text(self):
+        self._archive()
+
+        self.assertEqual(["Jita undock", "red in Jita"], [m.message for _, m in self._sut.search('jita')])
+
+    def test_search_combines_criteria(self):
+        self._archive()
+
+        self.assertEqual([("Corp", message(1, body="red in Jita"))],
+                         self._sut.search('jita', chats=['Corp'], usernames=['Some Dude']))
+
+    def test_interns_chat_and_user_names(self):
+        self._archive()
+        self._sut("Corp", [message(5), message(6)])
+        self._sut.flush()
+
+        with sqlite3.connect(self._path) as connection:
+            self.assertEqual(3, connection.execute("SELECT COUNT(*) FROM chats").fetchone()[0])
+            self.assertEqual(2, connection.execute("SELECT COUNT(*) FROM users").fetchone()[0])
+            self.assertEqual(6, connection.execute("SELECT COUNT(*) FROM messages").fetchone()[0])
+
+    def test_writes_batch_in_one_transaction(self):
+        self._sut.close()
+        self._sut = ChatArchive(self._path, batch_size=3, batch_interval=60)
+
+        self._sut("Corp", [message(1), message(2)])
+        self._sut("Corp", [message(3)])
+        self._sut.flush()
+
+        self.assertEqual(1, self._sut.get_stats()['written_batches'])
+        self.assertEqual(3, self._sut.get_stats()['written_messages'])
+
+    def test_close_writes_waiting_messages(self):
+        self._sut("Corp", [message(1)])
+        self._sut.close()
+
+        self.assertEqual([("Corp", message(1))], self._sut.search())
+
+    def test_call_raises_after_close(self):
+        self._sut.close()
+
+        self.assertRaises(InvalidMonitorState, self._sut, "Corp", [message(1)])
+
+    def test_reopened_archive_keeps_messages_and_names(self):
+        self._archive()
+        self._sut.close()
+
+        self._sut = ChatArchive(self._path)
+        self._sut("Corp", [message(5)])
+        self._sut.flush()
+
+        self.assertEqual(5, len(self._sut.search(limit=10)))
+        self.assertEqual(["red in Jita"], [m.message for _, m in self._sut.search('red')])
+
+    @mock.patch('py_eve_chat_mon.archive.get_fts_module', return_value=None)
+    def test_search_by_substring_without_full_text_search(self, mock_get_fts_module):
+        self._sut.close()
+        self._sut = ChatArchive(os.path.join(self._directory, "plain.db"), batch_interval=60)
+        self._archive()
+
+        self.assertEqual(["2 reds in Amarr", "red in Jita"], [m.message for _, m in self._sut.search('red')])
+
+
+    @mock.patch('py_eve_chat_mon.archive.get_fts_module', return_value='fts4')
+    def test_search_by_text_with_fts4(self, mock_get_fts_module):
+        self._sut.close()
+        self._sut = ChatArchive(os.path.join(self._directory, "fts4.db"), batch_interval=60)
+        self._archive()
+
+        self.assertEqual('fts4', self._sut.fts_module)
+        self.assertEqual(["Jita undock", "red in Jita"], [m.message for _, m in self._sut.search('jita')])
@@ -0,0 +1,196 @@
+import asyncio
+import unittest.mock
+from unittest import TestCase, mock
+from py_eve_chat_mon.async_monitor import AsyncMonitor
+from py_eve_chat_mon.exceptions import InvalidMonitorState
+
+
+def run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+class TestAsyncMonitor(TestCase):
+    def setUp(self):
+        self._chats = ['Alliance', 'Corp']
+        self._valid_path = "."
+
+        self._patcher_eve_chat_log_dir_mon = mock.patch('py_eve_chat_mon.monitor.EveChatLogDirectoryMonitor')
+        self._mock_monitor = self._patcher_eve_chat_log_dir_mon.start()
+        self._mock_monitor.return_value.find_chats.side_effect = lambda subscription: subscription.filter(self._chats)
+
+        self._patch_parse_batch = mock.patch('py_eve_chat_mon.monitor.parse_batch')
+        self._mock_parse_batch = self._patch_parse_batch.start()
+        self._mock_parse_batch.side_effect = lambda messages, source, listener, accept: ["p" + message
+                                                                                         for message in messages]
+
+        self._sut = AsyncMonitor(self._chats, self._valid_path, poll_rate=0.01)
+        self._read_sources = self._sut.chat_log_monitor.read_sources
+        self._read_sources.return_value = []
+
+    def tearDown(self):
+        self._patcher_eve_chat_log_dir_mon.stop()
+        self._patch_parse_batch.stop()
+
+    def test_init(self):
+        self.assertEqual(self._chats, self._sut.chats)
+        self.assertFalse(self._sut.is_alive)
+        self.assertIsNone(self._sut.task)
+
+        self._mock_monitor.assert_called_once_with(self._valid_path, None, None, None)
+
+        for chat in self._chats:
+            self.assertTrue(chat in self._sut.scheduler)
+
+    def test_start_throws_exception_on_alive(self):
+        async def scenario():
+            await self._sut.start()
+            try:
+                with self.assertRaises(InvalidMonitorState):
+                    await self._sut.start()
+            finally:
+                await self._sut.stop()
+
+        run(scenario())
+
+    def test_stop_throws_exception_on_not_alive(self):
+        self.assertRaises(InvalidMonitorState, run, self._sut.stop())
+
+    def test_iterates_parsed_messages(self):
+        self._read_sources.side_effect = lambda chat: [("path", None, ["1"])] if chat == "Corp" else []
+
+        async def scenario():
+            await self._sut.start()
+            async for chat, messages in self._sut:
+                await self._sut.stop()
+                return chat, messages
+
+        self.assertEqual(("Corp", ["p1"]), run(scenario()))
+
+    def test_stop_ends_waiting_iteration(self):
+        async def scenario():
+            await self._sut.start()
+            received = []
+
+            async def consume():
+                async for item in self._sut:
+                    received.append(item)
+
+            consumer = asyncio.ensure_future(consume())
+            await asyncio.sleep(0.05)
+            await self._sut.stop()
+            await asyncio.wait_for(consumer, 1)
+            return received
+
+        self.assertEqual([], run(scenario()))
+
+    def test_iteration_drains_queue_after_stop(self):
+        self._read_sources.side_effect = lambda chat: [("path", None, ["1"])]
+
+        async def scenario():
+            await self._sut.start()
+            await asyncio.sleep(0.05)
+            await self._sut.stop()
+            return [item async for item in self._sut]
+
+        received = run(scenario())
+
+        self.assertTrue(len(received) >= 2)
+        self.assertEqual(("Alliance", ["p1"]), received[0])
+
+    def test_full_queue_stops_reading(self):
+        self._sut = AsyncMonitor(self._chats, self._valid_path, poll_rate=0, max_queue=1)
+        self._sut.chat_log_monitor.read_sources.return_value = [("path", None, ["1"])]
+
+        async def scenario():
+            await self._sut.start()
+            await asyncio.sleep(0.05)
+            reads = self._sut.chat_log_monitor.read_sources.call_count
+            await asyncio.sleep(0.05)
+            await self._sut.stop()
+            return reads, self._sut.chat_log_monitor.read_sources.call_count
+
+        reads_before, reads_after = run(scenario())
+
+        self.assertEqual(2, reads_before)
+        self.assertEqual(reads_before, reads_after)
+
+    def test_stop_with_full_queue_delivers_every_read_batch(self):
+        self._sut = AsyncMonitor(self._chats, self._valid_path, poll_rate=0, max_queue=1)
+        read_sources = self._sut.chat_log_monitor.read_sources
+        read_sources.return_value = [("path", None, ["1"])]
+
+        async def scenario():
+            await self._sut.start()
+            await asyncio.sleep(0.05)
+            await self._sut.stop()
+            return [item async for item in self._sut]
+
+        received = run(scenario())
+
+        self.assertEqual([("Alliance", ["p1"]), ("Corp", ["p1"])], received)
+        self.assertEqual(read_sources.call_count, len(received))
+
+    def test_stop_does_not_checkpoint_past_kept_batches(self):
+        self._sut = AsyncMonitor(self._chats, self._valid_path, poll_rate=0, max_queue=1)
+        self._sut.checkpoints = mock.MagicMock()
+        self._sut.checkpoints.flush_if_due.return_value = None
+        chat_log_monitor = self._sut.chat_log_monitor
+        chat_log_monitor.chats = {'Alliance': {}, 'Corp': {}}
+        chat_log_monitor.save_checkpoints.side_effect = lambda: [chat_log_monitor.save_checkpoint(chat)
+                                                                 for chat in chat_log_monitor.chats]
+        chat_log_monitor.read_sources.return_value = [("path", None, ["1"])]
+
+        async def scenario():
+            await self._sut.start()
+            chat_log_monitor.save_checkpoint.reset_mock()
+            await asyncio.sleep(0.05)
+            await self._sut.stop()
+
+        run(scenario())
+
+        self.assertTrue(mock.call('Alliance') in chat_log_monitor.save_checkpoint.call_args_list)
+        self.assertFalse(mock.call('Corp') in chat_log_monitor.save_checkpoint.call_args_list)
+        self._sut.checkpoints.flush.assert_called_once_with()
+
+    def test_init_with_events_registers_modified_callable(self):
+        self._sut = AsyncMonitor(self._chats, self._valid_path, use_events=True)
+
+        self._sut.chat_log_monitor.add_modified_callable.assert_called_once_with(self._sut._on_chat_modified)
+
+    def test_modified_chat_is_read_before_poll_rate(self):
+        self._sut = AsyncMonitor(self._chats, self._valid_path, poll_rate=60, use_events=True, coalesce_delay=0)
+        read_sources = self._sut.chat_log_monitor.read_sources
+        read_sources.return_value = []
+
+        async def scenario():
+            await self._sut.start()
+            await asyncio.sleep(0.01)
+            read_sources.return_value = [("path", None, ["1"])]
+            self._sut._on_chat_modified("Corp")
+
+            chat, messages = await asyncio.wait_for(self._sut.__anext__(), 1)
+            await self._sut.stop()
+            return chat, messages
+
+        self.assertEqual(("Corp", ["p1"]), run(scenario()))
+        self._sut.chat_log_monitor.start.assert_called_once_with()
+        self._sut.chat_log_monitor.stop.assert_called_once_with()
+
+    def test_added_chat_is_read(self):
+        self._sut = AsyncMonitor(['Intel*'], self._valid_path, poll_rate=60)
+        read_sources = self._sut.chat_log_monitor.read_sources
+        read_sources.return_value = [("path", None, ["1"])]
+
+        async def scenario():
+            await self._sut.start()
+            self._sut._on_chat_added("Intel.North")
+
+            chat, messages = await asyncio.wait_for(self._sut.__anext__(), 1)
+            await self._sut.stop()
+            return chat, messages
+
+        self.assertEqual(("Intel.North", ["p1"]), run(scenario()))
@@ -0,0 +1,107 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from os import path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest.mock import MagicMock
+from py_eve_chat_mon.backfill import backfill, find_logs, read_log
+from py_eve_chat_mon.chat_message import EveChatLogReader
+from py_eve_chat_mon.exceptions import InvalidChatDirectory
+
+HEADER = "\r\n\r\n------------\r\n  Channel Name:    Corp\r\n------------\r\n\r\n"
+
+
+def write_log(file_path, *messages):
+    with open(file_path, 'wb') as log_file:
+        log_file.write((EveChatLogReader.chat_line_delimiter + HEADER).encode(EveChatLogReader.encoding))
+        for message in messages:
+            log_file.write((EveChatLogReader.chat_line_delimiter + message + "\r\n").encode(EveChatLogReader.encoding))
+
+
+def set_mtime(file_path, timestamp):
+    mtime = (timestamp - datetime(1970, 1, 1)).total_seconds()
+    os.utime(file_path, (mtime, mtime))
+
+
+class TestBackfill(TestCase):
+
+    def setUp(self):
+        self._temp_dir = TemporaryDirectory()
+        self._log_dir = self._temp_dir.name
+
+        self._corp_old = path.join(self._log_dir, 'Corp_20150101_100000.txt')
+        write_log(self._corp_old, "[ 2015.01.01 10:00:01 ] Some Dude > old one",
+                  "[ 2015.01.01 10:30:00 ] Some Dude > old two")
+        set_mtime(self._corp_old, datetime(2015, 1, 1, 10, 30))
+
+        self._corp_new = path.join(self._log_dir, 'Corp_20150102_100000.txt')
+        write_log(self._corp_new, "[ 2015.01.02 10:00:01 ] Some Dude > new one")
+        set_mtime(self._corp_new, datetime(2015, 1, 2, 10, 0, 1))
+
+        self._intel = path.join(self._log_dir, 'Intel_North_20150101_120000.txt')
+        write_log(self._intel, "[ 2015.01.01 12:00:01 ] Scout > red in system")
+        set_mtime(self._intel, datetime(2015, 1, 1, 12, 0, 1))
+
+        open(path.join(self._log_dir, 'notes.txt'), 'w').close()
+
+    def tearDown(self):
+        self._temp_dir.cleanup()
+
+    def test_find_logs_invalid_path_raises_exception(self):
+        self.assertRaises(InvalidChatDirectory, find_logs, path.join(self._log_dir, 'missing'))
+
+    def test_find_logs_returns_all_logs_in_start_order(self):
+        self.assertEqual([('Corp', self._corp_old), ('Intel_North', self._intel), ('Corp', self._corp_new)],
+                         find_logs(self._log_dir))
+
+    def test_find_logs_selects_chats_by_pattern(self):
+        self.assertEqual([('Intel_North', self._intel)], find_logs(self._log_dir, ['Intel*']))
+
+    def test_find_logs_skips_logs_started_after_until(self):
+        self.assertEqual([('Corp', self._corp_old)], find_logs(self._log_dir, ['Corp'], until=datetime(2015, 1, 2)))
+
+    def test_find_logs_skips_logs_last_written_before_since(self):
+        self.assertEqual([('Intel_North', self._intel), ('Corp', self._corp_new)],
+                         find_logs(self._log_dir, since=datetime(2015, 1, 1, 11)))
+
+    def test_read_log_parses_all_messages(self):
+        self.assertEqual(['old one', 'old two'], [message.message for message in read_log(self._corp_old)])
+
+    def test_read_log_filters_messages_by_time_range(self):
+        messages = read_log(self._corp_old, since=datetime(2015, 1, 1, 10, 10))
+
+        self.assertEqual(['old two'], [message.message for message in messages])
+
+    def test_backfill_yields_messages_in_log_order(self):
+        with ThreadPoolExecutor(2) as executor:
+            results = [(chat, [message.message for message in messages])
+                       for chat, messages in backfill(self._log_dir, executor=executor)]
+
+        self.assertEqual([('Corp', ['old one', 'old two']), ('Intel_North', ['red in system']), ('Corp', ['new one'])],
+                         results)
+
+    def test_backfill_reads_at_most_max_pending_logs_ahead(self):
+        executor = MagicMock()
+        results = []
+
+        def result():
+            results.append(executor.submit.call_count - len(results))
+            return []
+        executor.submit.return_value.result.side_effect = result
+
+        list(backfill(self._log_dir, executor=executor, max_pending=2))
+
+        self.assertEqual([2, 2, 1], results)
+
+    def test_backfill_with_single_worker_reads_in_process(self):
+        results = list(backfill(self._log_dir, ['Intel*'], workers=1))
+
+        self.assertEqual(1, len(results))
+        self.assertEqual('red in system', results[0][1][0].message)
+
+    def test_backfill_with_worker_processes(self):
+        results = list(backfill(self._log_dir, ['Corp'], since=datetime(2015, 1, 1, 10, 10), workers=2))
+
+        self.assertEqual([('Corp', ['old two']), ('Corp', ['new one'])],
+                         [(chat, [message.message for message in messages]) for chat, messages in results])
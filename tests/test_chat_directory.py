@@ -1,14 +1,31 @@
+import os
 from os import path
+from tempfile import TemporaryDirectory
+from threading import Event
+from time import time
 from unittest import TestCase
 from unittest.mock import MagicMock, patch, call
 from datetime import datetime
 from py_eve_chat_mon.chat_directory import DirChangeEventHandler, get_chat_from_file_name, get_existing_logs, \
-    get_timestamp_from_file_name, EveChatLogDirectoryMonitor
+    get_timestamp_from_file_name, is_newer_log, load_log_index, scan_logs, EveChatLogDirectoryMonitor
+from py_eve_chat_mon.chat_message import EveChatLogReader
+from py_eve_chat_mon.subscription import ChatSubscription
 from py_eve_chat_mon.exceptions import InvalidCallable, InvalidChatDirectory, ObserverAlreadyAdded
 
 INVALID_PATH = path.join('.', 'I', 'DO', 'NOT', 'EXIST', '123232')
 FILE_PATH = path.join('.', __file__)
 
+def dir_entries(*file_names):
+    entries = []
+    for file_name in file_names:
+        entry = MagicMock()
+        entry.name = file_name
+        entry.is_file.return_value = True
+        entries.append(entry)
+
+    return entries
+
+
 class TestGetTimestampFromFileName(TestCase):
 
     def test_invalid_format_returns_none(self):
@@ -31,6 +48,16 @@ class TestGetChatFromFileName(TestCase):
         self.assertEqual('some_file', result)
 
 
+class TestIsNewerLog(TestCase):
+
+    def test_later_timestamp_is_newer(self):
+        self.assertTrue(is_newer_log("Corp_20150305_220000.txt", "Corp_20150305_210403.txt"))
+        self.assertFalse(is_newer_log("Corp_20150305_200000.txt", "Corp_20150305_210403.txt"))
+
+    def test_same_log_is_not_newer(self):
+        self.assertFalse(is_newer_log("Corp_20150305_210403.txt", "Corp_20150305_210403.txt"))
+
+
 class TestGetExistingLogs(TestCase):
 
     def test_invalid_path_raises_exception(self):
@@ -45,10 +72,7 @@ class TestGetExistingLogs(TestCase):
         mock_os.path.isdir.return_value = True
         mock_os.path.isfile.return_value = True
 
-        mock_os.listdir.return_value = [
-            'chat_one_20150404_234536.txt',
-            'chat_two_20150130_065423.txt'
-        ]
+        mock_os.scandir.return_value = dir_entries('chat_one_20150404_234536.txt', 'chat_two_20150130_065423.txt')
 
         chats = get_existing_logs('some/path')
 
@@ -63,10 +87,7 @@ class TestGetExistingLogs(TestCase):
 
         mock_os.path.join = path.join
 
-        mock_os.listdir.return_value = [
-            'chat_one_20150104_234536.txt',
-            'chat_one_20150130_065423.txt'
-        ]
+        mock_os.scandir.return_value = dir_entries('chat_one_20150104_234536.txt', 'chat_one_20150130_065423.txt')
 
         base_path = path.join('some', 'path')
         chat_one_path = path.join(base_path, 'chat_one_20150130_065423.txt')
@@ -84,10 +105,7 @@ class TestGetExistingLogs(TestCase):
 
         mock_os.path.join = path.join
 
-        mock_os.listdir.return_value = [
-            'chat_one_20150404_234536.txt',
-            'chat_two_20150130_065423.txt'
-        ]
+        mock_os.scandir.return_value = dir_entries('chat_one_20150404_234536.txt', 'chat_two_20150130_065423.txt')
 
         base_path = path.join('some', 'path')
         chat_one_path = path.join(base_path, 'chat_one_20150404_234536.txt')
@@ -106,10 +124,7 @@ class TestGetExistingLogs(TestCase):
 
         mock_os.path.join = path.join
 
-        mock_os.listdir.return_value = [
-            'chat_one_20150404_234536.txt',
-            'chat_two_20150130_065423.txt'
-        ]
+        mock_os.scandir.return_value = dir_entries('chat_one_20150404_234536.txt', 'chat_two_20150130_065423.txt')
 
         base_path = path.join('some', 'path')
 
@@ -122,6 +137,85 @@ class TestGetExistingLogs(TestCase):
         self.assertEqual(chats['chat_two']['timestamp'], chat_two_timestamp)
 
 
+    @patch('py_eve_chat_mon.chat_directory.os')
+    def test_skips_files_without_chat_name_and_directories(self, mock_os):
+        mock_os.path.exists.return_value = True
+        mock_os.path.isdir.return_value = True
+        mock_os.path.join = path.join
+
+        entries = dir_entries('desktop.ini', 'chat_one_20150404_234536.txt', 'chat_one_20150405_234536.txt')
+        entries[2].is_file.return_value = False
+        mock_os.scandir.return_value = entries
+
+        chats = get_existing_logs('some')
+
+        self.assertEqual(['chat_one'], list(chats))
+        self.assertEqual(path.join('some', 'chat_one_20150404_234536.txt'), chats['chat_one']['path'])
+
+
+class TestLogIndex(TestCase):
+
+    def setUp(self):
+        self._temp_dir = TemporaryDirectory()
+        self._log_dir = path.join(self._temp_dir.name, 'Chatlogs')
+        self._index_path = path.join(self._temp_dir.name, 'index.json')
+        os.mkdir(self._log_dir)
+
+        for file_name in ('chat_one_20150104_234536.txt', 'chat_one_20150130_065423.txt',
+                          'chat_two_20150130_065423.txt'):
+            open(path.join(self._log_dir, file_name), 'w').close()
+
+        # make the directory old enough for its index to be saved
+        os.utime(self._log_dir, (time() - 60, time() - 60))
+
+    def tearDown(self):
+        self._temp_dir.cleanup()
+
+    def test_scan_logs_returns_newest_log_per_chat(self):
+        self.assertEqual({'chat_one': ('20150130_065423', 'chat_one_20150130_065423.txt'),
+                          'chat_two': ('20150130_065423', 'chat_two_20150130_065423.txt')},
+                         scan_logs(self._log_dir))
+
+    def test_get_existing_logs_saves_index(self):
+        chats = get_existing_logs(self._log_dir, self._index_path)
+
+        self.assertEqual(scan_logs(self._log_dir), load_log_index(self._log_dir, self._index_path))
+        self.assertEqual(datetime(2015, 1, 30, 6, 54, 23), chats['chat_one']['timestamp'])
+
+    def test_get_existing_logs_uses_valid_index_without_scanning(self):
+        expected = get_existing_logs(self._log_dir, self._index_path)
+
+        with patch('py_eve_chat_mon.chat_directory.scan_logs') as mock_scan_logs:
+            chats = get_existing_logs(self._log_dir, self._index_path)
+
+        self.assertFalse(mock_scan_logs.called)
+        self.assertEqual(expected, chats)
+
+    def test_index_is_invalid_after_directory_changes(self):
+        get_existing_logs(self._log_dir, self._index_path)
+
+        open(path.join(self._log_dir, 'chat_two_20150201_065423.txt'), 'w').close()
+        os.utime(self._log_dir, (time() - 30, time() - 30))
+
+        self.assertIsNone(load_log_index(self._log_dir, self._index_path))
+        chats = get_existing_logs(self._log_dir, self._index_path)
+        self.assertEqual(path.join(self._log_dir, 'chat_two_20150201_065423.txt'), chats['chat_two']['path'])
+
+    def test_index_is_not_saved_for_recently_changed_directory(self):
+        os.utime(self._log_dir, None)
+
+        get_existing_logs(self._log_dir, self._index_path)
+
+        self.assertFalse(path.exists(self._index_path))
+
+    def test_corrupt_index_is_ignored(self):
+        with open(self._index_path, 'w') as index_file:
+            index_file.write('{not json')
+
+        self.assertIsNone(load_log_index(self._log_dir, self._index_path))
+        self.assertEqual(2, len(get_existing_logs(self._log_dir, self._index_path)))
+
+
 class TestEveChatLogDirectoryMonitor(TestCase):
 
     def setUp(self):
@@ -184,9 +278,29 @@ class TestEveChatLogDirectoryMonitor(TestCase):
         self._sut = EveChatLogDirectoryMonitor("path")
         self.assertRaises(ObserverAlreadyAdded, self._sut._add_file_observer)
 
-    def test_add_file_observer_creates_dir_event_handler_with_proper_call_backs(self):
+    @patch('py_eve_chat_mon.chat_directory.EveChatLogDirectoryMonitor.on_modify')
+    @patch('py_eve_chat_mon.chat_directory.EveChatLogDirectoryMonitor.on_delete')
+    @patch('py_eve_chat_mon.chat_directory.EveChatLogDirectoryMonitor.on_create')
+    def test_add_file_observer_creates_dir_event_handler_with_proper_call_backs(self, mock_on_create, mock_on_delete,
+                                                                                mock_on_modify):
         self._sut = EveChatLogDirectoryMonitor("path")
-        self._mock_dir_change_event_handler.assert_called_with(self._sut.on_create, self._sut.on_delete)
+        on_create, on_delete, on_modify = self._mock_dir_change_event_handler.call_args[0]
+
+        on_create("created")
+        on_delete("deleted")
+        on_modify("modified")
+
+        mock_on_create.assert_called_once_with("created", directory="path")
+        mock_on_delete.assert_called_once_with("deleted", directory="path")
+        mock_on_modify.assert_called_once_with("modified", directory="path")
+
+    def test_add_file_observer_schedules_each_directory_on_one_observer(self):
+        self._sut = EveChatLogDirectoryMonitor(["path_one", "path_two"])
+
+        self._mock_watch_dog.assert_called_once_with()
+        self._mock_watch_dog().schedule.assert_has_calls([
+            call(self._mock_dir_change_event_handler(), "path_one", recursive=False),
+            call(self._mock_dir_change_event_handler(), "path_two", recursive=False)])
 
     def test_add_file_observer_creates_observer(self):
         self._sut = EveChatLogDirectoryMonitor("path")
@@ -202,27 +316,118 @@ class TestEveChatLogDirectoryMonitor(TestCase):
                                                            self._sut.path,
                                                            recursive=False)
 
+    def test_start_starts_observer(self):
+        self._sut = EveChatLogDirectoryMonitor("path")
+        self._mock_watch_dog().is_alive.return_value = False
+
+        self._sut.start()
+
+        self._mock_watch_dog().start.assert_called_once_with()
+
+    def test_stop_stops_observer_and_prepares_a_new_one(self):
+        self._sut = EveChatLogDirectoryMonitor("path")
+        observer = self._sut.watchdog_observer
+        observer.is_alive.return_value = True
+
+        self._sut.stop()
+
+        observer.stop.assert_called_once_with()
+        observer.join.assert_called_once_with()
+        self.assertEqual(2, self._mock_watch_dog.call_count)
+
+    def test_add_modified_callable_raises_exception_if_not_callable(self):
+        self._sut = EveChatLogDirectoryMonitor("path")
+
+        self.assertRaises(InvalidCallable, self._sut.add_modified_callable, 1)
+
+    def test_on_modify_calls_modified_callables_for_current_log(self):
+        self._sut = EveChatLogDirectoryMonitor("path")
+        self._patcher_os.stop()
+
+        modified_callable = MagicMock()
+        self._sut.add_modified_callable(modified_callable)
+        self._sut.chats["some_chat"] = {"path": MagicMock(path=path.join("logs", "some_chat_20150101_240101.txt"))}
+
+        event = MagicMock()
+        event.is_directory = False
+        event.src_path = path.join("logs", "some_chat_20150101_240101.txt")
+
+        self._sut.on_modify(event)
+        self._patcher_os.start()
+
+        modified_callable.assert_called_once_with("some_chat")
+
+    def test_on_modify_ignores_other_logs_of_chat(self):
+        self._sut = EveChatLogDirectoryMonitor("path")
+        self._patcher_os.stop()
+
+        modified_callable = MagicMock()
+        self._sut.add_modified_callable(modified_callable)
+        self._sut.chats["some_chat"] = {"path": MagicMock(path=path.join("logs", "some_chat_20150101_240101.txt"))}
+
+        event = MagicMock()
+        event.is_directory = False
+        event.src_path = path.join("logs", "some_chat_20140101_240101.txt")
+
+        self._sut.on_modify(event)
+        self._patcher_os.start()
+
+        self.assertFalse(modified_callable.called)
+
     def test_add_existing_get_existing_chats(self):
         self._sut = EveChatLogDirectoryMonitor("path")
-        self._mock_get_existing_chats.assert_called_once_with(self._sut.path)
+        self._mock_get_existing_chats.assert_called_once_with(self._sut.path, None)
+
+    def test_add_existing_get_existing_chats_of_each_directory(self):
+        self._sut = EveChatLogDirectoryMonitor(["path_one", "path_two"], "index.json")
+
+        self._mock_get_existing_chats.assert_has_calls([call("path_one", "index.json"),
+                                                        call("path_two", "index.json")])
+        self.assertEqual(["path_one", "path_two"], sorted(self._sut.chats["chat_one.txt"]))
 
     @patch('py_eve_chat_mon.chat_directory.EveChatLogDirectoryMonitor.add_chat_log')
     def test_add_existing_adds_existing_chats(self, mock_add_chat_log):
         self._sut = EveChatLogDirectoryMonitor("path")
 
-        calls = [call('chat_one.txt', self._chat_info['chat_one.txt']['path']),
-                 call('chat_two.txt', self._chat_info['chat_two.txt']['path'])]
+        calls = [call('chat_one.txt', self._chat_info['chat_one.txt']['path'], directory="path"),
+                 call('chat_two.txt', self._chat_info['chat_two.txt']['path'], directory="path")]
 
         mock_add_chat_log.assert_has_calls(calls, any_order=True)
 
     def test_read_messages_reads_from_added_chat(self):
-        self._mock_eve_chat_log_reader().read_messages.return_value = "MSGS"
+        self._mock_eve_chat_log_reader().read_messages.return_value = ["MSG"]
         self._sut = EveChatLogDirectoryMonitor("path")
 
         result = self._sut.read_messages("chat_one.txt")
 
         self._mock_eve_chat_log_reader().read_messages.assert_has_calls([call()])
-        self.assertEqual("MSGS", result)
+        self.assertEqual(["MSG"], result)
+
+    def test_read_sources_tags_messages_of_each_directory(self):
+        self._sut = EveChatLogDirectoryMonitor("path")
+        self._sut.chats["chat_one.txt"] = {"path_one": MagicMock(listener="Pilot One"),
+                                           "path_two": MagicMock(listener="Pilot Two")}
+        self._sut.chats["chat_one.txt"]["path_one"].read_messages.return_value = ["MSG"]
+        self._sut.chats["chat_one.txt"]["path_two"].read_messages.return_value = []
+
+        self.assertEqual([("path_one", "Pilot One", ["MSG"])], self._sut.read_sources("chat_one.txt"))
+
+    def test_read_sources_totals_bytes_read_of_chat(self):
+        self._sut = EveChatLogDirectoryMonitor("path")
+        chat_log = MagicMock(bytes_read=10, decode_time=1.0)
+
+        def read_messages():
+            chat_log.bytes_read += 20
+            chat_log.decode_time += 0.5
+            return ["MSG"]
+
+        chat_log.read_messages.side_effect = read_messages
+        self._sut.chats["chat_one.txt"] = {"path": chat_log}
+
+        self._sut.read_sources("chat_one.txt")
+        self._sut.read_sources("chat_one.txt")
+
+        self.assertEqual([40, 1.0], self._sut.read_totals["chat_one.txt"])
 
     def test_read_messages_returns_none_for_non_added_chat(self):
         self._sut = EveChatLogDirectoryMonitor("path")
@@ -231,6 +436,63 @@ class TestEveChatLogDirectoryMonitor(TestCase):
 
         self.assertIsNone(result)
 
+    def test_get_changed_chats_returns_changed_chats(self):
+        self._sut = EveChatLogDirectoryMonitor("path")
+        self._sut.chats = {"chat_one.txt": {"path": MagicMock()}, "chat_two.txt": {"path": MagicMock()}}
+        self._sut.chats["chat_one.txt"]["path"].has_changed.return_value = True
+        self._sut.chats["chat_two.txt"]["path"].has_changed.return_value = False
+
+        self.assertEqual(["chat_one.txt"], self._sut.get_changed_chats())
+
+    def test_get_changed_chats_only_checks_requested_chats(self):
+        self._sut = EveChatLogDirectoryMonitor("path")
+        self._sut.chats = {"chat_one.txt": {"path": MagicMock()}, "chat_two.txt": {"path": MagicMock()}}
+
+        result = self._sut.get_changed_chats(["chat_two.txt", "fake_chat_name"])
+
+        self.assertEqual(["chat_two.txt"], result)
+        self.assertFalse(self._sut.chats["chat_one.txt"]["path"].has_changed.called)
+
+    def test_add_chat_log_calls_added_callables(self):
+        self._sut = EveChatLogDirectoryMonitor("path")
+        added_callable = MagicMock()
+        self._sut.add_chat_added_callable(added_callable)
+
+        self._sut.add_chat_log("boom_chat", "super-sweet-path")
+
+        added_callable.assert_called_once_with("boom_chat")
+
+    def test_remove_chat_log_calls_removed_callables(self):
+        self._sut = EveChatLogDirectoryMonitor("path")
+        removed_callable = MagicMock()
+        self._sut.add_chat_removed_callable(removed_callable)
+
+        self._sut.remove_chat_log("chat_one.txt")
+        self._sut.remove_chat_log("fake_chat_name")
+
+        removed_callable.assert_called_once_with("chat_one.txt")
+
+    def test_remove_chat_log_keeps_chat_logged_in_other_directory(self):
+        self._sut = EveChatLogDirectoryMonitor(["path_one", "path_two"])
+        removed_callable = MagicMock()
+        self._sut.add_chat_removed_callable(removed_callable)
+
+        self._sut.remove_chat_log("chat_one.txt", "path_one")
+
+        self.assertEqual(["path_two"], list(self._sut.chats["chat_one.txt"]))
+        self.assertFalse(removed_callable.called)
+
+    def test_add_chat_callables_raise_exception_if_not_callable(self):
+        self._sut = EveChatLogDirectoryMonitor("path")
+
+        self.assertRaises(InvalidCallable, self._sut.add_chat_added_callable, 1)
+        self.assertRaises(InvalidCallable, self._sut.add_chat_removed_callable, 1)
+
+    def test_find_chats_returns_matching_chats(self):
+        self._sut = EveChatLogDirectoryMonitor("path")
+
+        self.assertEqual(["chat_two.txt"], self._sut.find_chats(ChatSubscription(["*two*"])))
+
     def test_remove_chat_log_calls_destroy_on_chat_reader(self):
         self._sut = EveChatLogDirectoryMonitor("path")
 
@@ -253,7 +515,7 @@ class TestEveChatLogDirectoryMonitor(TestCase):
 
         self._sut.add_chat_log("boom_chat", "path")
 
-        mock_remove_chat_log.assert_called_once_with("boom_chat")
+        mock_remove_chat_log.assert_called_once_with("boom_chat", "path")
 
     def test_add_chat_log_creates_new_chat_reader_with_path(self):
         self._sut = EveChatLogDirectoryMonitor("path")
@@ -262,7 +524,7 @@ class TestEveChatLogDirectoryMonitor(TestCase):
 
         self._sut.add_chat_log("boom_chat", "super-sweet-path")
 
-        self._mock_eve_chat_log_reader.assert_called_once_with('super-sweet-path')
+        self._mock_eve_chat_log_reader.assert_called_once_with('super-sweet-path', None, None)
 
     def test_add_chat_log_registers_chat_reader_entry(self):
         self._sut = EveChatLogDirectoryMonitor("path")
@@ -292,15 +554,34 @@ class TestEveChatLogDirectoryMonitor(TestCase):
         event = MagicMock()
         event.is_directory = False
         event.src_path = "some_chat_20150101_240101.txt"
+        self._sut.chats["some_chat"] = {"path": MagicMock(path=event.src_path)}
 
         self._patcher_os.stop()
         mock_remove_chat_log.reset_mock()
 
-        self._sut.on_delete(event)
+        self._sut.on_delete(event, directory="path")
+
+        self._patcher_os.start()
+
+        mock_remove_chat_log.assert_called_once_with("some_chat", "path")
+
+    @patch('py_eve_chat_mon.chat_directory.EveChatLogDirectoryMonitor.remove_chat_log')
+    def test_on_delete_ignores_older_logs_of_chat(self, mock_remove_chat_log):
+        self._sut = EveChatLogDirectoryMonitor("path")
+
+        event = MagicMock()
+        event.is_directory = False
+        event.src_path = "some_chat_20150101_240101.txt"
+        self._sut.chats["some_chat"] = {"path": MagicMock(path="some_chat_20150102_240101.txt")}
+
+        self._patcher_os.stop()
+        mock_remove_chat_log.reset_mock()
+
+        self._sut.on_delete(event, directory="path")
 
         self._patcher_os.start()
 
-        mock_remove_chat_log.assert_called_once_with("some_chat")
+        self.assertFalse(mock_remove_chat_log.called)
 
     def test_on_create_does_nothing_for_directory_events(self):
         self._sut = EveChatLogDirectoryMonitor("path")
@@ -314,8 +595,8 @@ class TestEveChatLogDirectoryMonitor(TestCase):
 
         self.assertFalse(self._mock_os.path.split.called)
 
-    @patch('py_eve_chat_mon.chat_directory.EveChatLogDirectoryMonitor.add_chat_log')
-    def test_on_create_adds_the_proper_chat_and_path(self, mock_add_chat_log):
+    @patch('py_eve_chat_mon.chat_directory.EveChatLogDirectoryMonitor.rotate_chat_log')
+    def test_on_create_rotates_to_the_proper_chat_and_path(self, mock_rotate_chat_log):
         self._sut = EveChatLogDirectoryMonitor("path")
 
         event = MagicMock()
@@ -323,13 +604,24 @@ class TestEveChatLogDirectoryMonitor(TestCase):
         event.src_path = "some_chat_20150101_240101.txt"
 
         self._patcher_os.stop()
-        mock_add_chat_log.reset_mock()
 
-        self._sut.on_create(event)
+        self._sut.on_create(event, directory="path")
 
         self._patcher_os.start()
 
-        mock_add_chat_log.assert_called_once_with("some_chat", event.src_path)
+        mock_rotate_chat_log.assert_called_once_with("some_chat", event.src_path, "path")
+
+    def test_rotate_chat_log_adds_new_chat_read_from_start(self):
+        self._sut = EveChatLogDirectoryMonitor("path")
+        added_callable = MagicMock()
+        self._sut.add_chat_added_callable(added_callable)
+
+        self._mock_eve_chat_log_reader.reset_mock()
+
+        self._sut.rotate_chat_log("boom_chat", "super-sweet-path", "path")
+
+        self._mock_eve_chat_log_reader.assert_called_once_with('super-sweet-path', 0, None)
+        added_callable.assert_called_once_with("boom_chat")
 
 
 class TestDirChangeEventHandler(TestCase):
@@ -347,6 +639,9 @@ class TestDirChangeEventHandler(TestCase):
     def test_init_raises_exception_if_file_delete_is_not_callable(self):
         self.assertRaises(InvalidCallable, DirChangeEventHandler, lambda x: x, 1)
 
+    def test_init_raises_exception_if_file_modified_is_not_callable(self):
+        self.assertRaises(InvalidCallable, DirChangeEventHandler, lambda x: x, lambda x: x, 1)
+
     def test_init(self):
         self.assertEqual(self._on_create, self._sut.new_file_callable)
         self.assertEqual(self._on_delete, self._sut.file_deleted_callable)
@@ -362,3 +657,156 @@ class TestDirChangeEventHandler(TestCase):
         self._sut.on_deleted(event)
 
         self._on_delete.assert_called_once_with(event)
+
+    def test_on_modified_calls_proper_handler(self):
+        on_modify = MagicMock()
+        self._sut = DirChangeEventHandler(self._on_create, self._on_delete, on_modify)
+
+        event = {}
+        self._sut.on_modified(event)
+
+        on_modify.assert_called_once_with(event)
+
+    def test_on_modified_without_handler_does_nothing(self):
+        self._sut.on_modified({})
+
+        self.assertFalse(self._on_create.called)
+        self.assertFalse(self._on_delete.called)
+
+
+class TestMultipleDirectories(TestCase):
+
+    def setUp(self):
+        self._temp_dir = TemporaryDirectory()
+        self._paths = []
+        for listener in ('Pilot One', 'Pilot Two'):
+            log_dir = path.join(self._temp_dir.name, listener)
+            os.mkdir(log_dir)
+            header = (EveChatLogReader.chat_line_delimiter +
+                      "\r\n  ------\r\n    Listener:        {0}\r\n".format(listener))
+            with open(path.join(log_dir, 'Corp_20150305_210403.txt'), 'wb') as log_file:
+                log_file.write(header.encode(EveChatLogReader.encoding))
+            self._paths.append(log_dir)
+
+        self._sut = EveChatLogDirectoryMonitor(self._paths)
+
+    def tearDown(self):
+        self._sut.remove_chat_log('Corp')
+        self._temp_dir.cleanup()
+
+    def _write(self, log_dir, message):
+        with open(path.join(log_dir, 'Corp_20150305_210403.txt'), 'ab') as log_file:
+            log_file.write((EveChatLogReader.chat_line_delimiter + message + "\r\n").encode(EveChatLogReader.encoding))
+
+    def test_chat_is_followed_in_each_directory(self):
+        self.assertEqual(['Corp'], list(self._sut.chats))
+        self.assertEqual(self._paths, sorted(self._sut.chats['Corp']))
+
+    def test_read_sources_tags_messages_with_directory_and_listener(self):
+        self._write(self._paths[1], "[ 2015.03.05 21:04:03 ] Some Dude > MSG")
+
+        self.assertEqual([(self._paths[1], 'Pilot Two', ["[ 2015.03.05 21:04:03 ] Some Dude > MSG"])],
+                         self._sut.read_sources('Corp'))
+
+    def _read_all(self, sut):
+        messages = []
+        reads = 0
+        while True:
+            reads += 1
+            for _, _, source_messages in sut.read_sources('Corp'):
+                messages.extend(source_messages)
+            if not sut.is_behind('Corp'):
+                return messages, reads
+
+    def test_read_sources_reads_at_most_max_bytes_per_log(self):
+        sut = EveChatLogDirectoryMonitor(self._paths, max_bytes=100)
+        lines = ["[ 2015.03.05 21:04:0{0} ] Some Dude > MSG {0}".format(index) for index in range(3)]
+        for line in lines:
+            self._write(self._paths[0], line)
+
+        messages, reads = self._read_all(sut)
+
+        self.assertEqual(lines, messages)
+        self.assertTrue(reads >= 3)
+        sut.remove_chat_log('Corp')
+
+    def test_read_sources_reads_rest_of_old_log_before_new_log(self):
+        sut = EveChatLogDirectoryMonitor(self._paths, max_bytes=100)
+        old_path = path.join(self._paths[0], 'Corp_20150305_200000.txt')
+        old_lines = ["[ 2015.03.05 20:04:0{0} ] Some Dude > OLD {0}".format(index) for index in range(2)]
+        with open(old_path, 'wb') as log_file:
+            log_file.write("".join(EveChatLogReader.chat_line_delimiter + line + "\r\n"
+                                   for line in old_lines).encode(EveChatLogReader.encoding))
+        sut._draining[('Corp', self._paths[0])] = (EveChatLogReader(old_path, 0, 100),)
+        self._write(self._paths[0], "[ 2015.03.05 21:04:03 ] Some Dude > NEW")
+
+        messages, _ = self._read_all(sut)
+
+        self.assertEqual(old_lines + ["[ 2015.03.05 21:04:03 ] Some Dude > NEW"], messages)
+        self.assertEqual({}, sut._draining)
+        sut.remove_chat_log('Corp')
+
+    def _create(self, log_dir, file_name, lines):
+        with open(path.join(log_dir, file_name), 'wb') as log_file:
+            log_file.write("".join(EveChatLogReader.chat_line_delimiter + line + "\r\n"
+                                   for line in lines).encode(EveChatLogReader.encoding))
+
+        event = MagicMock()
+        event.is_directory = False
+        event.src_path = path.join(log_dir, file_name)
+        return event
+
+    def test_rotation_reads_rest_of_old_log_then_new_log_from_start(self):
+        modified_callable = MagicMock()
+        self._sut.add_modified_callable(modified_callable)
+        self._write(self._paths[0], "[ 2015.03.05 21:04:03 ] Some Dude > LAST OLD")
+
+        self._sut.on_create(self._create(self._paths[0], 'Corp_20150305_220000.txt',
+                                         ["[ 2015.03.05 22:00:01 ] Some Dude > FIRST NEW"]), self._paths[0])
+
+        modified_callable.assert_called_once_with('Corp')
+        self.assertEqual(["[ 2015.03.05 21:04:03 ] Some Dude > LAST OLD",
+                          "[ 2015.03.05 22:00:01 ] Some Dude > FIRST NEW"], self._sut.read_messages('Corp'))
+        self.assertEqual({}, self._sut._draining)
+        self.assertEqual(path.join(self._paths[0], 'Corp_20150305_220000.txt'),
+                         self._sut.chats['Corp'][self._paths[0]].path)
+
+    def test_rotation_ignores_older_and_current_logs(self):
+        current_log = self._sut.chats['Corp'][self._paths[0]]
+
+        self._sut.on_create(self._create(self._paths[0], 'Corp_20150305_200000.txt', []), self._paths[0])
+        self._sut.on_create(self._create(self._paths[0], 'Corp_20150305_210403.txt', []), self._paths[0])
+
+        self.assertIs(current_log, self._sut.chats['Corp'][self._paths[0]])
+        self.assertEqual({}, self._sut._draining)
+
+    def test_new_log_is_detected_by_running_observer(self):
+        rotated = Event()
+        self._sut.add_modified_callable(lambda chat_name: rotated.set())
+        self._sut.start()
+        try:
+            self._create(self._paths[1], 'Corp_20150305_220000.txt', ["\r\n  ------\r\n    Listener:        Pilot Two",
+                                                                      "[ 2015.03.05 22:00:01 ] Some Dude > NEW"])
+
+            self.assertTrue(rotated.wait(5))
+        finally:
+            self._sut.stop()
+
+        (directory, listener, messages), = self._sut.read_sources('Corp')
+        self.assertEqual((self._paths[1], 'Pilot Two'), (directory, listener))
+        self.assertEqual("[ 2015.03.05 22:00:01 ] Some Dude > NEW", messages[-1])
+
+    def test_logs_created_while_stopped_are_read_after_start(self):
+        self._sut.start()
+        self._sut.stop()
+        self._create(self._paths[0], 'Corp_20150305_220000.txt', ["[ 2015.03.05 22:00:01 ] Some Dude > NEW"])
+        self._create(self._paths[0], 'Local_20150305_220000.txt', ["[ 2015.03.05 22:00:02 ] Some Dude > LOCAL"])
+
+        self._sut.start()
+        self._sut.stop()
+
+        self.assertEqual(path.join(self._paths[0], 'Corp_20150305_220000.txt'),
+                         self._sut.chats['Corp'][self._paths[0]].path)
+        self.assertEqual(["[ 2015.03.05 22:00:01 ] Some Dude > NEW"], self._sut.read_messages('Corp'))
+        self.assertEqual(["[ 2015.03.05 22:00:02 ] Some Dude > LOCAL"], self._sut.read_messages('Local'))
+        self._sut.remove_chat_log('Local')
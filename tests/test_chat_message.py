@@ -1,7 +1,11 @@
+import os
+import pickle
+from itertools import count
 from unittest import TestCase, mock
-from unittest.mock import MagicMock, call
+from unittest.mock import MagicMock
 from datetime import datetime
-from py_eve_chat_mon.chat_message import parse_msg, EveChatLogReader
+from py_eve_chat_mon.chat_message import ChatMessage, parse_msg, parse_batch, parse_timestamp, split_line, \
+    get_listener, EveChatLogReader
 
 MESSAGE_SINGLE_LINE = "[ 2015.03.05 21:04:03 ] Some Dude > MSG"
 MESSAGE_MULTI_LINE = "[ 2015.03.05 21:04:03 ] Some Dude > MSG\nON NEXT LINE\nANOTHER LINE"
@@ -11,8 +15,13 @@ MESSAGE_WITH_BOMS = EveChatLogReader.chat_line_delimiter.join(["[ 2015.03.05 21:
                                                                " middle ",
                                                                " end msg"])
 
-READ_MULTI_MESSAGES = EveChatLogReader.chat_line_delimiter.join(['', MESSAGE_SINGLE_LINE, MESSAGE_MULTI_LINE])
-READ_SINGLE_MESSAGES = EveChatLogReader.chat_line_delimiter.join(['', MESSAGE_SINGLE_LINE])
+READ_MULTI_MESSAGES = EveChatLogReader.chat_line_delimiter.join(['', MESSAGE_SINGLE_LINE + "\r\n",
+                                                                 MESSAGE_MULTI_LINE + "\r\n"])
+READ_SINGLE_MESSAGES = EveChatLogReader.chat_line_delimiter.join(['', MESSAGE_SINGLE_LINE + "\r\n"])
+
+
+def encode(text):
+    return text.encode(EveChatLogReader.encoding)
 
 
 class TestParseMsg(TestCase):
@@ -49,18 +58,173 @@ class TestParseMsg(TestCase):
     def test_parse_calls_md5_with_proper_msg(self, mock_md5):
         line = "[ 2015.03.05 21:04:03 ] Some Dude > MSG\nON NEXT LINE\nANOTHER LINE"
 
-        parse_msg(line)
+        parse_msg(line)['hash']
 
         mock_md5.assert_called_with("MSG\nON NEXT LINE\nANOTHER LINE")
 
+    @mock.patch('py_eve_chat_mon.chat_message.hash')
+    def test_parse_msg_does_not_hash_until_accessed(self, mock_md5):
+        parse_msg(MESSAGE_SINGLE_LINE)
+
+        self.assertFalse(mock_md5.called)
+
+    def test_parse_msg_parses_non_standard_spacing(self):
+        result = parse_msg("  [\t2015.03.05 21:04:03\t]\tSome Dude\t>\tMSG")
+
+        self.assertEqual(datetime(2015, 3, 5, 21, 4, 3), result['timestamp'])
+        self.assertEqual("Some Dude", result['username'])
+        self.assertEqual("MSG", result['message'])
+
+
+class TestChatMessage(TestCase):
+
+    def setUp(self):
+        self._sut = parse_msg(MESSAGE_MULTI_LINE)
+
+    def test_supports_attribute_access(self):
+        self.assertEqual("Some Dude", self._sut.username)
+        self.assertEqual(datetime(2015, 3, 5, 21, 4, 3), self._sut.timestamp)
+
+    def test_supports_dict_access(self):
+        self.assertEqual(["timestamp", "username", "message", "line", "hash"], self._sut.keys())
+        self.assertTrue("hash" in self._sut)
+        self.assertEqual(MESSAGE_MULTI_LINE, self._sut.get("line"))
+        self.assertIsNone(self._sut.get("missing"))
+        self.assertRaises(KeyError, self._sut.__getitem__, "missing")
+
+    def test_equals_equivalent_dict(self):
+        self.assertEqual(dict(self._sut.items()), self._sut)
+        self.assertNotEqual({}, self._sut)
+
+    def test_rebuilds_standard_line(self):
+        self.assertIsNone(self._sut._line)
+        self.assertEqual(MESSAGE_MULTI_LINE, self._sut.line)
+
+    def test_keeps_non_standard_line(self):
+        line = "  [ 2015.03.05 21:04:03 ]  Some Dude >  MSG"
+        result = parse_msg(line)
+
+        self.assertEqual(line, result.line)
+        self.assertEqual(" MSG", result.message)
+
+    def test_keeps_line_with_non_canonical_timestamp(self):
+        line = "[ 2015.3.5 21:04:03 ] Some Dude > MSG"
+
+        self.assertEqual(line, parse_msg(line).line)
+
+    def test_keeps_line_with_timestamp_strftime_does_not_reproduce(self):
+        line = "[ 0999.03.05 21:04:03 ] Some Dude > MSG"
+
+        self.assertEqual(line, parse_msg(line).line)
+
+    def test_has_no_instance_dict(self):
+        self.assertRaises(AttributeError, setattr, self._sut, "extra", 1)
+
+    def test_pickles_as_equal_message(self):
+        message = parse_msg(MESSAGE_SINGLE_LINE)
+
+        self.assertEqual(message, pickle.loads(pickle.dumps(message)))
+
+    def test_tags_are_not_compared(self):
+        message = parse_batch([MESSAGE_SINGLE_LINE], "logs", "Pilot One")[0]
+
+        self.assertEqual(("logs", "Pilot One"), (message.source, message.listener))
+        self.assertEqual(parse_batch([MESSAGE_SINGLE_LINE], "other_logs", "Pilot Two")[0], message)
+
+    def test_computes_hash_once(self):
+        with mock.patch('py_eve_chat_mon.chat_message.hash') as mock_md5:
+            mock_md5.return_value = "10"
+            message = ChatMessage(datetime(2015, 3, 5, 21, 4, 3), "Some Dude", "MSG")
+
+            self.assertEqual("10", message.hash)
+            self.assertEqual("10", message['hash'])
+            mock_md5.assert_called_once_with("MSG")
+
+
+class TestSplitLine(TestCase):
+
+    def test_split_line_returns_none_on_invalid_line(self):
+        self.assertIsNone(split_line("asdfasdf asldkfj alksdfj ;alskdfj"))
+
+    def test_split_line_splits_standard_line(self):
+        self.assertEqual(("2015.03.05 21:04:03", "Some Dude", "MSG\nON NEXT LINE\nANOTHER LINE"),
+                         split_line(MESSAGE_MULTI_LINE))
+
+    def test_split_line_splits_on_first_separator(self):
+        self.assertEqual(("2015.03.05 21:04:03", "Some Dude", "a > b"),
+                         split_line("[ 2015.03.05 21:04:03 ] Some Dude > a > b"))
+
+    def test_split_line_skips_gt_without_white_space(self):
+        self.assertEqual(("2015.03.05 21:04:03", "Some>Dude", "MSG"),
+                         split_line("[ 2015.03.05 21:04:03 ] Some>Dude > MSG"))
+
+
+class TestParseTimestamp(TestCase):
+
+    def test_parse_timestamp_parses_fixed_width_timestamp(self):
+        self.assertEqual(datetime(2015, 3, 5, 21, 4, 3), parse_timestamp("2015.03.05 21:04:03"))
+
+    def test_parse_timestamp_parses_non_padded_timestamp(self):
+        self.assertEqual(datetime(2015, 3, 5, 21, 4, 3), parse_timestamp("2015.3.5 21:04:03"))
+
+    def test_parse_timestamp_raises_on_invalid_timestamp(self):
+        self.assertRaises(ValueError, parse_timestamp, "2015.03.05 2x:04:03")
+
+    def test_parse_timestamp_reuses_datetime_for_same_second(self):
+        self.assertIs(parse_timestamp("2015.03.05 21:04:04"), parse_timestamp("2015.03.05 21:04:04"))
+
+
+class TestParseBatch(TestCase):
+
+    def test_parse_batch_matches_parse_msg(self):
+        lines = [MESSAGE_SINGLE_LINE, MESSAGE_MULTI_LINE]
+
+        self.assertEqual([parse_msg(line) for line in lines], parse_batch(lines))
+
+    def test_parse_batch_skips_invalid_lines(self):
+        result = parse_batch(["Channel ID: local", MESSAGE_SINGLE_LINE])
+
+        self.assertEqual(1, len(result))
+        self.assertEqual(MESSAGE_SINGLE_LINE, result[0]['line'])
+
+    def test_parse_batch_returns_empty_list_for_no_lines(self):
+        self.assertEqual([], parse_batch([]))
+
+    def test_parse_batch_skips_lines_not_accepted(self):
+        accepted = []
+
+        def accept(username, message):
+            accepted.append((username, message))
+            return False
+
+        self.assertEqual([], parse_batch([MESSAGE_SINGLE_LINE], accept=accept))
+        self.assertEqual([(parse_msg(MESSAGE_SINGLE_LINE).username, parse_msg(MESSAGE_SINGLE_LINE).message)], accepted)
+
+    @mock.patch('py_eve_chat_mon.chat_message._get_timestamp_entry')
+    def test_parse_batch_does_not_parse_timestamp_of_skipped_lines(self, mock_get_timestamp_entry):
+        parse_batch([MESSAGE_SINGLE_LINE], accept=lambda username, message: False)
+
+        self.assertFalse(mock_get_timestamp_entry.called)
+
 class TestEveChatLogReader(TestCase):
 
     def setUp(self):
         self._patch_open = mock.patch('py_eve_chat_mon.chat_message.open', create=True)
         self._mock_open = self._patch_open.start()
 
+        self._file_handle = self._mock_open.return_value = MagicMock()
+        self._file_handle.seek.return_value = 0
+        self._file_handle.read.return_value = b''
+
+        # every stat after the first reports a new modification time unless a test says otherwise
+        self._mtimes = count()
+        self._patch_fstat = mock.patch('py_eve_chat_mon.chat_message.os.fstat')
+        self._mock_fstat = self._patch_fstat.start()
+        self._mock_fstat.side_effect = lambda fileno: MagicMock(st_size=1000, st_mtime=next(self._mtimes))
+
     def tearDown(self):
         self._patch_open.stop()
+        self._patch_fstat.stop()
 
     def test_init_sets_path(self):
         sut = EveChatLogReader("path")
@@ -70,43 +234,56 @@ class TestEveChatLogReader(TestCase):
     def test_init_opens_with_correct_path(self):
         sut = EveChatLogReader("path")
 
-        self._mock_open.assert_called_with('path', 'r', encoding='utf-16-le')
+        self._mock_open.assert_called_with('path', 'rb')
 
-    def test_init_reads_file_to_end(self):
-        file_handle = self._mock_open.return_value = MagicMock()
-        file_handle.read = MagicMock()
+    def test_init_seeks_file_to_end(self):
+        self._file_handle.seek.return_value = 10
 
         sut = EveChatLogReader("path")
 
-        file_handle.read.assert_called_with(None)
+        self._file_handle.seek.assert_called_with(0, os.SEEK_END)
+        self.assertEqual(10, sut.offset)
 
-    def test_destroy_closes_file_handle(self):
-        file_handle = self._mock_open.return_value = MagicMock()
-        file_handle.close = MagicMock()
+    def test_init_aligns_odd_offset_to_code_unit(self):
+        self._file_handle.seek.side_effect = [11, 10]
 
+        sut = EveChatLogReader("path")
+
+        self._file_handle.seek.assert_called_with(10)
+        self.assertEqual(10, sut.offset)
+
+    def test_destroy_closes_file_handle(self):
         sut = EveChatLogReader("path")
         sut.destroy()
 
-        file_handle.close.assert_called_once()
+        self._file_handle.close.assert_called_once()
 
     def test_read_message_reads_to_end(self):
-        file_handle = self._mock_open.return_value = MagicMock()
-        file_handle.read = MagicMock()
+        sut = EveChatLogReader("path")
+        sut.read_messages()
+
+        self._file_handle.read.assert_called_once_with()
+
+    def test_read_message_counts_bytes_read(self):
+        self._file_handle.read.return_value = encode(READ_SINGLE_MESSAGES)
+        sut = EveChatLogReader("path")
+        sut.size = None
+
+        sut.read_messages()
 
-        calls = []
+        self.assertEqual(len(encode(READ_SINGLE_MESSAGES)), sut.bytes_read)
+        self.assertTrue(sut.decode_time > 0)
 
-        for i in range(file_handle.read.call_count + 1):
-            calls.append(call(None))
+    def test_read_message_advances_offset(self):
+        self._file_handle.read.return_value = encode(READ_SINGLE_MESSAGES)
 
         sut = EveChatLogReader("path")
         sut.read_messages()
 
-        file_handle.read.assert_has_calls(calls)
+        self.assertEqual(len(encode(READ_SINGLE_MESSAGES)), sut.offset)
 
     def test_read_message_splits_single_message(self):
-        file_handle = self._mock_open.return_value = MagicMock()
-        file_handle.read = MagicMock()
-        file_handle.read.return_value = READ_SINGLE_MESSAGES
+        self._file_handle.read.return_value = encode(READ_SINGLE_MESSAGES)
 
         sut = EveChatLogReader("path")
         messages = sut.read_messages()
@@ -115,9 +292,7 @@ class TestEveChatLogReader(TestCase):
         self.assertEqual(MESSAGE_SINGLE_LINE, messages[0])
 
     def test_read_message_splits_multiple_messages(self):
-        file_handle = self._mock_open.return_value = MagicMock()
-        file_handle.read = MagicMock()
-        file_handle.read.return_value = READ_MULTI_MESSAGES
+        self._file_handle.read.return_value = encode(READ_MULTI_MESSAGES)
 
         sut = EveChatLogReader("path")
         messages = sut.read_messages()
@@ -127,9 +302,7 @@ class TestEveChatLogReader(TestCase):
         self.assertEqual(MESSAGE_MULTI_LINE, messages[1])
 
     def test_read_message_cleans_trailing_white_space(self):
-        file_handle = self._mock_open.return_value = MagicMock()
-        file_handle.read = MagicMock()
-        file_handle.read.return_value = MESSAGE_WITH_TRAILING_WHITE
+        self._file_handle.read.return_value = encode(MESSAGE_WITH_TRAILING_WHITE + "\r\n")
 
         sut = EveChatLogReader("path")
         messages = sut.read_messages()
@@ -137,11 +310,159 @@ class TestEveChatLogReader(TestCase):
         self.assertEqual("[ 2015.03.05 21:04:03 ] Some Dude > MSG\nON NEXT LINE\nANOTHER LINE", messages[0])
 
     def test_read_message_cleans_boms(self):
-        file_handle = self._mock_open.return_value = MagicMock()
-        file_handle.read = MagicMock()
-        file_handle.read.return_value = MESSAGE_WITH_BOMS
+        self._file_handle.read.return_value = encode(MESSAGE_WITH_BOMS + "\r\n")
 
         sut = EveChatLogReader("path")
         messages = sut.read_messages()
 
         self.assertFalse(EveChatLogReader.chat_line_delimiter in messages[0])
+
+    def test_read_message_holds_incomplete_message_until_next_read(self):
+        data = encode(READ_SINGLE_MESSAGES)
+        self._file_handle.read.side_effect = [data[:20], data[20:]]
+
+        sut = EveChatLogReader("path")
+
+        self.assertEqual([], sut.read_messages())
+        self.assertEqual([MESSAGE_SINGLE_LINE], sut.read_messages())
+
+    def test_read_message_reads_at_most_max_bytes(self):
+        self._file_handle.read.return_value = encode(READ_SINGLE_MESSAGES)[:10]
+        sut = EveChatLogReader("path", max_bytes=10)
+
+        sut.read_messages()
+
+        self._file_handle.read.assert_called_once_with(10)
+
+    def test_read_message_is_behind_until_log_is_read_to_end(self):
+        data = encode(READ_MULTI_MESSAGES)
+        self._file_handle.read.side_effect = [data[:len(data) // 2], data[len(data) // 2:]]
+        self._mock_fstat.side_effect = None
+        self._mock_fstat.return_value = MagicMock(st_size=len(data), st_mtime=1)
+        sut = EveChatLogReader("path", 0, len(data) // 2)
+
+        messages = sut.read_messages()
+        self.assertTrue(sut.is_behind)
+        self.assertTrue(sut.has_changed())
+
+        messages += sut.read_messages()
+        self.assertFalse(sut.is_behind)
+        self.assertEqual([MESSAGE_SINGLE_LINE, MESSAGE_MULTI_LINE], messages)
+
+    def test_read_message_returns_completed_messages_before_partial_one(self):
+        data = encode(READ_MULTI_MESSAGES)
+        split_at = len(encode(READ_SINGLE_MESSAGES)) + 10
+        self._file_handle.read.side_effect = [data[:split_at], data[split_at:]]
+
+        sut = EveChatLogReader("path")
+
+        self.assertEqual([MESSAGE_SINGLE_LINE], sut.read_messages())
+        self.assertEqual([MESSAGE_MULTI_LINE], sut.read_messages())
+
+    def test_read_message_holds_split_code_unit_until_next_read(self):
+        data = encode(READ_SINGLE_MESSAGES)
+        self._file_handle.read.side_effect = [data[:-1], data[-1:]]
+
+        sut = EveChatLogReader("path")
+
+        self.assertEqual([], sut.read_messages())
+        self.assertEqual([MESSAGE_SINGLE_LINE], sut.read_messages())
+
+    def test_read_message_skips_read_of_unchanged_log(self):
+        self._mock_fstat.side_effect = None
+        self._mock_fstat.return_value = MagicMock(st_size=10, st_mtime=5)
+
+        sut = EveChatLogReader("path")
+
+        self.assertEqual([], sut.read_messages())
+        self.assertFalse(self._file_handle.read.called)
+
+    def test_read_message_starts_over_on_truncated_log(self):
+        self._file_handle.seek.return_value = 2000
+        self._file_handle.read.return_value = encode(READ_SINGLE_MESSAGES)
+
+        sut = EveChatLogReader("path")
+        self._file_handle.seek.return_value = 0
+        messages = sut.read_messages()
+
+        self._file_handle.seek.assert_called_with(0)
+        self.assertEqual([MESSAGE_SINGLE_LINE], messages)
+        self.assertEqual(len(encode(READ_SINGLE_MESSAGES)), sut.offset)
+
+    def test_has_changed_is_false_for_same_size_and_mtime(self):
+        self._mock_fstat.side_effect = None
+        self._mock_fstat.return_value = MagicMock(st_size=10, st_mtime=5)
+
+        sut = EveChatLogReader("path")
+
+        self.assertFalse(sut.has_changed())
+
+    def test_has_changed_is_true_for_new_size(self):
+        self._mock_fstat.side_effect = [MagicMock(st_size=10, st_mtime=5), MagicMock(st_size=12, st_mtime=5)]
+
+        sut = EveChatLogReader("path")
+
+        self.assertTrue(sut.has_changed())
+        self.assertFalse(self._file_handle.read.called)
+
+    def test_init_seeks_file_to_offset(self):
+        self._file_handle.seek.return_value = 10
+
+        sut = EveChatLogReader("path", 10)
+
+        self._file_handle.seek.assert_called_once_with(10)
+        self.assertEqual(10, sut.offset)
+
+    def test_init_with_offset_reads_rest_of_unchanged_log(self):
+        self._mock_fstat.side_effect = None
+        self._mock_fstat.return_value = MagicMock(st_size=1000, st_mtime=5)
+        self._file_handle.read.return_value = encode(READ_SINGLE_MESSAGES)
+
+        sut = EveChatLogReader("path", 0)
+
+        self.assertEqual([MESSAGE_SINGLE_LINE], sut.read_messages())
+
+    def test_position_excludes_incomplete_message(self):
+        self._file_handle.read.return_value = encode(READ_SINGLE_MESSAGES + EveChatLogReader.chat_line_delimiter +
+                                                     "[ 2015.03.05")
+
+        sut = EveChatLogReader("path")
+        sut.read_messages()
+
+        self.assertEqual(len(encode(READ_SINGLE_MESSAGES)), sut.position)
+
+    def test_read_message_remembers_last_message(self):
+        self._file_handle.read.return_value = encode(READ_MULTI_MESSAGES)
+
+        sut = EveChatLogReader("path")
+        sut.read_messages()
+
+        self.assertEqual(MESSAGE_MULTI_LINE, sut.last_message)
+
+    @mock.patch('py_eve_chat_mon.chat_message.get_listener')
+    def test_listener_is_read_from_header_once(self, mock_get_listener):
+        self._file_handle.seek.return_value = 10
+        mock_get_listener.return_value = "Some Pilot"
+
+        sut = EveChatLogReader("path")
+
+        self.assertEqual("Some Pilot", sut.listener)
+        self.assertEqual("Some Pilot", sut.listener)
+        mock_get_listener.assert_called_once_with("path")
+
+
+class TestGetListener(TestCase):
+
+    @mock.patch('py_eve_chat_mon.chat_message.open', create=True)
+    def test_get_listener_parses_header(self, mock_open):
+        header = EveChatLogReader.chat_line_delimiter + "\r\n\r\n  ------\r\n\r\n    Channel Name:    Corp\r\n" \
+                                                        "    Listener:        Some Pilot\r\n    Session started: x\r\n"
+        mock_open.return_value.__enter__.return_value.read.return_value = encode(header)
+
+        self.assertEqual("Some Pilot", get_listener("path"))
+
+    @mock.patch('py_eve_chat_mon.chat_message.open', create=True)
+    def test_get_listener_returns_none_without_header(self, mock_open):
+        mock_open.return_value.__enter__.return_value.read.return_value = b''
+
+        self.assertIsNone(get_listener("path"))
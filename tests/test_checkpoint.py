@@ -0,0 +1,190 @@
+import os
+from os import path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest.mock import patch
+from py_eve_chat_mon.chat_directory import EveChatLogDirectoryMonitor
+from py_eve_chat_mon.chat_message import EveChatLogReader, hash
+from py_eve_chat_mon.checkpoint import CheckpointStore, get_last_message, get_resume_offset
+
+DELIMITER = EveChatLogReader.chat_line_delimiter
+MESSAGE_ONE = "[ 2015.03.05 21:04:03 ] Some Dude > one"
+MESSAGE_TWO = "[ 2015.03.05 21:04:04 ] Some Dude > two"
+MESSAGE_THREE = "[ 2015.03.05 21:04:05 ] Some Dude > three"
+
+
+def write_log(file_path, *messages, mode='wb'):
+    with open(file_path, mode) as log_file:
+        for message in messages:
+            log_file.write((DELIMITER + message + "\r\n").encode(EveChatLogReader.encoding))
+
+
+class TestCheckpointStore(TestCase):
+
+    def setUp(self):
+        self._temp_dir = TemporaryDirectory()
+        self._store_path = path.join(self._temp_dir.name, 'checkpoints.json')
+
+    def tearDown(self):
+        self._temp_dir.cleanup()
+
+    def test_get_returns_none_without_checkpoint(self):
+        sut = CheckpointStore(self._store_path)
+
+        self.assertIsNone(sut.get('logs', 'Corp'))
+
+    def test_update_is_batched_until_flush_interval(self):
+        sut = CheckpointStore(self._store_path, flush_interval=60)
+
+        sut.update('logs', 'Corp', path.join('logs', 'Corp_20150305_210403.txt'), 10, MESSAGE_ONE)
+
+        self.assertFalse(path.exists(self._store_path))
+        self.assertEqual({'file': 'Corp_20150305_210403.txt', 'offset': 10, 'hash': hash(MESSAGE_ONE)},
+                         sut.get('logs', 'Corp'))
+
+    def test_update_flushes_after_flush_interval(self):
+        sut = CheckpointStore(self._store_path, flush_interval=0)
+
+        sut.update('logs', 'Corp', path.join('logs', 'Corp_20150305_210403.txt'), 10, MESSAGE_ONE)
+
+        self.assertTrue(path.exists(self._store_path))
+
+    def test_flush_if_due_writes_after_flush_interval(self):
+        sut = CheckpointStore(self._store_path, flush_interval=60)
+        self.assertIsNone(sut.flush_if_due())
+
+        sut.update('logs', 'Corp', path.join('logs', 'Corp_20150305_210403.txt'), 10, MESSAGE_ONE)
+        self.assertTrue(0 < sut.flush_if_due() <= 60)
+        self.assertFalse(path.exists(self._store_path))
+
+        sut.flush_interval = 0
+        self.assertIsNone(sut.flush_if_due())
+        self.assertTrue(path.exists(self._store_path))
+
+    def test_flushed_checkpoints_are_loaded(self):
+        sut = CheckpointStore(self._store_path, flush_interval=60)
+        sut.update('logs', 'Corp', path.join('logs', 'Corp_20150305_210403.txt'), 10, None)
+        sut.flush()
+
+        self.assertEqual({'file': 'Corp_20150305_210403.txt', 'offset': 10, 'hash': None},
+                         CheckpointStore(self._store_path).get('logs', 'Corp'))
+
+    def test_flush_replaces_store_atomically(self):
+        sut = CheckpointStore(self._store_path, flush_interval=60)
+        sut.update('logs', 'Corp', path.join('logs', 'Corp_20150305_210403.txt'), 10, None)
+
+        with patch('py_eve_chat_mon.checkpoint.os.replace') as mock_replace:
+            sut.flush()
+
+        mock_replace.assert_called_once_with(self._store_path + ".tmp", self._store_path)
+
+    def test_corrupt_store_is_ignored(self):
+        with open(self._store_path, 'w') as store_file:
+            store_file.write('{not json')
+
+        self.assertIsNone(CheckpointStore(self._store_path).get('logs', 'Corp'))
+
+
+class TestResumeOffset(TestCase):
+
+    def setUp(self):
+        self._temp_dir = TemporaryDirectory()
+        self._log_path = path.join(self._temp_dir.name, 'Corp_20150305_210403.txt')
+        write_log(self._log_path, MESSAGE_ONE, MESSAGE_TWO)
+        self._offset = os.path.getsize(self._log_path)
+
+    def tearDown(self):
+        self._temp_dir.cleanup()
+
+    def test_get_last_message_returns_message_before_offset(self):
+        self.assertEqual(MESSAGE_TWO, get_last_message(self._log_path, self._offset))
+
+    def test_valid_checkpoint_returns_offset(self):
+        checkpoint = {'offset': self._offset, 'hash': hash(MESSAGE_TWO)}
+
+        self.assertEqual(self._offset, get_resume_offset(self._log_path, checkpoint))
+
+    def test_checkpoint_of_other_message_returns_none(self):
+        checkpoint = {'offset': self._offset, 'hash': hash(MESSAGE_ONE)}
+
+        self.assertIsNone(get_resume_offset(self._log_path, checkpoint))
+
+    def test_checkpoint_past_end_of_log_returns_none(self):
+        checkpoint = {'offset': self._offset + 2, 'hash': hash(MESSAGE_TWO)}
+
+        self.assertIsNone(get_resume_offset(self._log_path, checkpoint))
+
+    def test_checkpoint_of_missing_log_returns_none(self):
+        checkpoint = {'offset': 0, 'hash': None}
+
+        self.assertIsNone(get_resume_offset(path.join(self._temp_dir.name, 'missing.txt'), checkpoint))
+
+
+class TestResumeChatLogs(TestCase):
+
+    def setUp(self):
+        self._temp_dir = TemporaryDirectory()
+        self._log_dir = path.join(self._temp_dir.name, 'Chatlogs')
+        self._store_path = path.join(self._temp_dir.name, 'checkpoints.json')
+        os.mkdir(self._log_dir)
+
+        self._log_path = path.join(self._log_dir, 'Corp_20150305_210403.txt')
+        write_log(self._log_path, MESSAGE_ONE)
+
+    def tearDown(self):
+        self._temp_dir.cleanup()
+
+    def _restart(self):
+        """Saves the checkpoints of a monitor and returns a new one using them"""
+        checkpoints = CheckpointStore(self._store_path)
+        sut = EveChatLogDirectoryMonitor(self._log_dir, checkpoints=checkpoints)
+        sut.save_checkpoints()
+        checkpoints.flush()
+        sut.remove_chat_log('Corp')  # closes the log
+
+        return EveChatLogDirectoryMonitor(self._log_dir, checkpoints=CheckpointStore(self._store_path))
+
+    def test_without_checkpoints_reads_from_end(self):
+        sut = EveChatLogDirectoryMonitor(self._log_dir)
+
+        self.assertEqual([], sut.read_messages('Corp'))
+
+    def test_does_not_repeat_messages_before_checkpoint(self):
+        write_log(self._log_path, MESSAGE_TWO, mode='ab')
+        sut = self._restart()
+        write_log(self._log_path, MESSAGE_THREE, mode='ab')
+
+        self.assertEqual([MESSAGE_THREE], sut.read_messages('Corp'))
+
+    def test_resumes_from_checkpoint(self):
+        checkpoints = CheckpointStore(self._store_path)
+        EveChatLogDirectoryMonitor(self._log_dir, checkpoints=checkpoints).save_checkpoints()
+        checkpoints.flush()
+
+        write_log(self._log_path, MESSAGE_TWO, MESSAGE_THREE, mode='ab')
+        sut = EveChatLogDirectoryMonitor(self._log_dir, checkpoints=CheckpointStore(self._store_path))
+
+        self.assertEqual([MESSAGE_TWO, MESSAGE_THREE], sut.read_messages('Corp'))
+        self.assertEqual([], sut.read_messages('Corp'))
+
+    def test_drains_old_log_before_new_log(self):
+        checkpoints = CheckpointStore(self._store_path)
+        EveChatLogDirectoryMonitor(self._log_dir, checkpoints=checkpoints).save_checkpoints()
+        checkpoints.flush()
+
+        write_log(self._log_path, MESSAGE_TWO, mode='ab')
+        write_log(path.join(self._log_dir, 'Corp_20150305_220000.txt'), MESSAGE_THREE)
+        sut = EveChatLogDirectoryMonitor(self._log_dir, checkpoints=CheckpointStore(self._store_path))
+
+        self.assertEqual(['Corp'], sut.get_changed_chats())
+        self.assertEqual([MESSAGE_TWO, MESSAGE_THREE], sut.read_messages('Corp'))
+
+    def test_invalid_checkpoint_reads_from_end(self):
+        checkpoints = CheckpointStore(self._store_path)
+        EveChatLogDirectoryMonitor(self._log_dir, checkpoints=checkpoints).save_checkpoints()
+        checkpoints.flush()
+
+        write_log(self._log_path, MESSAGE_THREE, MESSAGE_TWO)
+        sut = EveChatLogDirectoryMonitor(self._log_dir, checkpoints=CheckpointStore(self._store_path))
+
+        self.assertEqual([], sut.read_messages('Corp'))
@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta
+from unittest import TestCase
+from unittest.mock import MagicMock
+from py_eve_chat_mon.chat_message import ChatMessage
+from py_eve_chat_mon.dedup import DuplicateFilter
+from py_eve_chat_mon.exceptions import InvalidCallable
+
+NOW = datetime(2015, 3, 5, 21, 4, 3)
+
+
+def message(body, username="Some Dude", seconds=0, listener=None):
+    return ChatMessage(NOW + timedelta(seconds=seconds), username, body, listener=listener)
+
+
+class TestDuplicateFilter(TestCase):
+
+    def setUp(self):
+        self._handler = MagicMock()
+        self._sut = DuplicateFilter(self._handler)
+
+    def test_init_raises_exception_if_handler_is_not_callable(self):
+        self.assertRaises(InvalidCallable, DuplicateFilter, 1)
+
+    def test_passes_new_messages_to_handler(self):
+        messages = [message("one"), message("two")]
+
+        self._sut("Corp", messages)
+
+        self._handler.assert_called_once_with("Corp", messages)
+
+    def test_drops_copies_from_other_logs(self):
+        self._sut("Corp", [message("one", listener="Pilot One")])
+        self._sut("Corp", [message("one", listener="Pilot Two"), message("two", listener="Pilot Two")])
+
+        self.assertEqual(["one"], [m.message for m in self._handler.call_args_list[0][0][1]])
+        self.assertEqual(["two"], [m.message for m in self._handler.call_args_list[1][0][1]])
+        self.assertEqual(1, self._sut.duplicates)
+
+    def test_drops_copies_in_same_batch(self):
+        self._sut("Corp", [message("one", listener="Pilot One"), message("one", listener="Pilot Two")])
+
+        self.assertEqual(1, len(self._handler.call_args[0][1]))
+
+    def test_keeps_repeats_within_one_log(self):
+        self._sut("Corp", [message("one", listener="Pilot One"), message("one", listener="Pilot One")])
+        self._sut("Corp", [message("one", listener="Pilot Two"), message("one", listener="Pilot Two"),
+                           message("one", listener="Pilot Two")])
+
+        self.assertEqual(2, len(self._handler.call_args_list[0][0][1]))
+        self.assertEqual(1, len(self._handler.call_args_list[1][0][1]))
+        self.assertEqual(2, self._sut.duplicates)
+
+    def test_does_not_call_handler_for_only_duplicates(self):
+        self._sut("Corp", [message("one")])
+        self._sut("Corp", [message("one")])
+
+        self._handler.assert_called_once()
+
+    def test_keeps_repeats_by_time_user_and_chat(self):
+        self._sut("Corp", [message("one")])
+
+        self.assertEqual(3, len(self._sut.filter("Corp", [message("one", seconds=1),
+                                                           message("one", username="Other Dude"),
+                                                           message("two")])))
+        self.assertEqual(1, len(self._sut.filter("Alliance", [message("one")])))
+
+    def test_forgets_messages_older_than_window(self):
+        self._sut = DuplicateFilter(self._handler, window=10)
+        self._sut("Corp", [message("one")])
+        self._sut("Corp", [message("two", seconds=11)])
+
+        self.assertEqual(1, len(self._sut))
+        self.assertEqual(1, len(self._sut.filter("Corp", [message("one")])))
+
+    def test_remembers_at_most_max_entries(self):
+        self._sut = DuplicateFilter(self._handler, max_entries=2)
+
+        self._sut("Corp", [message("one"), message("two"), message("three")])
+
+        self.assertEqual(2, len(self._sut))
+        self.assertEqual(1, len(self._sut.filter("Corp", [message("one")])))
@@ -0,0 +1,165 @@
+from threading import Event, Lock, Thread
+from time import sleep
+from unittest import TestCase
+from unittest.mock import MagicMock
+from py_eve_chat_mon.dispatch import HandlerDispatcher, BLOCK, DROP_OLDEST, COALESCE
+from py_eve_chat_mon.exceptions import InvalidCallable, InvalidDispatchPolicy, InvalidMonitorState
+
+
+class RecordingHandler(object):
+
+    def __init__(self, release=None):
+        self.release = release
+        self.calls = []
+        self.started = Event()
+        self._lock = Lock()
+
+    def __call__(self, chat, messages):
+        self.started.set()
+        if self.release:
+            self.release.wait(5)
+
+        with self._lock:
+            self.calls.append((chat, messages))
+
+
+class TestHandlerDispatcher(TestCase):
+
+    def setUp(self):
+        self._sut = None
+
+    def tearDown(self):
+        if self._sut:
+            self._sut.close()
+
+    def test_init_raises_exception_if_handler_is_not_callable(self):
+        self.assertRaises(InvalidCallable, HandlerDispatcher, 1)
+
+    def test_init_raises_exception_on_unknown_overflow_policy(self):
+        self.assertRaises(InvalidDispatchPolicy, HandlerDispatcher, lambda chat, messages: None, overflow='explode')
+
+    def test_init_raises_exception_without_workers_or_queue(self):
+        self.assertRaises(ValueError, HandlerDispatcher, lambda chat, messages: None, workers=0)
+        self.assertRaises(ValueError, HandlerDispatcher, lambda chat, messages: None, max_queue=0,
+                          overflow=DROP_OLDEST)
+
+    def test_calls_handler_with_chat_and_messages(self):
+        handler = MagicMock()
+        self._sut = HandlerDispatcher(handler, workers=2)
+
+        self._sut('Corp', ['m1'])
+        self._sut.close()
+
+        handler.assert_called_once_with('Corp', ['m1'])
+
+    def test_keeps_order_per_chat(self):
+        handler = RecordingHandler()
+        self._sut = HandlerDispatcher(handler, workers=4)
+
+        for i in range(200):
+            self._sut('Corp' if i % 2 else 'Local', [i])
+        self._sut.close()
+
+        self.assertEqual(list(range(1, 200, 2)), [messages[0] for chat, messages in handler.calls if chat == 'Corp'])
+        self.assertEqual(list(range(0, 200, 2)), [messages[0] for chat, messages in handler.calls if chat == 'Local'])
+
+    def test_slow_chat_does_not_block_other_chats(self):
+        release = Event()
+        handled = Event()
+        self._sut = HandlerDispatcher(lambda chat, messages: release.wait(5) if chat == 'Slow' else handled.set(),
+                                      workers=2)
+
+        self._sut('Slow', [1])
+        self._sut('Fast', [2])
+
+        self.assertTrue(handled.wait(1))
+        release.set()
+
+    def test_drop_oldest_drops_oldest_waiting_batch(self):
+        release = Event()
+        handler = RecordingHandler(release)
+        self._sut = HandlerDispatcher(handler, workers=1, max_queue=2, overflow=DROP_OLDEST)
+
+        self._sut('Corp', [0])
+        handler.started.wait(1)
+        self._sut('Corp', [1])
+        self._sut('Local', [2])
+        self._sut('Corp', [3])
+        release.set()
+        self._sut.close()
+
+        self.assertEqual([[0], [2], [3]], [messages for chat, messages in handler.calls])
+        stats = self._sut.get_stats()
+        self.assertEqual(1, stats['dropped_batches'])
+        self.assertEqual(1, stats['dropped_messages'])
+
+    def test_coalesce_appends_to_waiting_batch_of_chat(self):
+        release = Event()
+        handler = RecordingHandler(release)
+        self._sut = HandlerDispatcher(handler, workers=1, max_queue=1, overflow=COALESCE)
+
+        self._sut('Corp', [0])
+        handler.started.wait(1)
+        self._sut('Corp', [1])
+        self._sut('Corp', [2, 3])
+        release.set()
+        self._sut.close()
+
+        self.assertEqual([('Corp', [0]), ('Corp', [1, 2, 3])], handler.calls)
+        self.assertEqual(1, self._sut.get_stats()['coalesced_batches'])
+
+    def test_block_waits_for_free_slot(self):
+        release = Event()
+        handler = RecordingHandler(release)
+        self._sut = HandlerDispatcher(handler, workers=1, max_queue=1, overflow=BLOCK)
+
+        self._sut('Corp', [0])
+        handler.started.wait(1)
+        self._sut('Corp', [1])
+
+        enqueued = Event()
+        producer = Thread(target=lambda: (self._sut('Corp', [2]), enqueued.set()))
+        producer.start()
+
+        self.assertFalse(enqueued.wait(0.1))
+        release.set()
+        self.assertTrue(enqueued.wait(1))
+        producer.join()
+
+    def test_reports_queue_depth_and_handler_time(self):
+        release = Event()
+        handler = RecordingHandler(release)
+        self._sut = HandlerDispatcher(handler, workers=1)
+
+        self._sut('Corp', [0])
+        handler.started.wait(1)
+        self._sut('Corp', [1])
+
+        self.assertEqual(1, self._sut.queue_depth)
+        sleep(0.02)
+        release.set()
+        self._sut.close()
+
+        stats = self._sut.get_stats()
+        self.assertEqual(0, stats['queue_depth'])
+        self.assertEqual(2, stats['handled_batches'])
+        self.assertEqual(1, stats['max_queue_depth'])
+        self.assertTrue(stats['max_handler_time'] >= 0.02)
+        self.assertTrue(stats['avg_handler_time'] > 0)
+
+    def test_handler_errors_do_not_stop_workers(self):
+        handler = MagicMock(side_effect=[ValueError(), None])
+        self._sut = HandlerDispatcher(handler, workers=1)
+
+        self._sut('Corp', [0])
+        self._sut('Corp', [1])
+        self._sut.close()
+
+        self.assertEqual(2, handler.call_count)
+        self.assertEqual(1, self._sut.get_stats()['handler_errors'])
+
+    def test_closed_dispatcher_raises_exception(self):
+        self._sut = HandlerDispatcher(MagicMock(), workers=1)
+        self._sut.close()
+
+        self.assertRaises(InvalidMonitorState, self._sut, 'Corp', [0])
@@ -0,0 +1,84 @@
+import re
+from unittest import TestCase
+from py_eve_chat_mon.filters import MessageFilter, build_line_filter
+
+
+class TestMessageFilter(TestCase):
+
+    def test_matches_everything_without_criteria(self):
+        self.assertTrue(MessageFilter().matches("Some Dude", "o7"))
+
+    def test_matches_usernames(self):
+        message_filter = MessageFilter(usernames=['Some Dude', 'Other Dude'])
+
+        self.assertTrue(message_filter.matches("Other Dude", "o7"))
+        self.assertFalse(message_filter.matches("Some Dudette", "o7"))
+
+    def test_matches_any_substring(self):
+        message_filter = MessageFilter(contains=['red', 'neut'])
+
+        self.assertTrue(message_filter.matches("Some Dude", "2 neuts in Jita"))
+        self.assertFalse(message_filter.matches("Some Dude", "clr"))
+
+    def test_matches_single_substring(self):
+        message_filter = MessageFilter(contains='Jita')
+
+        self.assertTrue(message_filter.matches("Some Dude", "in Jita"))
+        self.assertFalse(message_filter.matches("Some Dude", "J"))
+
+    def test_matches_pattern_anywhere_in_body(self):
+        message_filter = MessageFilter(pattern=r'\bred\b')
+
+        self.assertTrue(message_filter.matches("Some Dude", "1 red in Jita"))
+        self.assertFalse(message_filter.matches("Some Dude", "1 reds in Jita"))
+
+    def test_accepts_compiled_pattern(self):
+        message_filter = MessageFilter(pattern=re.compile('RED', re.IGNORECASE))
+
+        self.assertTrue(message_filter.matches("Some Dude", "1 red"))
+
+    def test_matches_only_if_all_criteria_match(self):
+        message_filter = MessageFilter(usernames=['Some Dude'], contains='Jita')
+
+        self.assertTrue(message_filter.matches("Some Dude", "in Jita"))
+        self.assertFalse(message_filter.matches("Other Dude", "in Jita"))
+        self.assertFalse(message_filter.matches("Some Dude", "in Amarr"))
+
+    def test_applies_to_all_chats_by_default(self):
+        self.assertTrue(MessageFilter().applies_to("Corp"))
+
+    def test_applies_to_matching_chats(self):
+        message_filter = MessageFilter(chats=['Intel*'])
+
+        self.assertTrue(message_filter.applies_to("Intel.North"))
+        self.assertFalse(message_filter.applies_to("Corp"))
+
+
+class TestBuildLineFilter(TestCase):
+
+    def test_returns_none_without_filters(self):
+        self.assertIsNone(build_line_filter("Corp", []))
+
+    def test_returns_none_if_no_filter_applies_to_chat(self):
+        self.assertIsNone(build_line_filter("Corp", [MessageFilter(chats=['Intel*'], contains='red')]))
+
+    def test_keeps_only_messages_matching_all_filters(self):
+        accept = build_line_filter("Corp", [MessageFilter(contains='Jita'), MessageFilter(usernames=['Some Dude'])])
+
+        self.assertTrue(accept("Some Dude", "in Jita"))
+        self.assertFalse(accept("Other Dude", "in Jita"))
+        self.assertFalse(accept("Some Dude", "in Amarr"))
+
+    def test_drops_messages_matching_exclude_filter(self):
+        accept = build_line_filter("Corp", [MessageFilter(usernames=['EVE System'], exclude=True)])
+
+        self.assertTrue(accept("Some Dude", "o7"))
+        self.assertFalse(accept("EVE System", "Channel changed"))
+
+    def test_ignores_filters_of_other_chats(self):
+        filters = [MessageFilter(chats=['Intel*'], contains='red'),
+                   MessageFilter(usernames=['EVE System'], exclude=True)]
+        accept = build_line_filter("Corp", filters)
+
+        self.assertTrue(accept("Some Dude", "o7"))
+        self.assertFalse(accept("EVE System", "o7"))
@@ -0,0 +1,109 @@
+from datetime import datetime, timedelta
+from os import path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest.mock import patch
+from py_eve_chat_mon.chat_message import EveChatLogReader, split_messages
+from py_eve_chat_mon.mapped_log import MappedChatLog, find_delimiter
+
+HEADER = "\r\n\r\n------------\r\n  Channel Name:    Local\r\n------------\r\n\r\n"
+START = datetime(2015, 3, 5, 21, 0, 0)
+
+
+def encode(text):
+    return text.encode(EveChatLogReader.encoding)
+
+
+def make_log(count):
+    records = [HEADER]
+    for i in range(count):
+        records.append("[ {0:%Y.%m.%d %H:%M:%S} ] Pilot {1} > message {1}\r\n".format(START + timedelta(seconds=i), i))
+
+    return EveChatLogReader.chat_line_delimiter + EveChatLogReader.chat_line_delimiter.join(records)
+
+
+class TestFindDelimiter(TestCase):
+
+    def test_skips_delimiter_bytes_at_odd_offset(self):
+        # U+FF41 followed by U+00FE encodes to 41 FF FE 00
+        buffer = encode("ａþ" + EveChatLogReader.chat_line_delimiter)
+
+        self.assertEqual(4, find_delimiter(buffer, 0, len(buffer)))
+
+
+class TestMappedChatLog(TestCase):
+
+    def setUp(self):
+        self._temp_dir = TemporaryDirectory()
+        self._log_path = path.join(self._temp_dir.name, 'Local_20150305_210000.txt')
+
+    def tearDown(self):
+        self._temp_dir.cleanup()
+
+    def _write(self, text, mode='wb'):
+        with open(self._log_path, mode) as log_file:
+            log_file.write(encode(text))
+
+    def _read(self, since=None, until=None):
+        with MappedChatLog(self._log_path) as sut:
+            return sut.read_messages(since, until)
+
+    def test_empty_log_returns_no_messages(self):
+        self._write("")
+
+        self.assertEqual([], self._read())
+
+    def test_returns_same_messages_as_split_messages(self):
+        text = make_log(100)
+        self._write(text)
+
+        self.assertEqual(split_messages(text), self._read())
+
+    def test_decodes_large_log_in_chunks(self):
+        text = make_log(100)
+        self._write(text)
+
+        with patch('py_eve_chat_mon.mapped_log.CHUNK_SIZE', 256):
+            self.assertEqual(split_messages(text), self._read())
+
+    def test_holds_incomplete_message_until_next_read(self):
+        self._write(make_log(2) + EveChatLogReader.chat_line_delimiter + "[ 2015.03.05 21:")
+
+        with MappedChatLog(self._log_path) as sut:
+            self.assertEqual(3, len(sut.read_messages()))
+            self.assertEqual(len(encode(make_log(2))), sut.position)
+
+            self._write("00:02 ] Pilot 2 > message 2\r\n", 'ab')
+            self.assertEqual(["[ 2015.03.05 21:00:02 ] Pilot 2 > message 2"], sut.read_messages())
+            self.assertEqual([], sut.read_messages())
+
+    def test_resumes_at_offset(self):
+        self._write(make_log(2))
+        offset = len(encode(make_log(1)))
+
+        with MappedChatLog(self._log_path, offset) as sut:
+            self.assertEqual(["[ 2015.03.05 21:00:01 ] Pilot 1 > message 1"], sut.read_messages())
+
+    def test_returns_messages_in_time_range(self):
+        self._write(make_log(5000))
+
+        with patch('py_eve_chat_mon.mapped_log.BISECT_MIN', 1024):
+            messages = self._read(START + timedelta(seconds=1000), START + timedelta(seconds=1003))
+
+        self.assertEqual(["[ 2015.03.05 21:16:40 ] Pilot 1000 > message 1000",
+                          "[ 2015.03.05 21:16:41 ] Pilot 1001 > message 1001",
+                          "[ 2015.03.05 21:16:42 ] Pilot 1002 > message 1002"], messages)
+
+    def test_does_not_decode_messages_before_since(self):
+        self._write(make_log(5000))
+
+        with patch('py_eve_chat_mon.mapped_log.split_messages', side_effect=split_messages) as mock_split:
+            messages = self._read(START + timedelta(seconds=4998))
+
+        self.assertEqual(2, len(messages))
+        self.assertLess(len(mock_split.call_args[0][0]), 200)
+
+    def test_time_range_past_end_returns_no_messages(self):
+        self._write(make_log(10))
+
+        self.assertEqual([], self._read(START + timedelta(hours=1)))
@@ -0,0 +1,82 @@
+import re
+from datetime import datetime
+from unittest import TestCase
+from unittest.mock import MagicMock
+from py_eve_chat_mon.chat_message import ChatMessage
+from py_eve_chat_mon.exceptions import InvalidCallable
+from py_eve_chat_mon.matcher import KeywordMatcher, build_pattern
+
+
+def message(body):
+    return ChatMessage(datetime(2015, 3, 5, 21, 4, 3), "Some Dude", body)
+
+
+class TestBuildPattern(TestCase):
+
+    def test_matches_each_keyword(self):
+        keywords = ['Jita', 'Jita 4-4', 'Amarr', 'Ama', 'C++', 'J-1A']
+        expression = re.compile(build_pattern(keywords))
+
+        for keyword in keywords:
+            self.assertEqual(keyword, expression.fullmatch(keyword).group(0))
+
+    def test_prefers_longest_keyword(self):
+        self.assertEqual(['Jita 4-4'], re.findall(build_pattern(['Jita', 'Jita 4-4']), "in Jita 4-4 now"))
+
+    def test_shares_common_prefixes(self):
+        self.assertEqual("(?:Ama(?:rr)?|Jit[ao])", build_pattern(['Amarr', 'Ama', 'Jita', 'Jito']))
+
+
+class TestKeywordMatcher(TestCase):
+
+    def setUp(self):
+        self._sut = KeywordMatcher(['Jita', 'Some Pilot', 'C++'])
+        self._subscriber = MagicMock()
+        self._sut.add_subscriber(self._subscriber)
+
+    def test_match_returns_mentioned_keywords(self):
+        self.assertEqual({'Jita', 'Some Pilot'}, self._sut.match("some pilot spotted in JITA"))
+
+    def test_match_only_matches_whole_words(self):
+        self.assertEqual(set(), self._sut.match("Jitas some pilots"))
+        self.assertEqual({'C++'}, self._sut.match("write C++ code"))
+
+    def test_match_without_keywords_matches_nothing(self):
+        self.assertEqual(set(), KeywordMatcher().match("Jita"))
+
+    def test_case_sensitive_matcher_ignores_other_case(self):
+        sut = KeywordMatcher(['Jita'], case_sensitive=True)
+
+        self.assertEqual(set(), sut.match("jita"))
+        self.assertEqual({'Jita'}, sut.match("Jita"))
+
+    def test_matcher_without_whole_words_matches_parts(self):
+        sut = KeywordMatcher(['Jita'], whole_words=False)
+
+        self.assertEqual({'Jita'}, sut.match("Jitas"))
+
+    def test_added_keywords_are_matched(self):
+        self._sut.match("Amarr")
+        self._sut.add_keywords(['Amarr'])
+
+        self.assertEqual({'Amarr'}, self._sut.match("Amarr"))
+
+    def test_calls_subscribers_only_for_hits(self):
+        hit = message("red in Jita")
+
+        self._sut("Intel", [message("clear"), hit])
+
+        self._subscriber.assert_called_once_with("Intel", hit, {'Jita'})
+
+    def test_calls_keyword_subscribers_only_for_their_keywords(self):
+        mention_subscriber = MagicMock()
+        self._sut.add_subscriber(mention_subscriber, ['my name'])
+        mention = message("hey MY NAME")
+
+        self._sut("Corp", [message("red in Jita"), mention])
+
+        mention_subscriber.assert_called_once_with("Corp", mention, {'my name'})
+        self.assertEqual(2, self._subscriber.call_count)
+
+    def test_add_subscriber_raises_exception_if_not_callable(self):
+        self.assertRaises(InvalidCallable, self._sut.add_subscriber, 1)
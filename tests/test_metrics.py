@@ -0,0 +1,100 @@
+import urllib.error
+import urllib.request
+from datetime import datetime, timedelta
+from unittest import TestCase
+from py_eve_chat_mon.metrics import MonitorMetrics, MetricsServer
+
+
+class TestMonitorMetrics(TestCase):
+
+    def setUp(self):
+        self._sut = MonitorMetrics()
+
+    def test_metrics_are_empty_before_first_read(self):
+        metrics = self._sut.get_metrics()
+
+        self.assertEqual(0, metrics['cycles'])
+        self.assertEqual({}, metrics['chats'])
+
+    def test_accumulates_reads_of_chat(self):
+        self._sut.record_read("Corp", [100, 0.5], 3, 2, 0.25)
+        self._sut.record_read("Corp", [150, 0.75], 1, 1, 0.25)
+
+        chat_metrics = self._sut.get_metrics()['chats']['Corp']
+
+        self.assertEqual(2, chat_metrics['reads'])
+        self.assertEqual(150, chat_metrics['bytes_read'])
+        self.assertEqual(0.75, chat_metrics['decode_seconds'])
+        self.assertEqual(4, chat_metrics['lines'])
+        self.assertEqual(3, chat_metrics['messages'])
+        self.assertEqual(0.5, chat_metrics['parse_seconds'])
+
+    def test_records_ingest_lag_of_oldest_message(self):
+        self._sut.record_read("Corp", None, 1, 1, 0.0, datetime.utcnow() - timedelta(seconds=30))
+        self._sut.record_read("Corp", None, 1, 1, 0.0, datetime.utcnow() - timedelta(seconds=5))
+
+        chat_metrics = self._sut.get_metrics()['chats']['Corp']
+
+        self.assertAlmostEqual(5, chat_metrics['ingest_lag_seconds'], delta=1)
+        self.assertAlmostEqual(30, chat_metrics['max_ingest_lag_seconds'], delta=1)
+
+    def test_accumulates_handler_time(self):
+        self._sut.record_handler("Corp", 0.5)
+        self._sut.record_handler("Corp", 0.25)
+
+        chat_metrics = self._sut.get_metrics()['chats']['Corp']
+
+        self.assertEqual(2, chat_metrics['handler_calls'])
+        self.assertEqual(0.75, chat_metrics['handler_seconds'])
+
+    def test_records_cycles(self):
+        self._sut.record_cycle(0.5)
+        self._sut.record_cycle(0.25)
+
+        metrics = self._sut.get_metrics()
+
+        self.assertEqual(2, metrics['cycles'])
+        self.assertEqual(0.75, metrics['cycle_seconds'])
+        self.assertEqual(0.25, metrics['last_cycle_seconds'])
+        self.assertEqual(0.5, metrics['max_cycle_seconds'])
+
+    def test_snapshot_is_a_copy(self):
+        self._sut.record_handler("Corp", 0.5)
+        metrics = self._sut.get_metrics()
+
+        self._sut.record_handler("Corp", 0.5)
+
+        self.assertEqual(1, metrics['chats']['Corp']['handler_calls'])
+
+    def test_renders_prometheus_text_format(self):
+        self._sut.record_cycle(0.5)
+        self._sut.record_read('Intel "North"', [100, 0.5], 3, 2, 0.25)
+
+        text = self._sut.render_prometheus()
+
+        self.assertTrue("# TYPE eve_chat_cycles counter\neve_chat_cycles 1\n" in text)
+        self.assertTrue('eve_chat_bytes_read{chat="Intel \\"North\\""} 100\n' in text)
+        self.assertTrue("# TYPE eve_chat_ingest_lag_seconds gauge\n" in text)
+
+
+class TestMetricsServer(TestCase):
+
+    def setUp(self):
+        self._metrics = MonitorMetrics()
+        self._sut = MetricsServer(self._metrics, ('127.0.0.1', 0))
+
+    def tearDown(self):
+        self._sut.close()
+
+    def test_serves_metrics(self):
+        self._metrics.record_read("Corp", [100, 0.5], 3, 2, 0.25)
+
+        with urllib.request.urlopen("http://{0}:{1}/metrics".format(*self._sut.address)) as response:
+            self.assertTrue(response.headers['Content-Type'].startswith("text/plain; version=0.0.4"))
+            self.assertEqual(self._metrics.render_prometheus(), response.read().decode('utf-8'))
+
+    def test_other_paths_are_not_found(self):
+        with self.assertRaises(urllib.error.HTTPError) as context:
+            urllib.request.urlopen("http://{0}:{1}/".format(*self._sut.address))
+
+        self.assertEqual(404, context.exception.code)
@@ -2,6 +2,7 @@ import unittest.mock
 from os import path
 from unittest import TestCase, mock
 from py_eve_chat_mon.monitor import Monitor
+from py_eve_chat_mon.filters import MessageFilter
 from py_eve_chat_mon.exceptions import InvalidChatDirectory, InvalidMonitorState
 
 
@@ -15,9 +16,11 @@ class TestMonitor(TestCase):
 
         self._patcher_eve_chat_log_dir_mon = mock.patch('py_eve_chat_mon.monitor.EveChatLogDirectoryMonitor')
         self._mock_monitor = self._patcher_eve_chat_log_dir_mon.start()
+        self._mock_monitor.return_value.find_chats.side_effect = lambda subscription: subscription.filter(
+            ['Alliance', 'Corp', 'Local'])
 
-        self._patch_parse_msg = mock.patch('py_eve_chat_mon.monitor.parse_msg')
-        self._mock_parse_msg = self._patch_parse_msg.start()
+        self._patch_parse_batch = mock.patch('py_eve_chat_mon.monitor.parse_batch')
+        self._mock_parse_batch = self._patch_parse_batch.start()
 
         self._patch_sleep = mock.patch('py_eve_chat_mon.monitor.sleep')
         self._mock_sleep = self._patch_sleep.start()
@@ -31,7 +34,7 @@ class TestMonitor(TestCase):
 
     def tearDown(self):
         self._patcher_eve_chat_log_dir_mon.stop()
-        self._patch_parse_msg.stop()
+        self._patch_parse_batch.stop()
         self._patch_sleep.stop()
         self._patch_thread.stop()
 
@@ -50,7 +53,7 @@ class TestMonitor(TestCase):
         self.assertIsNone(self._sut.thread)
         self.assertEqual(self._poll_rate, self._sut.poll_rate)
 
-        self._mock_monitor.assert_called_once_with(self._valid_path)
+        self._mock_monitor.assert_called_once_with(self._valid_path, None, None, None)
 
     def test_stop_throws_exception_on_not_alive(self):
         self.assertRaises(InvalidMonitorState, self._sut.stop)
@@ -65,7 +68,7 @@ class TestMonitor(TestCase):
         self._sut.start()
         self._sut.stop()
 
-        self._mock_thread_instance.stop.assert_called_once()
+        self._mock_thread_instance.return_value.join.assert_called_once_with()
 
     def test_stop_sets_thread_none(self):
         self._sut.start()
@@ -101,40 +104,173 @@ class TestMonitor(TestCase):
     def test_start_starts_new_thread(self):
         self._sut.start()
 
-        self._mock_thread_instance.start.assert_called_once()
+        self._mock_thread_instance.return_value.start.assert_called_once_with()
 
-    def test_poll_calls_sleep_with_poll_rate(self):
+    def test_start_starts_dir_monitor(self):
+        self._sut.start()
+
+        self._sut.chat_log_monitor.start.assert_called_once_with()
+
+    def test_stop_stops_dir_monitor(self):
+        self._sut.start()
+        self._sut.stop()
+
+        self._sut.chat_log_monitor.stop.assert_called_once_with()
+
+    def test_start_with_events_starts_dir_monitor(self):
+        self._sut = Monitor(self._chats, self._valid_path, self._handler, self._poll_rate, use_events=True)
+        self._sut.start()
+
+        self._sut.chat_log_monitor.start.assert_called_once_with()
+
+    def test_stop_with_events_stops_dir_monitor(self):
+        self._sut = Monitor(self._chats, self._valid_path, self._handler, self._poll_rate, use_events=True)
+        self._sut.start()
+        self._sut.stop()
+
+        self._sut.chat_log_monitor.stop.assert_called_once_with()
+
+    def test_stop_wakes_poll_thread(self):
+        self._sut.start()
+        self._sut.stop()
+
+        self.assertTrue(self._sut._wakeup.is_set())
+
+    def test_init_with_events_registers_modified_callable(self):
+        self._sut = Monitor(self._chats, self._valid_path, self._handler, self._poll_rate, use_events=True)
+
+        self._sut.chat_log_monitor.add_modified_callable.assert_called_once_with(self._sut._on_chat_modified)
+
+    def test_on_chat_modified_wakes_for_monitored_chat(self):
+        self._sut._wakeup.clear()
+        self._sut.scheduler.wake = unittest.mock.MagicMock()
+        self._sut._on_chat_modified(self._chats[0])
+
+        self.assertTrue(self._sut._wakeup.is_set())
+        self._sut.scheduler.wake.assert_called_once_with(self._chats[0])
+
+    def test_on_chat_modified_ignores_other_chats(self):
+        self._sut._wakeup.clear()
+        self._sut._on_chat_modified("Local")
+
+        self.assertFalse(self._sut._wakeup.is_set())
+
+    def test_wait_coalesces_after_event(self):
+        self._sut = Monitor(self._chats, self._valid_path, self._handler, 5, use_events=True, coalesce_delay=0.5)
+        self._sut._wakeup.set()
+        self._sut._wait(5)
+
+        self._mock_sleep.assert_called_once_with(0.5)
+        self.assertFalse(self._sut._wakeup.is_set())
+
+    def test_wait_does_not_coalesce_without_events(self):
+        self._sut._wakeup.set()
+        self._sut._wait(5)
+
+        self.assertFalse(self._mock_sleep.called)
+
+    def test_init_schedules_each_chat(self):
+        for chat in self._chats:
+            self.assertTrue(chat in self._sut.scheduler)
+
+        self.assertFalse('Local' in self._sut.scheduler)
+
+    def test_init_schedules_chats_matching_patterns(self):
+        self._sut = Monitor(['Al*'], self._valid_path, self._handler, self._poll_rate)
+
+        self.assertTrue('Alliance' in self._sut.scheduler)
+        self.assertFalse('Corp' in self._sut.scheduler)
+
+    def test_init_registers_chat_callables(self):
+        self._sut.chat_log_monitor.add_chat_added_callable.assert_called_once_with(self._sut._on_chat_added)
+        self._sut.chat_log_monitor.add_chat_removed_callable.assert_called_once_with(self._sut._on_chat_removed)
+
+    def test_on_chat_added_schedules_matching_chat(self):
+        self._sut = Monitor(['Intel*'], self._valid_path, self._handler, self._poll_rate)
+        self._sut._wakeup.clear()
+
+        self._sut._on_chat_added('Intel.North')
+        self._sut._on_chat_added('Corp')
+
+        self.assertTrue('Intel.North' in self._sut.scheduler)
+        self.assertFalse('Corp' in self._sut.scheduler)
+        self.assertTrue(self._sut._wakeup.is_set())
+
+    def test_on_chat_removed_unschedules_chat(self):
+        self._sut._on_chat_removed('Corp')
+
+        self.assertFalse('Corp' in self._sut.scheduler)
+
+    def test_init_applies_chat_poll_rates(self):
+        self._sut = Monitor(self._chats, self._valid_path, self._handler, 2, max_poll_rate=30,
+                            chat_poll_rates={'Alliance': 0.5, 'Corp': (1, 10)})
+
+        self.assertEqual((0.5, 0.5), (self._sut.scheduler._schedules['Alliance'].min_interval,
+                                      self._sut.scheduler._schedules['Alliance'].max_interval))
+        self.assertEqual((1, 10), (self._sut.scheduler._schedules['Corp'].min_interval,
+                                   self._sut.scheduler._schedules['Corp'].max_interval))
+
+    def test_poll_waits_until_next_chat_is_due(self):
+        self._sut._should_poll = unittest.mock.MagicMock(side_effect=[True, False])
+        self._sut.scheduler.time_until_next = unittest.mock.MagicMock(return_value=1.5)
+        self._sut._wakeup = unittest.mock.MagicMock()
+        self._sut._wakeup.wait.return_value = False
+        self._sut.poll()
+
+        self._sut._wakeup.wait.assert_called_with(1.5)
+
+    def test_poll_waits_poll_rate_without_chats(self):
+        self._sut = Monitor([], self._valid_path, self._handler, 3)
+        self._sut._should_poll = unittest.mock.MagicMock(side_effect=[True, False])
+        self._sut._wakeup = unittest.mock.MagicMock()
+        self._sut._wakeup.wait.return_value = False
+        self._sut.poll()
+
+        self._sut._wakeup.wait.assert_called_with(3)
+
+    def test_poll_only_reads_due_chats(self):
         self._sut._should_poll = unittest.mock.MagicMock(side_effect=[True, False])
+        self._sut.scheduler.pop_due = unittest.mock.MagicMock(return_value=[self._chats[1]])
+        self._sut.chat_log_monitor.read_sources = unittest.mock.MagicMock(return_value=[])
         self._sut.poll()
 
-        self._mock_sleep.assert_called_with(self._poll_rate)
+        self._sut.chat_log_monitor.read_sources.assert_called_once_with(self._chats[1])
+
+    def test_poll_reschedules_chats_by_activity(self):
+        self._sut._should_poll = unittest.mock.MagicMock(side_effect=[True, False])
+        self._sut.scheduler.update = unittest.mock.MagicMock()
+        self._sut.chat_log_monitor.read_sources = unittest.mock.MagicMock(side_effect=[[("path", None, ["1"])], []])
+        self._sut.poll()
+
+        self._sut.scheduler.update.assert_has_calls([unittest.mock.call(self._chats[0], True),
+                                                     unittest.mock.call(self._chats[1], False)])
 
     def test_poll_checks_each_chat(self):
         self._sut._should_poll = unittest.mock.MagicMock(side_effect=[True, False])
-        self._sut.chat_log_monitor.read_messages = unittest.mock.MagicMock()
-        self._sut.chat_log_monitor.read_messages.return_value = []
+        self._sut.chat_log_monitor.read_sources = unittest.mock.MagicMock()
+        self._sut.chat_log_monitor.read_sources.return_value = []
         self._sut.poll()
 
         calls = [unittest.mock.call(self._chats[0]), unittest.mock.call(self._chats[1])]
 
         # noinspection PyUnresolvedReferences
-        self._sut.chat_log_monitor.read_messages.assert_has_calls(calls)
+        self._sut.chat_log_monitor.read_sources.assert_has_calls(calls)
 
     def test_poll_parses_each_chats_messages(self):
         self._sut._should_poll = unittest.mock.MagicMock(side_effect=[True, False])
-        self._sut.chat_log_monitor.read_messages = unittest.mock.MagicMock()
-        self._sut.chat_log_monitor.read_messages.return_value = ["1", "2"]
+        self._sut.chat_log_monitor.read_sources = unittest.mock.MagicMock()
+        self._sut.chat_log_monitor.read_sources.return_value = [("path", None, ["1", "2"])]
         self._sut.poll()
 
-        calls = [unittest.mock.call("1"), unittest.mock.call("2"), unittest.mock.call("1"), unittest.mock.call("2")]
+        calls = [unittest.mock.call(["1", "2"], "path", None, None), unittest.mock.call(["1", "2"], "path", None, None)]
 
-        self._mock_parse_msg.assert_has_calls(calls)
+        self.assertEqual(calls, self._mock_parse_batch.call_args_list)
 
     def test_poll_calls_handler_with_chat_and_parsed_msg(self):
         self._sut._should_poll = unittest.mock.MagicMock(side_effect=[True, False])
-        self._sut.chat_log_monitor.read_messages = unittest.mock.MagicMock()
-        self._sut.chat_log_monitor.read_messages.return_value = ["1", "2"]
-        self._mock_parse_msg.side_effect = ["p1", "p2", "p3", "p4"]
+        self._sut.chat_log_monitor.read_sources = unittest.mock.MagicMock()
+        self._sut.chat_log_monitor.read_sources.return_value = [("path", None, ["1", "2"])]
+        self._mock_parse_batch.side_effect = [["p1", "p2"], ["p3", "p4"]]
         self._sut.poll()
 
         calls = [unittest.mock.call(self._chats[0], ["p1", "p2"]),
@@ -142,6 +278,127 @@ class TestMonitor(TestCase):
 
         self._handler.assert_has_calls(calls)
 
+    def test_poll_tags_messages_of_each_source(self):
+        self._sut.chat_log_monitor.read_sources = unittest.mock.MagicMock(
+            return_value=[("path_one", "Pilot One", ["1"]), ("path_two", "Pilot Two", ["2"])])
+        self._mock_parse_batch.side_effect = [["p1"], ["p2"]]
+
+        self._sut._poll_chat("Corp")
+
+        self.assertEqual([unittest.mock.call(["1"], "path_one", "Pilot One", None),
+                          unittest.mock.call(["2"], "path_two", "Pilot Two", None)],
+                         self._mock_parse_batch.call_args_list)
+        self._handler.assert_called_once_with("Corp", ["p1", "p2"])
+
+    def test_poll_passes_filters_of_chat_to_parse_batch(self):
+        self._sut = Monitor(self._chats, self._valid_path, self._handler,
+                            filters=[MessageFilter(chats=['Corp'], usernames=['Some Dude'])])
+        self._sut.chat_log_monitor.read_sources = unittest.mock.MagicMock(return_value=[("path", None, ["1"])])
+
+        self._sut._poll_chat("Alliance")
+        self._sut._poll_chat("Corp")
+
+        alliance_call, corp_call = self._mock_parse_batch.call_args_list
+        self.assertIsNone(alliance_call[0][3])
+        self.assertTrue(corp_call[0][3]("Some Dude", "o7"))
+        self.assertFalse(corp_call[0][3]("Other Dude", "o7"))
+
+    def test_poll_records_metrics(self):
+        metrics = unittest.mock.MagicMock()
+        self._sut = Monitor(self._chats, self._valid_path, self._handler, metrics=metrics)
+        self._sut.chat_log_monitor.read_sources = unittest.mock.MagicMock(return_value=[("path", None, ["1", "2"])])
+        self._sut.chat_log_monitor.read_totals = {"Corp": [100, 0.5]}
+        message = unittest.mock.MagicMock(timestamp="timestamp")
+        self._mock_parse_batch.side_effect = None
+        self._mock_parse_batch.return_value = [message]
+        self._sut._should_poll = unittest.mock.MagicMock(side_effect=[True, False])
+        self._sut.scheduler.pop_due = unittest.mock.MagicMock(return_value=["Corp"])
+
+        self._sut.poll()
+
+        self.assertEqual([unittest.mock.call("Corp", [100, 0.5], 2, 1, unittest.mock.ANY, "timestamp")],
+                         metrics.record_read.call_args_list)
+        self.assertEqual([unittest.mock.call("Corp", unittest.mock.ANY)], metrics.record_handler.call_args_list)
+        self.assertEqual(1, metrics.record_cycle.call_count)
+
+    def test_poll_wakes_chat_left_behind_by_max_bytes(self):
+        self._sut = Monitor(self._chats, self._valid_path, self._handler, max_bytes=1024)
+        self._sut.chat_log_monitor.read_sources = unittest.mock.MagicMock(return_value=[])
+        self._sut.chat_log_monitor.is_behind.side_effect = lambda chat: chat == "Corp"
+        self._sut.scheduler.wake = unittest.mock.MagicMock()
+        self._sut._should_poll = unittest.mock.MagicMock(side_effect=[True, False])
+
+        self._sut.poll()
+
+        self._sut.scheduler.wake.assert_called_once_with("Corp")
+
+    def test_poll_does_not_check_backlog_without_max_bytes(self):
+        self._sut.chat_log_monitor.read_sources = unittest.mock.MagicMock(return_value=[])
+        self._sut._should_poll = unittest.mock.MagicMock(side_effect=[True, False])
+
+        self._sut.poll()
+
+        self.assertFalse(self._sut.chat_log_monitor.is_behind.called)
+
+    def test_poll_does_not_call_handler_without_parsed_msgs(self):
+        self._sut._should_poll = unittest.mock.MagicMock(side_effect=[True, False])
+        self._sut.chat_log_monitor.read_sources = unittest.mock.MagicMock()
+        self._sut.chat_log_monitor.read_sources.return_value = [("path", None, ["header"])]
+        self._mock_parse_batch.return_value = []
+        self._sut.poll()
+
+        self.assertFalse(self._handler.called)
+
+    @mock.patch('py_eve_chat_mon.monitor.CheckpointStore')
+    def test_init_with_checkpoint_path_passes_checkpoint_store(self, mock_checkpoint_store):
+        self._mock_monitor.reset_mock()
+
+        sut = Monitor(self._chats, self._valid_path, self._handler, checkpoint_path='checkpoints.json')
+
+        mock_checkpoint_store.assert_called_once_with('checkpoints.json')
+        self._mock_monitor.assert_called_once_with(self._valid_path, None, mock_checkpoint_store.return_value, None)
+
+    @mock.patch('py_eve_chat_mon.monitor.CheckpointStore')
+    def test_poll_saves_checkpoint_after_handler(self, mock_checkpoint_store):
+        sut = Monitor(self._chats, self._valid_path, self._handler, checkpoint_path='checkpoints.json')
+        sut.chat_log_monitor.read_sources = unittest.mock.MagicMock(return_value=[("path", None, ["1"])])
+        sut.chat_log_monitor.save_checkpoint = unittest.mock.MagicMock(
+            side_effect=lambda chat: self.assertTrue(self._handler.called))
+        self._mock_parse_batch.return_value = ["p1"]
+
+        sut._poll_chat('Corp')
+
+        sut.chat_log_monitor.save_checkpoint.assert_called_once_with('Corp')
+
+    def test_poll_without_checkpoints_saves_no_checkpoint(self):
+        self._sut.chat_log_monitor.read_sources = unittest.mock.MagicMock(return_value=[("path", None, ["1"])])
+
+        self._sut._poll_chat('Corp')
+
+        self.assertFalse(self._sut.chat_log_monitor.save_checkpoint.called)
+
+    @mock.patch('py_eve_chat_mon.monitor.CheckpointStore')
+    def test_stop_flushes_checkpoints(self, mock_checkpoint_store):
+        sut = Monitor(self._chats, self._valid_path, self._handler, checkpoint_path='checkpoints.json')
+        sut.start()
+        sut.stop()
+
+        self.assertEqual(2, sut.chat_log_monitor.save_checkpoints.call_count)
+        mock_checkpoint_store.return_value.flush.assert_called_once_with()
+
+    @mock.patch('py_eve_chat_mon.monitor.CheckpointStore')
+    def test_poll_writes_pending_checkpoints_when_due(self, mock_checkpoint_store):
+        sut = Monitor(self._chats, self._valid_path, self._handler, checkpoint_path='checkpoints.json')
+        sut._should_poll = unittest.mock.MagicMock(side_effect=[True, False])
+        sut.scheduler.time_until_next = unittest.mock.MagicMock(return_value=1.5)
+        mock_checkpoint_store.return_value.flush_if_due.return_value = 0.25
+        sut._wakeup = unittest.mock.MagicMock()
+        sut._wakeup.wait.return_value = False
+        sut.poll()
+
+        mock_checkpoint_store.return_value.flush_if_due.assert_called_once_with()
+        sut._wakeup.wait.assert_called_with(0.25)
+
     def test_should_poll_is_false_if_is_alive_is_false(self):
         self._sut.is_alive = False
 
@@ -0,0 +1,211 @@
+import multiprocessing
+import os
+import tempfile
+import time
+from datetime import datetime
+from threading import Lock
+from unittest import TestCase, skipIf
+from unittest.mock import MagicMock
+from py_eve_chat_mon.chat_message import ChatMessage, EveChatLogReader
+from py_eve_chat_mon.exceptions import InvalidCallable, InvalidChatDirectory, InvalidMonitorState
+try:
+    from py_eve_chat_mon.process_monitor import ProcessMonitor, SharedRingBuffer, decode_messages, encode_messages, \
+        _RingPublisher
+except ImportError:
+    # multiprocessing.shared_memory is new in Python 3.8
+    ProcessMonitor = None
+
+requires_shared_memory = skipIf(ProcessMonitor is None, "ProcessMonitor needs Python 3.8+")
+
+
+def message(index, line=None, source=None, listener=None):
+    return ChatMessage(datetime(2015, 3, 5, 21, 4, index % 60), "Pilot {0}".format(index % 7),
+                       "message number {0} ✓".format(index), line, source=source, listener=listener)
+
+
+def fill_ring(ring, count):
+    for index in range(count):
+        ring.put("record {0}".format(index).encode('utf-8'))
+
+
+class Collector(object):
+    def __init__(self):
+        self.lock = Lock()
+        self.received = []
+
+    def __call__(self, chat, messages):
+        with self.lock:
+            self.received.append((chat, messages))
+
+    def messages(self):
+        with self.lock:
+            return [message for chat, messages in self.received for message in messages]
+
+
+@requires_shared_memory
+class TestEncodeMessages(TestCase):
+
+    def test_round_trip_keeps_messages_and_tags(self):
+        messages = [message(0, source='one', listener='Pilot One'), message(1, source='two', listener='Pilot Two'),
+                    message(2, source='one', listener='Pilot One')]
+
+        chat, decoded = decode_messages(encode_messages('Corp', messages))
+
+        self.assertEqual('Corp', chat)
+        self.assertEqual(messages, decoded)
+        self.assertEqual([(m.source, m.listener) for m in messages], [(m.source, m.listener) for m in decoded])
+        self.assertEqual([m.line for m in messages], [m.line for m in decoded])
+
+    def test_only_deviating_lines_are_kept(self):
+        standard = message(0)
+        standard = message(0, standard.line)
+        deviating = message(1, "[ 2015.03.05 21:04:01 ]  Pilot 1 > message number 1 ✓")
+
+        _, decoded = decode_messages(encode_messages('Corp', [standard, deviating]))
+
+        self.assertIsNone(decoded[0]._line)
+        self.assertEqual(standard.line, decoded[0].line)
+        self.assertEqual(deviating.line, decoded[1].line)
+
+
+@requires_shared_memory
+class TestSharedRingBuffer(TestCase):
+
+    def setUp(self):
+        self._sut = SharedRingBuffer(64)
+
+    def tearDown(self):
+        self._sut.close()
+
+    def test_get_returns_records_in_order(self):
+        fill_ring(self._sut, 3)
+
+        self.assertEqual([b"record 0", b"record 1", b"record 2"], self._sut.get(0))
+        self.assertEqual([], self._sut.get(0))
+
+    def test_records_wrap_around_the_end(self):
+        for index in range(20):
+            self._sut.put("record {0}".format(index).encode('utf-8'))
+            self._sut.put(b"x" * index)
+
+            self.assertEqual(["record {0}".format(index).encode('utf-8'), b"x" * index], self._sut.get(0))
+
+        self.assertEqual(0, self._sut.get_used())
+
+    def test_put_returns_false_while_full(self):
+        fill_ring(self._sut, 5)
+
+        self.assertFalse(self._sut.put(b"record 5", 0))
+        self.assertFalse(self._sut.put(b"record 5", 0.01))
+        self.assertEqual(60, self._sut.get_used())
+
+        self._sut.get(0)
+        self.assertTrue(self._sut.put(b"record 5", 0))
+
+    def test_put_raises_for_records_larger_than_ring(self):
+        self.assertRaises(ValueError, self._sut.put, b"x" * 61)
+
+    def test_get_waits_for_records(self):
+        start = time.monotonic()
+
+        self.assertEqual([], self._sut.get(0.05))
+
+        self.assertTrue(time.monotonic() - start >= 0.05)
+
+
+@requires_shared_memory
+class TestRingPublisher(TestCase):
+
+    def test_large_batches_are_split(self):
+        ring = SharedRingBuffer(4096)
+        messages = [message(index) for index in range(20)]
+        publisher = _RingPublisher(ring, multiprocessing.Event())
+        publisher.max_record_size = 512
+
+        publisher('Corp', messages)
+
+        records = ring.get(0)
+        ring.close()
+        self.assertTrue(len(records) > 1)
+        self.assertEqual(messages, [m for record in records for m in decode_messages(record)[1]])
+
+    def test_messages_are_dropped_once_aborted(self):
+        ring = SharedRingBuffer(256)
+        ring.put(b"x" * 200)
+        abort = multiprocessing.Event()
+        abort.set()
+        on_drop = MagicMock()
+
+        _RingPublisher(ring, abort, on_drop)('Corp', [message(0)])
+
+        on_drop.assert_called_once_with()
+        self.assertEqual([b"x" * 200], ring.get(0))
+        ring.close()
+
+
+@requires_shared_memory
+class TestProcessMonitor(TestCase):
+
+    def setUp(self):
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self._log_path = os.path.join(self._temp_dir.name, 'Corp_20150305_210403.txt')
+        header = EveChatLogReader.chat_line_delimiter + "\r\n  ------\r\n    Listener:        Pilot One\r\n"
+        with open(self._log_path, 'wb') as log_file:
+            log_file.write(header.encode(EveChatLogReader.encoding))
+
+    def tearDown(self):
+        self._temp_dir.cleanup()
+
+    def _write(self, line):
+        with open(self._log_path, 'ab') as log_file:
+            log_file.write((EveChatLogReader.chat_line_delimiter + line + "\r\n").encode(EveChatLogReader.encoding))
+
+    def test_init_raises_for_invalid_arguments(self):
+        self.assertRaises(InvalidCallable, ProcessMonitor, ['Corp'], self._temp_dir.name, None)
+        self.assertRaises(InvalidChatDirectory, ProcessMonitor, ['Corp'], self._log_path, Collector())
+
+    def test_failure_of_child_process_is_reported(self):
+        sut = ProcessMonitor(['Corp'], self._temp_dir.name, Collector(), not_a_monitor_argument=True)
+        with self.assertLogs('py_eve_chat_mon.process_monitor', 'ERROR'):
+            sut.start()
+            sut.thread.join(10)
+
+        self.assertFalse(sut.thread.is_alive())
+        self.assertEqual(1, sut.exitcode)
+        self.assertRaises(InvalidMonitorState, sut.stop)
+
+    def test_stop_raises_if_not_started(self):
+        sut = ProcessMonitor(['Corp'], self._temp_dir.name, Collector())
+
+        self.assertRaises(InvalidMonitorState, sut.stop)
+
+    def test_messages_read_in_child_process_are_handled(self):
+        collector = Collector()
+        sut = ProcessMonitor(['Corp'], self._temp_dir.name, collector, ring_size=4096, poll_rate=0.05)
+        sut.start()
+        self.assertRaises(InvalidMonitorState, sut.start)
+        try:
+            # the child starts reading at the end of the log once it is up
+            index = 0
+            deadline = time.monotonic() + 10
+            while not collector.messages() and time.monotonic() < deadline:
+                self._write("[ 2015.03.05 21:04:03 ] Some Dude > MSG {0}".format(index))
+                index += 1
+                time.sleep(0.05)
+
+            for extra in range(index, index + 100):
+                self._write("[ 2015.03.05 21:04:03 ] Some Dude > MSG {0}".format(extra))
+
+            last = "MSG {0}".format(index + 99)
+            while collector.messages()[-1].message != last and time.monotonic() < deadline:
+                time.sleep(0.01)
+        finally:
+            sut.stop()
+
+        messages = collector.messages()
+        self.assertEqual({'Corp'}, set(chat for chat, _ in collector.received))
+        self.assertEqual(["MSG {0}".format(i) for i in range(index + 100 - len(messages), index + 100)],
+                         [m.message for m in messages])
+        self.assertEqual((self._temp_dir.name, 'Pilot One', 'Some Dude'),
+                         (messages[-1].source, messages[-1].listener, messages[-1].username))
+        self.assertEqual(len(messages), sut.get_stats()['messages'])
@@ -0,0 +1,94 @@
+from unittest import TestCase
+from py_eve_chat_mon.scheduler import ChatScheduler
+
+
+class TestChatScheduler(TestCase):
+
+    def setUp(self):
+        self._sut = ChatScheduler(1, 8, backoff=2)
+        self._sut.add('Local', now=0)
+        self._sut.add('Corp', now=0)
+
+    def test_add_makes_chat_due_immediately(self):
+        self.assertEqual(['Local', 'Corp'], self._sut.pop_due(now=0))
+
+    def test_add_defaults_max_interval_to_min_interval(self):
+        sut = ChatScheduler(2)
+        sut.add('Local', now=0)
+        sut.pop_due(now=0)
+        sut.update('Local', False, now=0)
+
+        self.assertEqual(2, sut.get_interval('Local'))
+
+    def test_pop_due_does_not_return_chats_twice(self):
+        self._sut.pop_due(now=0)
+
+        self.assertEqual([], self._sut.pop_due(now=100))
+
+    def test_update_active_chat_uses_min_interval(self):
+        self._sut.pop_due(now=0)
+        self._sut.update('Local', True, now=0)
+
+        self.assertEqual([], self._sut.pop_due(now=0.5))
+        self.assertEqual(['Local'], self._sut.pop_due(now=1))
+
+    def test_update_idle_chat_backs_off_to_max_interval(self):
+        intervals = []
+        now = 0
+        for i in range(5):
+            self._sut.pop_due(now=now)
+            self._sut.update('Local', False, now=now)
+            intervals.append(self._sut.get_interval('Local'))
+            now += intervals[-1]
+
+        self.assertEqual([2, 4, 8, 8, 8], intervals)
+
+    def test_update_active_chat_resets_backoff(self):
+        self._sut.pop_due(now=0)
+        self._sut.update('Local', False, now=0)
+        self._sut.pop_due(now=2)
+        self._sut.update('Local', True, now=2)
+
+        self.assertEqual(1, self._sut.get_interval('Local'))
+
+    def test_add_with_own_intervals(self):
+        self._sut.add('Alliance', min_interval=0.25, max_interval=0.5, now=0)
+        self._sut.pop_due(now=0)
+        self._sut.update('Alliance', False, now=0)
+        self._sut.update('Local', False, now=0)
+
+        self.assertEqual(0.5, self._sut.get_interval('Alliance'))
+        self.assertEqual(['Alliance'], self._sut.pop_due(now=0.5))
+
+    def test_wake_makes_idle_chat_due(self):
+        self._sut.pop_due(now=0)
+        self._sut.update('Local', False, now=0)
+
+        self._sut.wake('Local', now=1)
+
+        self.assertEqual(['Local'], self._sut.pop_due(now=1))
+        self.assertEqual(1, self._sut.get_interval('Local'))
+
+    def test_wake_during_poll_reschedules_immediately(self):
+        self._sut.pop_due(now=0)
+        self._sut.wake('Local', now=0)
+        self._sut.update('Local', False, now=0)
+
+        self.assertEqual(['Local'], self._sut.pop_due(now=0))
+
+    def test_remove_unschedules_chat(self):
+        self._sut.remove('Local')
+
+        self.assertFalse('Local' in self._sut)
+        self.assertEqual(['Corp'], self._sut.pop_due(now=0))
+
+    def test_time_until_next(self):
+        self._sut.pop_due(now=0)
+        self._sut.update('Local', True, now=0)
+        self._sut.update('Corp', False, now=0)
+
+        self.assertEqual(0.5, self._sut.time_until_next(now=0.5))
+        self.assertEqual(0, self._sut.time_until_next(now=3))
+
+    def test_time_until_next_without_chats_is_none(self):
+        self.assertIsNone(ChatScheduler(1).time_until_next())
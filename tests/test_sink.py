@@ -0,0 +1,212 @@
+import io
+import os
+import shutil
+import socket
+import tempfile
+import time
+import unittest
+from datetime import datetime
+from threading import Lock
+from unittest import TestCase
+from py_eve_chat_mon.chat_message import ChatMessage
+from py_eve_chat_mon.exceptions import InvalidMonitorState
+from py_eve_chat_mon.sink import NetworkSink, SinkReceiver, encode_batch, decode_frame, read_frame, FRAME_HEADER
+
+
+def message(index, source=None, listener=None):
+    return ChatMessage(datetime(2015, 3, 5, 21, 4, index % 60), "Pilot {0}".format(index % 7),
+                       "message number {0} ✓".format(index), source=source, listener=listener)
+
+
+def get_free_port():
+    with socket.socket() as free:
+        free.bind(('127.0.0.1', 0))
+        return free.getsockname()[1]
+
+
+class Collector(object):
+    def __init__(self):
+        self.lock = Lock()
+        self.received = []
+
+    def __call__(self, chat, messages):
+        with self.lock:
+            self.received.append((chat, messages))
+
+    def messages(self):
+        with self.lock:
+            return [message for chat, messages in self.received for message in messages]
+
+    def wait_for(self, count, timeout=5):
+        deadline = time.monotonic() + timeout
+        while len(self.messages()) < count and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return self.messages()
+
+
+class TestFrames(TestCase):
+
+    def test_decodes_encoded_batch(self):
+        batch = [("Corp", [message(1, "logs", "Pilot One"), message(2)]), ("Alliance", [message(3)])]
+
+        frame = encode_batch(batch)
+        decoded = decode_frame(frame[FRAME_HEADER.size:])
+
+        self.assertEqual(batch, decoded)
+        self.assertEqual("logs", decoded[0][1][0].source)
+        self.assertEqual("Pilot One", decoded[0][1][0].listener)
+
+    def test_merges_consecutive_batches_of_chat(self):
+        frame = encode_batch([("Corp", [message(1)]), ("Corp", [message(2)])])
+
+        self.assertEqual([("Corp", [message(1), message(2)])], decode_frame(frame[FRAME_HEADER.size:]))
+
+    def test_header_holds_payload_length(self):
+        frame = encode_batch([("Corp", [message(1)])])
+
+        self.assertEqual(len(frame) - FRAME_HEADER.size, FRAME_HEADER.unpack(frame[:FRAME_HEADER.size])[0])
+
+    def test_compresses_batch(self):
+        messages = [message(index) for index in range(1000)]
+
+        self.assertTrue(len(encode_batch([("Corp", messages)])) < sum(len(m.message) for m in messages))
+
+    def test_read_frame_reads_frames_in_order(self):
+        first = encode_batch([("Corp", [message(1)])])
+        second = encode_batch([("Corp", [message(2)])])
+        stream = io.BytesIO(first + second)
+
+        self.assertEqual(first[FRAME_HEADER.size:], read_frame(stream))
+        self.assertEqual(second[FRAME_HEADER.size:], read_frame(stream))
+        self.assertIsNone(read_frame(stream))
+
+    def test_read_frame_returns_none_for_incomplete_frame(self):
+        frame = encode_batch([("Corp", [message(1)])])
+
+        self.assertIsNone(read_frame(io.BytesIO(frame[:-1])))
+
+    def test_read_frame_raises_on_oversized_frame(self):
+        self.assertRaises(ValueError, read_frame, io.BytesIO(FRAME_HEADER.pack(2 ** 31) + b'x'))
+
+
+class TestNetworkSink(TestCase):
+
+    def setUp(self):
+        self._directory = tempfile.mkdtemp()
+        self._collector = Collector()
+        self._receiver = SinkReceiver(('127.0.0.1', 0), self._collector)
+        self._sinks = []
+
+    def tearDown(self):
+        for sink in self._sinks:
+            sink.close()
+        self._receiver.close()
+        shutil.rmtree(self._directory)
+
+    def _create_sink(self, address=None, **kwargs):
+        sink = NetworkSink(address or self._receiver.address, **kwargs)
+        self._sinks.append(sink)
+        return sink
+
+    def test_sends_messages_in_one_frame(self):
+        sink = self._create_sink(batch_size=100, batch_interval=60)
+        messages = [message(index) for index in range(100)]
+
+        for index in range(0, 100, 10):
+            sink("Corp", messages[index:index + 10])
+
+        self.assertEqual(messages, self._collector.wait_for(100))
+        self.assertEqual(1, len(self._collector.received))
+        self.assertEqual(1, sink.get_stats()['sent_frames'])
+
+    def test_sends_partial_batch_after_interval(self):
+        sink = self._create_sink(batch_size=100, batch_interval=0.05)
+
+        sink("Corp", [message(1)])
+
+        self.assertEqual([message(1)], self._collector.wait_for(1))
+        self.assertEqual(0, sink.get_stats()['pending_messages'])
+
+    def test_close_sends_pending_messages(self):
+        sink = self._create_sink(batch_size=100, batch_interval=60)
+
+        sink("Corp", [message(1)])
+        sink.close()
+
+        self.assertEqual([message(1)], self._collector.wait_for(1))
+
+    def test_call_raises_after_close(self):
+        sink = self._create_sink()
+        sink.close()
+
+        self.assertRaises(InvalidMonitorState, sink, "Corp", [message(1)])
+
+    def test_spools_while_server_is_down_and_sends_spool_on_reconnect(self):
+        address = ('127.0.0.1', get_free_port())
+        spool_path = os.path.join(self._directory, "chat.spool")
+        sink = self._create_sink(address, batch_size=1, spool_path=spool_path, reconnect_interval=0.05)
+
+        sink("Corp", [message(1), message(2)])
+        deadline = time.monotonic() + 5
+        while not sink.get_stats()['spooled_frames'] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(1, sink.get_stats()['spooled_frames'])
+
+        collector = Collector()
+        receiver = SinkReceiver(address, collector)
+        try:
+            sink("Corp", [message(3)])
+
+            self.assertEqual([message(1), message(2), message(3)], collector.wait_for(3))
+        finally:
+            sink.close()
+            receiver.close()
+
+        self.assertEqual(0, os.path.getsize(spool_path))
+
+    def test_drops_messages_beyond_spool_size(self):
+        address = ('127.0.0.1', get_free_port())
+        spool_path = os.path.join(self._directory, "chat.spool")
+        sink = self._create_sink(address, batch_size=1, spool_path=spool_path, max_spool_size=1)
+
+        sink("Corp", [message(1), message(2)])
+        sink.close()
+
+        self.assertEqual(2, sink.get_stats()['dropped_messages'])
+        self.assertFalse(os.path.exists(spool_path))
+
+    def test_drops_messages_that_can_not_be_spooled(self):
+        address = ('127.0.0.1', get_free_port())
+        spool_path = os.path.join(self._directory, "missing", "chat.spool")
+        sink = self._create_sink(address, batch_size=1, spool_path=spool_path)
+
+        with self.assertLogs('py_eve_chat_mon.sink', 'ERROR'):
+            sink("Corp", [message(1), message(2)])
+            sink("Corp", [message(3)])
+            sink.close()
+
+        self.assertEqual(3, sink.get_stats()['dropped_messages'])
+        self.assertEqual(0, sink.get_stats()['pending_messages'])
+
+    def test_sends_spool_of_earlier_run_first(self):
+        spool_path = os.path.join(self._directory, "chat.spool")
+        with open(spool_path, "wb") as spool:
+            spool.write(encode_batch([("Corp", [message(1)])]))
+
+        sink = self._create_sink(batch_size=1, spool_path=spool_path)
+        sink("Corp", [message(2)])
+
+        self.assertEqual([message(1), message(2)], self._collector.wait_for(2))
+
+    @unittest.skipUnless(hasattr(socket, 'AF_UNIX'), "requires Unix sockets")
+    def test_sends_over_unix_socket(self):
+        collector = Collector()
+        receiver = SinkReceiver(os.path.join(self._directory, "chat.sock"), collector)
+        sink = self._create_sink(receiver.address, batch_size=1)
+        try:
+            sink("Corp", [message(1)])
+
+            self.assertEqual([message(1)], collector.wait_for(1))
+        finally:
+            sink.close()
+            receiver.close()
@@ -0,0 +1,135 @@
+from collections import Counter
+from random import Random
+from datetime import datetime, timedelta
+from unittest import TestCase
+from unittest.mock import MagicMock
+from py_eve_chat_mon.chat_message import ChatMessage
+from py_eve_chat_mon.exceptions import InvalidCallable
+from py_eve_chat_mon.stats import ChatStatistics, SpaceSaving
+
+START = datetime(2015, 3, 5, 21, 0, 0)
+
+
+def message(minute, username="Some Dude", second=0):
+    return ChatMessage(START + timedelta(minutes=minute, seconds=second), username, "o7")
+
+
+class TestSpaceSaving(TestCase):
+
+    def test_counts_items_below_capacity_exactly(self):
+        summary = SpaceSaving(3)
+        for item in "abcab":
+            summary.add(item)
+
+        self.assertEqual({'a': 2, 'b': 2, 'c': 1}, summary.counts)
+        self.assertEqual({'a': 0, 'b': 0, 'c': 0}, summary.errors)
+
+    def test_new_item_replaces_least_frequent_item(self):
+        summary = SpaceSaving(2)
+        for item in "aab":
+            summary.add(item)
+        summary.add('c')
+
+        self.assertEqual({'a': 2, 'c': 2}, summary.counts)
+        self.assertEqual(1, summary.errors['c'])
+
+    def test_keeps_capacity(self):
+        summary = SpaceSaving(10)
+        for item in range(1000):
+            summary.add(item)
+
+        self.assertEqual(10, len(summary))
+        self.assertEqual(1000, sum(summary.counts.values()))
+
+    def test_finds_frequent_items(self):
+        stream = [index % 500 for index in range(5000)] + ['frequent'] * 2000 + ['common'] * 1000
+        Random(0).shuffle(stream)
+
+        summary = SpaceSaving(20)
+        for item in stream:
+            summary.add(item)
+
+        counts = Counter(stream)
+        for item in ('frequent', 'common'):
+            self.assertTrue(item in summary.counts)
+            self.assertTrue(counts[item] <= summary.counts[item] <= counts[item] + summary.errors[item])
+
+
+class TestChatStatistics(TestCase):
+
+    def setUp(self):
+        self._sut = ChatStatistics(window=600, bucket_size=60)
+
+    def test_init_raises_on_non_callable_handler(self):
+        self.assertRaises(InvalidCallable, ChatStatistics, "handler")
+
+    def test_passes_messages_to_handler(self):
+        handler = MagicMock()
+        messages = [message(0)]
+
+        ChatStatistics(handler)("Corp", messages)
+
+        handler.assert_called_once_with("Corp", messages)
+
+    def test_stats_are_empty_without_messages(self):
+        stats = self._sut.get_stats()
+
+        self.assertEqual(0, stats['messages'])
+        self.assertEqual({}, stats['chats'])
+        self.assertEqual([], stats['top_talkers'])
+
+    def test_counts_messages_by_chat(self):
+        self._sut("Corp", [message(0), message(1), message(1, second=30)])
+        self._sut("Alliance", [message(1)])
+
+        stats = self._sut.get_stats()
+
+        self.assertEqual(4, stats['messages'])
+        self.assertEqual(3, stats['chats']['Corp']['messages'])
+        self.assertEqual(1, stats['chats']['Alliance']['messages'])
+
+    def test_rates_are_per_minute_of_covered_window(self):
+        self._sut("Corp", [message(0), message(1), message(1), message(3)])
+
+        stats = self._sut.get_stats()
+
+        self.assertEqual(START, stats['start'])
+        self.assertEqual(START + timedelta(minutes=4), stats['end'])
+        self.assertEqual(1.0, stats['messages_per_minute'])
+        self.assertEqual(1.0, stats['chats']['Corp']['messages_per_minute'])
+
+    def test_window_slides_with_newest_message(self):
+        self._sut("Corp", [message(0), message(5)])
+        self._sut("Corp", [message(12)])
+
+        stats = self._sut.get_stats()
+
+        self.assertEqual(2, stats['messages'])
+        self.assertEqual(START + timedelta(minutes=3), stats['start'])
+        self.assertEqual(0.2, stats['messages_per_minute'])
+
+    def test_ignores_messages_older_than_window(self):
+        self._sut("Corp", [message(20), message(5)])
+
+        self.assertEqual(1, self._sut.get_stats()['messages'])
+
+    def test_counts_late_messages_within_window(self):
+        self._sut("Corp", [message(5), message(2)])
+
+        self.assertEqual(2, self._sut.get_stats()['messages'])
+
+    def test_reports_top_talkers(self):
+        self._sut("Corp", [message(0, "Some Dude"), message(0, "Other Dude"), message(1, "Some Dude")])
+        self._sut("Alliance", [message(1, "Other Dude"), message(1, "Other Dude")])
+
+        stats = self._sut.get_stats(top=1)
+
+        self.assertEqual([("Other Dude", 3)], stats['top_talkers'])
+        self.assertEqual([("Some Dude", 2)], stats['chats']['Corp']['top_talkers'])
+
+    def test_memory_is_bounded_by_top_size(self):
+        self._sut = ChatStatistics(window=60, top_size=5)
+        self._sut("Corp", [message(0, "Pilot {0}".format(index)) for index in range(1000)])
+
+        self.assertEqual(5, len(self._sut._buckets[0][1]["Corp"][1]))
+        self.assertEqual(1000, self._sut.get_stats()['messages'])
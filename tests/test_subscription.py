@@ -0,0 +1,56 @@
+import re
+from unittest import TestCase
+from py_eve_chat_mon.subscription import ChatSubscription
+
+
+class TestChatSubscription(TestCase):
+
+    def test_matches_exact_names_case_sensitive(self):
+        sut = ChatSubscription(['Corp'])
+
+        self.assertTrue(sut.matches('Corp'))
+        self.assertFalse(sut.matches('corp'))
+        self.assertFalse(sut.matches('Corporation'))
+
+    def test_matches_globs(self):
+        sut = ChatSubscription(['Intel*', 'Sc?uts'])
+
+        self.assertTrue(sut.matches('Intel.North'))
+        self.assertTrue(sut.matches('Scouts'))
+        self.assertFalse(sut.matches('Local'))
+        self.assertFalse(sut.matches('North Intel'))
+
+    def test_matches_names_with_glob_characters_literally(self):
+        sut = ChatSubscription(['Corp [EU]', 'Who?'])
+
+        self.assertTrue(sut.matches('Corp [EU]'))
+        self.assertTrue(sut.matches('Who?'))
+        self.assertTrue(sut.matches('Corp E'))
+
+    def test_matches_escaped_glob_characters_only_literally(self):
+        sut = ChatSubscription(['Corp [[]EU]'])
+
+        self.assertTrue(sut.matches('Corp [EU]'))
+        self.assertFalse(sut.matches('Corp E'))
+
+    def test_star_matches_every_chat(self):
+        sut = ChatSubscription(['*'])
+
+        self.assertTrue(sut.matches('Local'))
+        self.assertTrue(sut.matches('Corp'))
+
+    def test_matches_regular_expressions(self):
+        sut = ChatSubscription([re.compile('(Intel|Scouts)'), 'Corp'])
+
+        self.assertTrue(sut.matches('Intel.North'))
+        self.assertTrue(sut.matches('Scouts'))
+        self.assertTrue(sut.matches('Corp'))
+        self.assertFalse(sut.matches('North Intel'))
+
+    def test_does_not_match_none(self):
+        self.assertFalse(ChatSubscription(['*']).matches(None))
+
+    def test_filter_returns_matching_chats(self):
+        sut = ChatSubscription(['Intel*'])
+
+        self.assertEqual(['Intel.North', 'Intel.South'], sut.filter(['Local', 'Intel.North', 'Intel.South']))